@@ -0,0 +1,80 @@
+import json
+import os
+import time
+
+
+class ArtifactCache:
+    """
+    宿主机侧的运行时产物缓存（基础镜像、环境快照等）。
+
+    每个产物旁边放一个 `<name>.stamp.json` 版本戳，记录产物来源和生成时间，
+    调用方据此判断缓存是否可直接复用或需要刷新。
+    """
+
+    STAMP_SUFFIX = ".stamp.json"
+
+    def __init__(self, root):
+        self.root = root
+
+    @classmethod
+    def from_config(cls, config, base_path):
+        configured = (config.get("runtime_image_cache") if config else None) or "runtime_cache"
+        if os.path.isabs(configured):
+            return cls(configured)
+        return cls(os.path.join(base_path, configured))
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def exists(self, name):
+        return os.path.exists(self.path(name))
+
+    def size(self, name):
+        try:
+            return os.path.getsize(self.path(name))
+        except OSError:
+            return 0
+
+    def read_stamp(self, name):
+        """读取产物版本戳，产物或版本戳缺失时返回 None"""
+        if not self.exists(name):
+            return None
+        try:
+            with open(self.path(name) + self.STAMP_SUFFIX, "r", encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    def write_stamp(self, name, **fields):
+        """写入版本戳（先写临时文件再替换，避免中途退出留下半个文件）"""
+        os.makedirs(self.root, exist_ok=True)
+        stamp = {"created_at": time.time(), **fields}
+        stamp_path = self.path(name) + self.STAMP_SUFFIX
+        tmp_path = stamp_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(stamp, fh, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, stamp_path)
+        return stamp
+
+    def stamp_age(self, name):
+        """返回产物生成至今的秒数，无版本戳时返回 None"""
+        stamp = self.read_stamp(name)
+        if not stamp or "created_at" not in stamp:
+            return None
+        return max(0.0, time.time() - float(stamp["created_at"]))
+
+    def remove(self, name):
+        for path in (self.path(name), self.path(name) + self.STAMP_SUFFIX):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def parse_sha256sums(text, name):
+    """从 SHA256SUMS 格式的文本（`<校验值> [*]<文件名>`）中取出指定文件的校验值，找不到时返回空串"""
+    for line in text.splitlines():
+        parts = line.split(None, 1)
+        if len(parts) == 2 and parts[1].strip().lstrip("*") == name and len(parts[0]) == 64:
+            return parts[0].lower()
+    return ""
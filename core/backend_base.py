@@ -1,23 +1,58 @@
+import threading
+import time
 from abc import abstractmethod
 
-from PyQt6.QtCore import QObject, pyqtSignal
+from core.compose_sync import backup_command, file_sha256, plan_compose_update, remember_shipped, remote_sha256_command
+from core.docker_events import DockerEventWatcher
+from core.event_bus import (
+    BootFinishedEvent,
+    ContainerLifecycleEvent,
+    ContainerLogEvent,
+    DeployInfoEvent,
+    DockerInstallEvent,
+    EventBus,
+    HealthEvent,
+    InstallErrorEvent,
+    LogEvent,
+    ProgressEvent,
+    PullProgressEvent,
+    StatusEvent,
+)
+from core.log_follower import LogFollower, service_source
+from core.log_watchers import LogWatcher
+from core.metrics import MetricsCollector
+from core.service_watchdog import RestartLimiter, ServiceWatchdog, http_probe
 
 
-class BackendBase(QObject):
-    log_received = pyqtSignal(str, str)
-    status_changed = pyqtSignal(str)
-    boot_finished = pyqtSignal()
-    progress_updated = pyqtSignal(str)
-    deploy_info_ready = pyqtSignal(dict)
-    install_error = pyqtSignal(str)  # 安装过程中的具体错误信息
-
+class BackendBase:
     backend_key = ""
     display_name = ""
 
-    def __init__(self, config=None, parent=None):
-        super().__init__(parent)
+    def __init__(self, config=None):
         self.config = config
+        # 后端到界面的事件全部经事件总线送达（不依赖 Qt），沿用信号的 emit / connect 写法
+        self.bus = EventBus()
+        self.log_received = self.bus.channel(LogEvent)
+        self.status_changed = self.bus.channel(StatusEvent)
+        self.boot_finished = self.bus.channel(BootFinishedEvent)
+        self.progress_updated = self.bus.channel(ProgressEvent)
+        self.deploy_info_ready = self.bus.channel(DeployInfoEvent)
+        self.install_error = self.bus.channel(InstallErrorEvent)  # 安装过程中的具体错误信息
+        self.health_changed = self.bus.channel(HealthEvent)  # 服务运行期间的健康状态与说明（延迟 / 恢复动作）
+        self.container_event = self.bus.channel(ContainerLifecycleEvent)  # 容器生命周期事件
         self.is_running = False
+        self.prewarmer = None
+        self.watchdog = None
+        self.events = None
+        self.metrics = None
+        self.metrics_store = None
+        self.log_store = None
+        self.log_followers = {}
+        self.log_watcher = LogWatcher()
+        self._log_cursors = {}
+        self._monitor_stop = threading.Event()
+        self._deploy_started = 0.0
+        self._pull_started = 0.0
 
     @abstractmethod
     def check_environment(self):
@@ -43,6 +78,304 @@ class BackendBase(QObject):
     def prepare_runtime(self):
         return True
 
+    def reclaim_disk(self):
+        """在后台回收运行环境虚拟磁盘空间，已开始返回 True，不支持或正在进行时返回 False"""
+        return False
+
+    def quiet_events(self, prefix):
+        """
+        后台任务（如刷新黄金快照）在当前线程内静默：日志降为调试级别并加前缀，
+        进度、状态、安装错误等界面事件不再送达，避免干扰用户正在看的向导和主界面。
+        """
+        def redirect(event):
+            if isinstance(event, (LogEvent, InstallErrorEvent)):
+                message = event.message if event.message.startswith(prefix) else f"{prefix} {event.message}"
+                return LogEvent(message, "debug")
+            return None
+
+        return self.bus.redirected(redirect)
+
+    def attach_prewarmer(self, prewarmer):
+        """接管启动时的后台预热，之后的启动流程先等待预热结束"""
+        self.prewarmer = prewarmer
+
+    def _await_prewarm(self, timeout=180):
+        prewarmer = self.prewarmer
+        if prewarmer is None or not prewarmer.started:
+            return False
+        if not prewarmer.done:
+            self.log_received.emit("等待运行环境预热完成...", "info")
+        ok = prewarmer.wait(timeout)
+        self.log_received.emit(
+            "运行环境已预热" if ok else f"运行环境预热未完成（{prewarmer.detail or '超时'}），继续常规启动",
+            "info" if ok else "warning",
+        )
+        return ok
+
+    def attach_metrics_store(self, store):
+        """接入指标历史存储，之后的资源、延迟、磁盘占用和耗时都会写入"""
+        self.metrics_store = store
+
+    def record_metric(self, series, value):
+        if self.metrics_store is not None:
+            self.metrics_store.record(series, value)
+
+    def attach_log_store(self, store):
+        """接入本地日志存储，容器日志从上次读到的位置续读并写入"""
+        self.log_store = store
+
+    def start_log_followers(self, services=None):
+        """每个服务一个日志跟随线程，从上次读到的位置续读；已在跟随的服务不重复启动"""
+        if services is None:
+            try:
+                services = list(self.container_states()) or ["nekro_agent"]
+            except Exception:
+                services = ["nekro_agent"]
+        cursors = self._cursor_table()
+        for service in services:
+            follower = self.log_followers.get(service)
+            if follower is not None and follower.running:
+                continue
+            follower = self.log_followers[service] = LogFollower(
+                service,
+                self._open_service_log_stream,
+                self._on_container_log,
+                cursor=cursors.get(f"{self.backend_key}:{service}"),
+                on_cursor=self._save_log_cursor,
+                log=self.log_received.emit,
+            )
+            follower.start()
+
+    def stop_log_followers(self):
+        for follower in self.log_followers.values():
+            follower.stop()
+        self.log_followers = {}
+
+    def _cursor_table(self):
+        return self.log_store.cursors if self.log_store is not None else self._log_cursors
+
+    def _save_log_cursor(self, service, cursor):
+        key = f"{self.backend_key}:{service}"
+        if self.log_store is not None:
+            self.log_store.set_cursor(key, list(cursor))
+        else:
+            self._log_cursors[key] = list(cursor)
+
+    def _open_service_log_stream(self, service, since, backfill=86400):
+        # 续读位置过旧（如长时间未启动）时最多回溯 backfill 秒
+        if since:
+            since = max(since, time.time() - backfill)
+        return self._open_log_stream(service, since)
+
+    def _open_log_stream(self, service, since):
+        """启动运行环境内单个服务的日志跟随进程（log_follower.logs_command）"""
+        raise NotImplementedError
+
+    def _on_container_log(self, service, stamp, text, display):
+        if self.log_store is not None:
+            self.log_store.append(service_source(service), "vm", f"{service} | {text}", stamp)
+        if display:
+            self.bus.publish(ContainerLogEvent(service, text))
+        for event in self.log_watcher.scan(service, text):
+            self._on_log_watch(event)
+            self.bus.publish(event)
+
+    def _on_log_watch(self, event):
+        """日志监视规则命中（跟随线程中调用），子类可处理特定规则"""
+        if event.message:
+            self.log_received.emit(event.message, event.level)
+
+    def _emit_pull_progress(self, phase, message):
+        if phase == "start":
+            self._pull_started = time.time()
+        elif phase == "done" and self._pull_started:
+            self.record_metric("duration.pull", time.time() - self._pull_started)
+            self._pull_started = 0.0
+        self.bus.publish(PullProgressEvent(phase, message))
+
+    def _sync_compose_file(self, compose_src, deploy_dir, copy):
+        """
+        更新部署目录中的 docker-compose.yml：不存在或与启动器写入过的版本相同时直接覆盖，
+        用户改动过的文件先备份再覆盖并提示。copy(本地路径, 运行环境内路径) 返回是否成功。
+        """
+        target = f"{deploy_dir}/docker-compose.yml"
+        shipped = file_sha256(compose_src)
+        known = (self.config.get("compose_shipped_hashes") if self.config else None) or []
+        current = self._runtime_exec(remote_sha256_command(target), timeout=20)
+        action = plan_compose_update(current, shipped, known)
+        if action == "backup":
+            backup, command = backup_command(target)
+            if self._runtime_exec(command, timeout=20).strip() != "ok":
+                self.log_received.emit("docker-compose.yml 已被修改且备份失败，保留现有文件", "error")
+                return False
+            self.log_received.emit(
+                f"docker-compose.yml 与启动器写入的版本不同，已备份为 {backup}，如有自定义内容请合并到新文件",
+                "warning",
+            )
+        if action != "keep" and not copy(compose_src, target):
+            self.log_received.emit("写入 docker-compose.yml 失败", "error")
+            return False
+        if self.config:
+            self.config.set("compose_shipped_hashes", remember_shipped(known, shipped))
+        return True
+
+    def _emit_docker_result(self, success):
+        self.bus.publish(DockerInstallEvent(success))
+
+    def _start_monitoring(self):
+        """服务就绪后启动看门狗、资源采集与磁盘占用采样"""
+        if self._deploy_started:
+            self.record_metric("duration.deploy", time.time() - self._deploy_started)
+            self._deploy_started = 0.0
+        self.start_watchdog()
+        self.start_metrics()
+        if self.metrics_store is not None:
+            self._monitor_stop.clear()
+            threading.Thread(target=self._sample_disk_usage, daemon=True).start()
+
+    def _stop_monitoring(self):
+        self._monitor_stop.set()
+        self.stop_watchdog()
+        self.stop_event_watcher()
+        self.stop_metrics()
+        self.stop_log_followers()
+
+    def _sample_disk_usage(self):
+        interval = (self.config.get("metrics_disk_interval") if self.config else 0) or 600
+        data_dir = (self.config.get("data_dir") if self.config else "") or self._default_data_dir()
+        while not self._monitor_stop.is_set():
+            try:
+                disk = self._virtual_disk_bytes()
+                if disk:
+                    self.record_metric("disk.vhdx", disk)
+                used = self._runtime_exec(f"du -sx --block-size=1 '{data_dir}' 2>/dev/null | cut -f1", timeout=120)
+                if used.strip().isdigit():
+                    self.record_metric("disk.data_dir", int(used.strip()))
+            except Exception as exc:
+                self.log_received.emit(f"[指标历史] 磁盘占用采样失败: {exc}", "debug")
+            self._monitor_stop.wait(interval)
+
+    def _virtual_disk_bytes(self):
+        """运行环境虚拟磁盘在宿主机上的占用（字节）"""
+        return 0
+
+    def _default_data_dir(self):
+        return "/root/nekro_agent_data"
+
+    def _runtime_exec(self, command, timeout=60):
+        """在运行环境内执行命令并返回 stdout"""
+        raise NotImplementedError
+
+    def start_metrics(self):
+        """持续采集各容器的 CPU / 内存 / 网络 / 磁盘 IO，保留定长历史供总览页绘制"""
+        if not self.config or not self.config.get("metrics_enabled"):
+            return
+        if self.metrics is None:
+            self.metrics = MetricsCollector(
+                self._open_stats_stream,
+                capacity=self.config.get("metrics_history_points") or 300,
+                on_sample=self._record_container_sample if self.metrics_store is not None else None,
+                log=self.log_received.emit,
+            )
+        self.metrics.start()
+
+    def stop_metrics(self):
+        if self.metrics is not None:
+            self.metrics.stop()
+            self.metrics = None
+
+    def _record_container_sample(self, label, sample):
+        self.record_metric(f"container.{label}.cpu", sample["cpu"])
+        self.record_metric(f"container.{label}.mem", sample["mem"])
+
+    def _open_stats_stream(self):
+        """启动运行环境内的 docker stats 流式输出进程"""
+        raise NotImplementedError
+
+    def start_watchdog(self):
+        """服务就绪后开始持续探测，按配置的恢复阶梯自动恢复"""
+        self.stop_watchdog()
+        if not self.config or not self.config.get("watchdog_enabled"):
+            return
+        url = f"http://localhost:{self.config.get('nekro_port') or 8021}"
+
+        def _probe():
+            ok, elapsed, detail = http_probe(url, timeout=10)
+            if ok:
+                self.record_metric("health.latency_ms", elapsed * 1000)
+            return ok, elapsed, detail
+
+        self.watchdog = ServiceWatchdog(
+            _probe,
+            self.recover_services,
+            on_health=self.health_changed.emit,
+            log=self.log_received.emit,
+            interval=self.config.get("watchdog_interval") or 15,
+            slo_p99=(self.config.get("watchdog_latency_slo_ms") or 2000) / 1000,
+            steps=self.config.get("watchdog_recovery_steps") or (),
+            limiter=RestartLimiter(
+                max_actions=self.config.get("watchdog_max_recoveries") or 3,
+                window=self.config.get("watchdog_recovery_window") or 1800,
+            ),
+        )
+        self.watchdog.start()
+
+    def stop_watchdog(self):
+        if self.watchdog is not None:
+            self.watchdog.stop()
+            self.watchdog = None
+
+    def recover_services(self, step):
+        """执行一级恢复动作（service / stack / runtime），返回是否成功；默认不支持"""
+        return False
+
+    def start_event_watcher(self):
+        """建立常驻的容器事件订阅，之后容器状态从事件维护的状态表读取"""
+        if self.events is None:
+            self.events = DockerEventWatcher(
+                self._open_event_stream,
+                self._fetch_container_states,
+                on_event=self._on_container_event,
+                log=self.log_received.emit,
+            )
+        self.events.start()
+
+    def stop_event_watcher(self):
+        if self.events is not None:
+            self.events.stop()
+            self.events = None
+
+    def container_states(self):
+        """当前容器状态 {服务名: ContainerState}；事件订阅未就绪时直接查询一次"""
+        events = self.events
+        if events is not None and events.running and events.table.seeded:
+            return events.snapshot()
+        return self._fetch_container_states()
+
+    def _wait_container_change(self, timeout):
+        """等待容器状态变化（有事件订阅时被事件唤醒），供就绪检测替代固定间隔轮询"""
+        events = self.events
+        if events is not None and events.running:
+            events.table.wait_for_change(timeout)
+        else:
+            time.sleep(timeout)
+
+    def _open_event_stream(self):
+        """启动运行环境内的 docker events 订阅进程"""
+        raise NotImplementedError
+
+    def _fetch_container_states(self):
+        return {}
+
+    def _on_container_event(self, event, restarts):
+        self.container_event.emit(event)
+        if event.action == "start" and self.log_followers:
+            # 新创建的服务（如切换部署模式后）补上日志跟随
+            self.start_log_followers([event.service])
+        self.log_received.emit(f"[容器事件] {event.describe()}", "warning" if event.abnormal else "debug")
+        if self.watchdog is not None:
+            self.watchdog.notify(event, restarts)
+
     @abstractmethod
     def install_wsl(self):
         raise NotImplementedError
@@ -1,13 +1,20 @@
-from core.hyperv_backend import HyperVBackend
-from core.wsl_manager import WSLManager
+import importlib
+
+
+# 后端注册表：键 -> (模块, 类名)，只在创建时导入所选后端
+BACKENDS = {
+    "wsl": ("core.wsl_manager", "WSLManager"),
+    "hyperv": ("core.hyperv_backend", "HyperVBackend"),
+}
 
 
 class BackendFactory:
+    @staticmethod
+    def backend_class(backend_key):
+        module_name, class_name = BACKENDS.get(backend_key, BACKENDS["wsl"])
+        return getattr(importlib.import_module(module_name), class_name)
+
     @staticmethod
     def create(config):
         backend_key = (config.get("backend") or "wsl").lower()
-
-        if backend_key == "hyperv":
-            return HyperVBackend(config=config)
-
-        return WSLManager(config=config)
+        return BackendFactory.backend_class(backend_key)(config=config)
@@ -0,0 +1,59 @@
+import hashlib
+import re
+import shlex
+import time
+
+
+# 旧版本启动器只在首次部署时写入的 compose 文件（LF / CRLF 检出各一份），视为未经用户修改
+LEGACY_SHIPPED_SHA256 = frozenset({
+    "399e7effbeedf7542d6300f3edd43d9b84360864c3e03850b1e00feb1f896425",   # docker-compose_with_napcat.yml
+    "6c89a0273759ba385a51130d34223214acbae0f02e09aa1eff68e26728ff0c80",
+    "90d5b0922959fd869a3907c7c0f6d0eb21c81ef46313ad46735e3c89a60bd879",   # docker-compose_withnot_napcat.yml
+    "e9dba622ee9a1fdb3ab0eea600af54251ece627754afb24435df5e815ad2a1b1",
+})
+
+# 配置中最多记录的已写入版本数
+MAX_SHIPPED_HASHES = 20
+
+_SHA256 = re.compile(r"\b[0-9a-f]{64}\b")
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def remote_sha256_command(remote_path):
+    """运行环境内计算文件哈希的命令，文件不存在时输出为空"""
+    return f"sha256sum {shlex.quote(remote_path)} 2>/dev/null | cut -d' ' -f1"
+
+
+def plan_compose_update(current, shipped, known):
+    """
+    决定如何更新部署目录中的 compose 文件：
+    keep（内容已是当前版本）、replace（不存在或为启动器写入过的版本）、backup（用户改动过，先备份再覆盖）
+    """
+    # 命令输出中可能混有 WSL 提示行，只取其中的哈希
+    match = _SHA256.search((current or "").lower())
+    current = match.group(0) if match else ""
+    if current == shipped:
+        return "keep"
+    if not current or current in known or current in LEGACY_SHIPPED_SHA256:
+        return "replace"
+    return "backup"
+
+
+def backup_command(remote_path):
+    """返回 (备份路径, 备份命令)，备份成功时命令输出 ok"""
+    backup = f"{remote_path}.bak-{time.strftime('%Y%m%d-%H%M%S')}"
+    return backup, f"cp -p {shlex.quote(remote_path)} {shlex.quote(backup)} && echo ok"
+
+
+def remember_shipped(known, shipped):
+    """把新写入的版本加入记录，只保留最近的若干个"""
+    known = [value for value in known if value != shipped]
+    known.append(shipped)
+    return known[-MAX_SHIPPED_HASHES:]
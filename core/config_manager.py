@@ -40,7 +40,43 @@ class ConfigManager:
             "hyperv_install_dir": "",
             "hyperv_ssh_key_path": "",
             "hyperv_seed_disk": "",
+            "hyperv_provision_mode": "ssh",   # "ssh"（逐步远程安装）或 "cloud-init"（首次启动时在虚拟机内安装）
+            "hyperv_phone_home": True,   # 虚拟机开机就绪后主动回报宿主机
+            "hyperv_phone_home_port": 18721,
+            "hyperv_phone_home_token": "",
+            "hyperv_disk_mode": "differencing",   # "differencing"（共用只读基础盘）或 "standalone"（合并为独立磁盘）
             "runtime_image_cache": "runtime_cache",
+            "docker_provision_mode": "apt",   # "apt" 或 "static"（使用缓存的静态二进制包）
+            "manage_wslconfig": False,  # 按宿主机资源向 .wslconfig 补充未设置的内存 / CPU / swap 等规格（不覆盖已有值）
+            "disk_reclaim_interval_days": 0,   # 定期提示回收虚拟磁盘空间（天），0 为关闭
+            "disk_reclaim_min_free_gb": 0,     # 宿主机剩余空间低于该值（GB）时提示回收，0 为关闭
+            "disk_reclaim_last_run": 0,
+            "golden_snapshot": True,   # Docker 就绪后导出快照，重装时直接导入
+            "webview_idle_discard_seconds": 300,   # 浏览页隐藏超过该时间后销毁内嵌浏览器，0 为不销毁
+            "lazy_pages": True,        # 先显示窗口，浏览 / 文件 / 设置页在首次访问时构建
+            "prewarm_runtime": True,   # 启动器启动时在后台预热运行环境（启动发行版 / 虚拟机与 dockerd）
+            "fast_start": True,        # 已验证的部署用单次脚本启动，状态不符时回退完整流程
+            "fast_start_stamp": "",    # 完整流程部署成功后记录的快速启动标记
+            "compose_shipped_hashes": [],   # 启动器写入过的 docker-compose.yml 哈希，相同的部署文件视为未修改、可直接更新
+            "watchdog_enabled": True,          # 服务就绪后持续探测，无响应时自动恢复
+            "watchdog_interval": 15,           # 探测间隔（秒）
+            "watchdog_latency_slo_ms": 2000,   # 响应耗时 p99 超过该值时提示服务降级
+            "watchdog_recovery_steps": ["service", "stack", "runtime"],   # 恢复阶梯：重启异常服务 → 重启全部服务 → 重启运行环境
+            "watchdog_max_recoveries": 3,      # 时间窗内最多自动恢复次数，超出后只提示不再重启
+            "watchdog_recovery_window": 1800,  # 恢复次数统计时间窗（秒）
+            "metrics_enabled": True,           # 服务运行时采集各容器资源占用
+            "metrics_history_points": 300,     # 每个容器保留的采样点数（docker stats 约每秒一个）
+            "metrics_refresh_ms": 1000,        # 总览页资源曲线的刷新间隔
+            "metrics_history": True,           # 把资源、响应耗时、磁盘占用等汇总后保存到本地，用于查看历史
+            "metrics_disk_interval": 600,      # 磁盘占用采样间隔（秒）
+            "log_view_capacity": 20000,        # 每个日志视图保留的最大行数，超出后丢弃最旧的行
+            "log_file_max_mb": 10,             # debug.log 超过该大小后轮转并压缩
+            "log_file_rotate_hours": 24,       # debug.log 写满该时长后轮转
+            "log_file_backups": 10,            # 保留的历史日志个数
+            "log_file_retention_days": 14,     # 历史日志最长保留天数
+            "log_store": True,                 # 把应用与容器日志保存到本地，可在日志页搜索历史
+            "log_store_max_mb": 512,           # 日志存储占用上限，超出后删除最旧的分段
+            "log_store_retention_days": 14,    # 日志存储最长保留天数
         }
         self.config = self.load_config()
 
@@ -0,0 +1,197 @@
+import re
+import threading
+import time
+from dataclasses import dataclass
+
+
+# 在运行环境内以 root 执行：清理悬空镜像与构建缓存后 fstrim，让虚拟磁盘中的空闲块可被宿主机回收
+GUEST_RECLAIM_SCRIPT = """docker image prune -f 2>&1 | tail -n 1
+docker builder prune -af 2>&1 | tail -n 1
+sync
+fstrim -av 2>&1 || true
+"""
+
+_DOCKER_RECLAIMED = re.compile(r"^(?:Total reclaimed space|Total):\s*([\d.]+)\s*([kKMGT]?B)\s*$", re.MULTILINE)
+_FSTRIM_BYTES = re.compile(r"\((\d+) bytes\) trimmed")
+# docker 输出使用十进制单位
+_DOCKER_UNITS = {"B": 1, "KB": 1000, "MB": 1000 ** 2, "GB": 1000 ** 3, "TB": 1000 ** 4}
+
+
+def parse_docker_reclaimed(output):
+    """汇总 docker prune 输出中的回收字节数"""
+    total = 0
+    for value, unit in _DOCKER_RECLAIMED.findall(output or ""):
+        total += int(float(value) * _DOCKER_UNITS.get(unit.upper(), 1))
+    return total
+
+
+def parse_trimmed(output):
+    """汇总 fstrim -av 输出中的 trim 字节数"""
+    return sum(int(value) for value in _FSTRIM_BYTES.findall(output or ""))
+
+
+def compact_vhdx_command(path):
+    """
+    生成压缩虚拟磁盘的 PowerShell 命令（需管理员权限、磁盘未挂载）。
+    有 Hyper-V 模块时用 Optimize-VHD，否则（如家庭版）退回 diskpart compact vdisk。
+    """
+    path = path.replace("/", "\\")
+    return (
+        f"if (Get-Command Optimize-VHD -ErrorAction SilentlyContinue) {{ "
+        f"Optimize-VHD -Path '{path}' -Mode Full }} else {{ "
+        f"$script = Join-Path $env:TEMP 'nekro-compact-vdisk.txt'; "
+        f"Set-Content -Path $script -Encoding Oem -Value @("
+        f"'select vdisk file=\"{path}\"', 'attach vdisk readonly', 'compact vdisk', 'detach vdisk'); "
+        f"diskpart /s $script | Out-String; $code = $LASTEXITCODE; "
+        f"Remove-Item $script -Force -ErrorAction SilentlyContinue; "
+        f"if ($code -ne 0) {{ throw \"diskpart compact vdisk failed, exit code $code\" }} }}"
+    )
+
+
+def format_bytes(value):
+    value = float(value)
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(value) < 1024 or unit == "GB":
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GB"
+
+
+@dataclass
+class ReclaimResult:
+    size_before: int = 0
+    size_after: int = 0
+    docker_freed: int = 0
+    trimmed: int = 0
+    compacted: bool = False
+    restarted: bool = False
+    error: str = ""
+
+    @property
+    def reclaimed(self):
+        return max(0, self.size_before - self.size_after)
+
+    @property
+    def ok(self):
+        return not self.error
+
+
+class DiskReclaimer:
+    """
+    编排一次磁盘回收：运行环境内清理 → 停止运行环境 → 宿主机压缩虚拟磁盘 → 恢复运行环境。
+
+    各步骤均由调用方注入:
+      run_guest(script) -> (ok, output)
+      stop_runtime() / compact_disk() / start_runtime() -> bool
+      disk_size() -> int
+    """
+
+    def __init__(self, run_guest, stop_runtime, compact_disk, start_runtime, disk_size, log=None):
+        self.run_guest = run_guest
+        self.stop_runtime = stop_runtime
+        self.compact_disk = compact_disk
+        self.start_runtime = start_runtime
+        self.disk_size = disk_size
+        self.log = log or (lambda message, level="info": None)
+
+    def run(self):
+        result = ReclaimResult(size_before=self._safe_size())
+        self.log(f"[磁盘回收] 当前虚拟磁盘大小 {format_bytes(result.size_before)}", "info")
+
+        ok, output = self.run_guest(GUEST_RECLAIM_SCRIPT)
+        result.docker_freed = parse_docker_reclaimed(output)
+        result.trimmed = parse_trimmed(output)
+        if ok:
+            self.log(
+                f"[磁盘回收] ✓ Docker 清理 {format_bytes(result.docker_freed)}，"
+                f"fstrim {format_bytes(result.trimmed)}",
+                "info",
+            )
+        else:
+            self.log("[磁盘回收] 运行环境内清理未完全成功，继续压缩虚拟磁盘", "warning")
+
+        if not self.stop_runtime():
+            result.error = "停止运行环境失败"
+            self.log(f"[磁盘回收] ✗ {result.error}", "error")
+            return result
+        try:
+            result.compacted = bool(self.compact_disk())
+            if not result.compacted:
+                result.error = "压缩虚拟磁盘失败"
+                self.log(f"[磁盘回收] ✗ {result.error}", "error")
+        finally:
+            result.restarted = bool(self.start_runtime())
+            if not result.restarted:
+                result.error = result.error or "恢复运行环境失败"
+                self.log("[磁盘回收] ✗ 恢复运行环境失败", "error")
+
+        result.size_after = self._safe_size() or result.size_before
+        self.log(
+            f"[磁盘回收] 完成：{format_bytes(result.size_before)} → {format_bytes(result.size_after)}，"
+            f"回收 {format_bytes(result.reclaimed)}",
+            "info" if result.ok else "warning",
+        )
+        return result
+
+    def _safe_size(self):
+        try:
+            return int(self.disk_size() or 0)
+        except (OSError, ValueError):
+            return 0
+
+
+class ReclaimScheduler:
+    """
+    定期检查是否需要回收磁盘：距上次回收超过设定天数，或宿主机剩余空间低于阈值
+    （阈值触发同样受 24 小时冷却限制，避免空间确实不足时反复压缩）。
+    """
+
+    THRESHOLD_COOLDOWN = 24 * 3600
+
+    def __init__(self, config, trigger, free_space_gb, clock=time.time, check_interval=3600):
+        self.config = config
+        self.trigger = trigger
+        self.free_space_gb = free_space_gb
+        self.clock = clock
+        self.check_interval = check_interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def due_reason(self):
+        """返回需要回收的原因，无需回收时返回空字符串"""
+        now = self.clock()
+        last_run = float(self.config.get("disk_reclaim_last_run") or 0)
+        interval_days = float(self.config.get("disk_reclaim_interval_days") or 0)
+        if interval_days > 0 and now - last_run >= interval_days * 86400:
+            return f"距上次回收已超过 {interval_days:g} 天"
+        min_free = float(self.config.get("disk_reclaim_min_free_gb") or 0)
+        if min_free > 0 and now - last_run >= self.THRESHOLD_COOLDOWN:
+            free = self.free_space_gb()
+            if free is not None and free < min_free:
+                return f"宿主机剩余空间 {free:.1f} GB 低于 {min_free:g} GB"
+        return ""
+
+    def check(self):
+        if not self.config.get("disk_reclaim_last_run"):
+            # 首次检查只记录起点，不立即回收
+            self.config.set("disk_reclaim_last_run", self.clock())
+            return ""
+        reason = self.due_reason()
+        if reason and self.trigger(reason):
+            self.config.set("disk_reclaim_last_run", self.clock())
+        return reason
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.wait(self.check_interval):
+            try:
+                self.check()
+            except Exception:
+                pass
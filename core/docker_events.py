@@ -0,0 +1,276 @@
+import json
+import posixpath
+import shlex
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, replace
+
+from core.readiness import ContainerState
+
+
+SERVICE_LABEL = "com.docker.compose.service"
+
+# 关心的容器生命周期动作，其余（attach / exec_start / top 等）忽略
+LIFECYCLE_ACTIONS = {"create", "start", "restart", "die", "oom", "kill", "stop", "destroy", "health_status"}
+
+EVENT_LABELS = {
+    "create": "已创建",
+    "start": "已启动",
+    "restart": "已重启",
+    "die": "已退出",
+    "oom": "内存不足被终止",
+    "kill": "收到终止信号",
+    "stop": "已停止",
+    "destroy": "已删除",
+    "health_status": "健康状态变化",
+}
+
+
+def compose_project(deploy_dir):
+    """Compose 默认以部署目录名作为项目名"""
+    return posixpath.basename(deploy_dir.rstrip("/"))
+
+
+def events_command(deploy_dir):
+    """订阅本 Compose 项目容器事件的命令，每行输出一个 JSON 事件"""
+    label = shlex.quote(f"label=com.docker.compose.project={compose_project(deploy_dir)}")
+    return f"docker events --format '{{{{json .}}}}' --filter type=container --filter {label}"
+
+
+@dataclass
+class ContainerEvent:
+    service: str
+    action: str          # LIFECYCLE_ACTIONS 中的动作
+    container_id: str = ""
+    exit_code: int = None
+    health: str = ""     # health_status 事件的健康状态
+    time: float = 0.0
+
+    def describe(self):
+        text = f"{self.service} {EVENT_LABELS.get(self.action, self.action)}"
+        if self.action == "health_status":
+            text += f": {self.health}"
+        elif self.action == "die" and self.exit_code is not None:
+            text += f"（退出码 {self.exit_code}）"
+        return text
+
+    @property
+    def abnormal(self):
+        return self.action == "oom" or (self.action == "die" and self.exit_code not in (None, 0)) \
+            or self.health == "unhealthy"
+
+
+def parse_event_line(line):
+    """解析 docker events 的一行 JSON，非容器生命周期事件返回 None"""
+    try:
+        data = json.loads(line)
+    except (TypeError, ValueError):
+        return None
+    if data.get("Type", "container") != "container":
+        return None
+    action = data.get("Action") or data.get("status") or ""
+    health = ""
+    if action.startswith("health_status"):
+        action, _, health = action.partition(":")
+        health = health.strip()
+    if action not in LIFECYCLE_ACTIONS:
+        return None
+    actor = data.get("Actor") or {}
+    attributes = actor.get("Attributes") or {}
+    service = attributes.get(SERVICE_LABEL)
+    if not service:
+        return None
+    exit_code = attributes.get("exitCode")
+    try:
+        exit_code = int(exit_code) if exit_code is not None else None
+    except ValueError:
+        exit_code = None
+    stamp = data.get("timeNano")
+    return ContainerEvent(
+        service=service,
+        action=action,
+        container_id=actor.get("ID") or data.get("id") or "",
+        exit_code=exit_code,
+        health=health,
+        time=stamp / 1e9 if stamp else float(data.get("time") or time.time()),
+    )
+
+
+class RestartCounter:
+    """按服务记录启动 / 重启时间，统计多个滑动时间窗内的重启次数"""
+
+    def __init__(self, windows=(300, 3600), clock=time.monotonic):
+        self.windows = tuple(windows)
+        self.clock = clock
+        self._history = defaultdict(deque)
+
+    def record(self, service):
+        history = self._history[service]
+        now = self.clock()
+        history.append(now)
+        while history and now - history[0] > max(self.windows):
+            history.popleft()
+
+    def count(self, service, window):
+        now = self.clock()
+        return sum(1 for at in self._history.get(service, ()) if now - at <= window)
+
+    def counts(self, service):
+        return {window: self.count(service, window) for window in self.windows}
+
+    def reset(self, service=None):
+        if service is None:
+            self._history.clear()
+        else:
+            self._history.pop(service, None)
+
+
+class ContainerStateTable:
+    """由一次快照初始化、之后由事件增量维护的容器状态表（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Condition()
+        self._states = {}
+        self._version = 0
+        self.seeded = False
+
+    def seed(self, states):
+        with self._lock:
+            self._states = dict(states)
+            self.seeded = True
+            self._version += 1
+            self._lock.notify_all()
+
+    def apply(self, event):
+        """按事件更新对应服务的状态，返回是否属于重启（容器退出后再次启动）"""
+        with self._lock:
+            state = self._states.get(event.service) or ContainerState(event.service, "created", "")
+            restarted = False
+            if event.action == "create":
+                state = ContainerState(event.service, "created", "")
+            elif event.action in ("start", "restart"):
+                restarted = event.action == "restart" or state.status in ("exited", "dead", "restarting")
+                state = replace(state, status="running", health="starting" if state.health else "",
+                                restarts=state.restarts + (1 if restarted else 0))
+            elif event.action == "die":
+                state = replace(state, status="exited",
+                                exit_code=event.exit_code if event.exit_code is not None else state.exit_code)
+            elif event.action == "health_status":
+                state = replace(state, health=event.health)
+            elif event.action == "destroy":
+                self._states.pop(event.service, None)
+                state = None
+            if state is not None:
+                self._states[event.service] = state
+            self._version += 1
+            self._lock.notify_all()
+            return restarted
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._states)
+
+    def wait_for_change(self, timeout):
+        """等待下一次状态变化或超时，供轮询方替代固定 sleep"""
+        with self._lock:
+            version = self._version
+            self._lock.wait_for(lambda: self._version != version, timeout)
+
+
+class DockerEventWatcher:
+    """
+    每个运行环境一个常驻的 docker events 订阅，维护容器状态表并分发生命周期事件。
+
+    open_stream() 返回 Popen 风格对象（stdout 按行输出 JSON 事件）；
+    fetch_states() 返回 {服务名: ContainerState}，在订阅建立和断线重连时刷新状态表。
+    on_event(event, restarts) 在每个事件上回调，restarts 为该服务各时间窗的重启次数。
+    """
+
+    def __init__(self, open_stream, fetch_states, on_event=None, log=None,
+                 restart_windows=(300, 3600), reconnect_delay=2.0, max_reconnect_delay=30.0):
+        self.open_stream = open_stream
+        self.fetch_states = fetch_states
+        self.on_event = on_event or (lambda event, restarts: None)
+        self.log = log or (lambda message, level="info": None)
+        self.table = ContainerStateTable()
+        self.restarts = RestartCounter(restart_windows)
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self._stop = threading.Event()
+        self._process = None
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        process = self._process
+        if process is not None and process.poll() is None:
+            try:
+                process.terminate()
+            except Exception:
+                pass
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    def snapshot(self):
+        return self.table.snapshot()
+
+    def crash_looping(self, service, threshold=3, window=300):
+        return self.restarts.count(service, window) >= threshold
+
+    def _run(self):
+        delay = self.reconnect_delay
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self._process = self.open_stream()
+                # 先订阅再取快照，订阅建立前错过的变化由快照补上
+                self._refresh()
+                for line in self._process.stdout:
+                    if self._stop.is_set():
+                        break
+                    if isinstance(line, bytes):
+                        line = line.decode("utf-8", errors="replace")
+                    event = parse_event_line(line.strip())
+                    if event is not None:
+                        self._dispatch(event)
+            except Exception as exc:
+                if not self._stop.is_set():
+                    self.log(f"[容器事件] 订阅异常: {exc}", "debug")
+            finally:
+                if self._process is not None and self._process.poll() is None:
+                    try:
+                        self._process.terminate()
+                    except Exception:
+                        pass
+            if self._stop.is_set():
+                break
+            # 订阅持续较久后断开（如运行环境重启）立即重连，短时间内反复断开则退避
+            delay = self.reconnect_delay if time.monotonic() - started > 60 else min(delay * 2, self.max_reconnect_delay)
+            self._stop.wait(delay)
+
+    def _refresh(self):
+        try:
+            self.table.seed(self.fetch_states())
+        except Exception as exc:
+            self.log(f"[容器事件] 获取容器状态失败: {exc}", "debug")
+
+    def _dispatch(self, event):
+        if self.table.apply(event):
+            self.restarts.record(event.service)
+        if event.action in ("start", "restart"):
+            # 事件里没有健康检查定义，容器（重新）启动时补一次快照以获得准确的健康状态
+            self._refresh()
+        try:
+            self.on_event(event, self.restarts.counts(event.service))
+        except Exception as exc:
+            self.log(f"[容器事件] 处理事件失败: {exc}", "debug")
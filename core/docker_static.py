@@ -0,0 +1,224 @@
+import hashlib
+import json
+from urllib.request import Request, urlopen
+
+from core.mirror_config import COMPOSE_RELEASE_BASE_URLS, DOCKER_STATIC_BASE_URLS
+from core.runtime_image_fetcher import RuntimeImageFetcher
+
+
+# 固定版本，升级时同时修改这里
+DOCKER_STATIC_VERSION = "27.3.1"
+COMPOSE_VERSION = "2.29.7"
+
+# 固定的 SHA-256 校验值（升级版本时用 python -m core.docker_static 重新生成）。
+# 下载和复用缓存时都必须与这里一致，未填写校验值的版本不会被安装，调用方回退到 apt 安装。
+PINNED_SHA256 = {
+    f"docker-{DOCKER_STATIC_VERSION}.tgz": "",
+    f"docker-compose-{COMPOSE_VERSION}-linux-x86_64": "",
+}
+
+# 安装到运行环境内的路径
+GUEST_BIN_DIR = "/usr/local/bin"
+GUEST_CLI_PLUGIN_DIR = "/usr/local/lib/docker/cli-plugins"
+
+# 运行环境缺少 iptables 时安装脚本的退出码，调用方据此回退到 apt 安装
+EXIT_MISSING_IPTABLES = 42
+
+
+def static_artifacts():
+    """返回 [(缓存文件名, 下载地址列表, 校验文件地址或 None)]"""
+    docker_name = f"docker-{DOCKER_STATIC_VERSION}.tgz"
+    compose_asset = "docker-compose-linux-x86_64"
+    compose_name = f"docker-compose-{COMPOSE_VERSION}-linux-x86_64"
+    compose_urls = [f"{base}/v{COMPOSE_VERSION}/{compose_asset}" for base in COMPOSE_RELEASE_BASE_URLS]
+    return [
+        (docker_name, [f"{base}/{docker_name}" for base in DOCKER_STATIC_BASE_URLS], None),
+        (compose_name, compose_urls, compose_urls[0] + ".sha256"),
+    ]
+
+
+def sha256_of(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class StaticDockerBundle:
+    """在宿主机产物缓存中准备 Docker 静态二进制包和 Compose 插件"""
+
+    def __init__(self, cache, log=None, progress=None):
+        self.cache = cache
+        self.log = log or (lambda message, level="info": None)
+        self.progress = progress or (lambda message: None)
+
+    def ensure(self):
+        """确保所有产物已缓存且校验通过，返回 (docker 静态包路径, compose 插件路径)，失败返回 None"""
+        unpinned = [name for name, _, _ in static_artifacts() if not PINNED_SHA256.get(name)]
+        if unpinned:
+            self.log(f"[Docker 静态包] ✗ {', '.join(unpinned)} 未固定 SHA-256 校验值，拒绝安装", "error")
+            return None
+        paths = []
+        for name, urls, _ in static_artifacts():
+            if not self._cached_ok(name):
+                self.cache.remove(name)
+                fetcher = RuntimeImageFetcher(urls, log=self.log, progress=self.progress)
+                if not fetcher.download(self.cache.path(name)):
+                    return None
+                if not self._verify_download(name):
+                    self.cache.remove(name)
+                    return None
+            paths.append(self.cache.path(name))
+        return tuple(paths)
+
+    def _cached_ok(self, name):
+        expected = PINNED_SHA256.get(name)
+        stamp = self.cache.read_stamp(name)
+        if not expected or not stamp or stamp.get("sha256") != expected:
+            return False
+        return sha256_of(self.cache.path(name)) == expected
+
+    def _verify_download(self, name):
+        actual = sha256_of(self.cache.path(name))
+        expected = PINNED_SHA256.get(name)
+        if actual != expected:
+            self.log(f"[Docker 静态包] ✗ {name} 校验失败（期望 {expected}，实际 {actual}）", "error")
+            return False
+        self.cache.write_stamp(name, sha256=actual)
+        return True
+
+    def _fetch_checksum(self, url):
+        try:
+            request = Request(url, headers={"User-Agent": "NekroAgent/1.0"})
+            with urlopen(request, timeout=30) as resp:
+                return resp.read().decode("utf-8", errors="replace").split()[0].strip().lower()
+        except Exception as exc:
+            self.log(f"[Docker 静态包] 获取校验文件失败: {exc}", "warning")
+            return ""
+
+
+def render_systemd_units():
+    """生成 containerd / docker 的 systemd 单元（与 moby contrib/init/systemd 保持一致）"""
+    return {
+        "/etc/systemd/system/containerd.service": f"""[Unit]
+Description=containerd container runtime
+Documentation=https://containerd.io
+After=network.target local-fs.target
+
+[Service]
+ExecStartPre=-/sbin/modprobe overlay
+ExecStart={GUEST_BIN_DIR}/containerd
+Type=notify
+Delegate=yes
+KillMode=process
+Restart=always
+RestartSec=5
+LimitNPROC=infinity
+LimitCORE=infinity
+TasksMax=infinity
+OOMScoreAdjust=-999
+
+[Install]
+WantedBy=multi-user.target
+""",
+        "/etc/systemd/system/docker.socket": """[Unit]
+Description=Docker Socket for the API
+
+[Socket]
+ListenStream=/run/docker.sock
+SocketMode=0660
+SocketUser=root
+SocketGroup=docker
+
+[Install]
+WantedBy=sockets.target
+""",
+        "/etc/systemd/system/docker.service": f"""[Unit]
+Description=Docker Application Container Engine
+Documentation=https://docs.docker.com
+After=network-online.target docker.socket containerd.service time-set.target
+Wants=network-online.target containerd.service
+Requires=docker.socket
+
+[Service]
+Type=notify
+ExecStart={GUEST_BIN_DIR}/dockerd -H fd:// --containerd=/run/containerd/containerd.sock
+ExecReload=/bin/kill -s HUP $MAINPID
+TimeoutStartSec=0
+RestartSec=2
+Restart=always
+StartLimitBurst=3
+StartLimitInterval=60s
+LimitNOFILE=infinity
+LimitNPROC=infinity
+LimitCORE=infinity
+TasksMax=infinity
+Delegate=yes
+KillMode=process
+OOMScoreAdjust=-500
+
+[Install]
+WantedBy=multi-user.target
+""",
+    }
+
+
+def build_install_script(docker_tgz, compose_bin, registry_mirrors, docker_user=None):
+    """
+    生成在运行环境内以 root 执行的安装脚本。
+    docker_tgz / compose_bin 为运行环境内可访问的路径。
+    """
+    daemon_json = json.dumps({"registry-mirrors": list(registry_mirrors)})
+    lines = [
+        "set -e",
+        f"command -v iptables >/dev/null 2>&1 || {{ echo '缺少 iptables，无法使用静态包安装' >&2; exit {EXIT_MISSING_IPTABLES}; }}",
+        'tmp_dir="$(mktemp -d)"',
+        f'tar -xzf "{docker_tgz}" -C "$tmp_dir"',
+        f'install -m 0755 "$tmp_dir"/docker/* {GUEST_BIN_DIR}/',
+        'rm -rf "$tmp_dir"',
+        f"mkdir -p {GUEST_CLI_PLUGIN_DIR}",
+        f'install -m 0755 "{compose_bin}" {GUEST_CLI_PLUGIN_DIR}/docker-compose',
+        "getent group docker >/dev/null || groupadd --system docker",
+        "mkdir -p /etc/docker",
+        f"cat > /etc/docker/daemon.json <<'NEKRO_EOF'\n{daemon_json}\nNEKRO_EOF",
+    ]
+    for path, content in render_systemd_units().items():
+        lines.append(f"cat > {path} <<'NEKRO_EOF'\n{content}NEKRO_EOF")
+    if docker_user:
+        lines.append(f"usermod -aG docker {docker_user}")
+    lines.extend([
+        "systemctl daemon-reload",
+        "systemctl enable containerd docker.socket docker >/dev/null 2>&1",
+        "systemctl restart containerd docker.socket docker",
+        "docker version >/dev/null",
+        "docker compose version",
+    ])
+    return "\n".join(lines) + "\n"
+
+
+if __name__ == "__main__":
+    # 升级版本时生成固定校验值：python -m core.docker_static
+    # 只从官方地址下载（不经镜像站），Compose 额外对照 Release 附带的 .sha256 文件，
+    # 确认无误后把输出替换到 PINNED_SHA256
+    import os
+    import sys
+    import tempfile
+
+    official = ("https://download.docker.com/", "https://github.com/")
+    bundle = StaticDockerBundle(None, log=lambda message, level="info": print(message, file=sys.stderr))
+    lines = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, urls, checksum_url in static_artifacts():
+            path = os.path.join(tmp, name)
+            fetcher = RuntimeImageFetcher([url for url in urls if url.startswith(official)], log=bundle.log)
+            if not fetcher.download(path):
+                sys.exit(f"{name} 下载失败")
+            actual = sha256_of(path)
+            published = bundle._fetch_checksum(checksum_url) if checksum_url else ""
+            if published and published != actual:
+                sys.exit(f"{name} 与官方 .sha256 不一致（官方 {published}，实际 {actual}）")
+            lines.append(f'    "{name}": "{actual}",')
+    print("PINNED_SHA256 = {")
+    print("\n".join(lines))
+    print("}")
@@ -0,0 +1,83 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+# 把 shell 变量转成 JSON 字符串内容（去掉换行、转义反斜杠和引号）
+SHELL_JSON_ESCAPE = r"""esc() { printf '%s' "$1" | tr -d '\r' | tr '\n\t' '  ' | sed -e 's/\\/\\\\/g' -e 's/"/\\"/g'; }
+"""
+
+# 在运行环境内一次性采集 Docker / Compose / 磁盘 / 镜像信息，输出单行 JSON。
+# 只依赖 bash 与 coreutils，未安装 Docker 时同样能输出结果。
+GUEST_PROBE_SCRIPT = SHELL_JSON_ESCAPE + r"""docker_ok=false; docker_version=""; docker_error=""
+compose_ok=false; compose_version=""
+images=""
+if command -v docker >/dev/null 2>&1; then
+    if out=$(timeout 25 docker info --format '{{.ServerVersion}}' 2>&1); then
+        docker_ok=true; docker_version=$out
+        for image in $(timeout 15 docker images --format '{{.Repository}}:{{.Tag}}' 2>/dev/null); do
+            images="$images${images:+,}\"$(esc "$image")\""
+        done
+    else
+        docker_error=$(printf '%s' "$out" | tail -n 3)
+    fi
+    if out=$(timeout 10 docker compose version --short 2>/dev/null); then
+        compose_ok=true; compose_version=$out
+    fi
+else
+    docker_error="docker: command not found"
+fi
+disk_free_mb=$(df -Pm / 2>/dev/null | awk 'NR==2 {print $4}')
+printf '{"docker":%s,"docker_version":"%s","docker_error":"%s","compose":%s,"compose_version":"%s","disk_free_mb":%s,"images":[%s]}\n' \
+    "$docker_ok" "$(esc "$docker_version")" "$(esc "$docker_error")" \
+    "$compose_ok" "$(esc "$compose_version")" "${disk_free_mb:-0}" "$images"
+"""
+
+
+def parse_probe_output(output):
+    """取输出中最后一行 JSON 对象，解析失败返回空字典"""
+    for line in reversed((output or "").splitlines()):
+        line = line.strip().strip("\x00")
+        if line.startswith("{"):
+            try:
+                data = json.loads(line)
+            except ValueError:
+                continue
+            return data if isinstance(data, dict) else {}
+    return {}
+
+
+def run_concurrently(probes, timeout=None):
+    """
+    并发执行互不依赖的检测，probes 为 {名称: callable}。
+    返回 {名称: 结果}，抛出异常的检测结果为该异常对象。
+    """
+    results = {}
+    if not probes:
+        return results
+    with ThreadPoolExecutor(max_workers=len(probes)) as pool:
+        futures = {name: pool.submit(func) for name, func in probes.items()}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result(timeout=timeout)
+            except Exception as exc:
+                results[name] = exc
+    return results
+
+
+class ProbeSnapshot:
+    """
+    环境检测快照：首次访问时执行一次采集，之后各检测步骤都从同一份结果推导，
+    避免每个步骤各自启动一轮命令。
+    """
+
+    def __init__(self, collect):
+        self._collect = collect
+        self._lock = threading.Lock()
+        self._data = None
+
+    def get(self):
+        with self._lock:
+            if self._data is None:
+                self._data = self._collect() or {}
+            return self._data
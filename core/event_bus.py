@@ -0,0 +1,265 @@
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field, fields
+
+
+@dataclass
+class LogEvent:
+    message: str
+    level: str = "info"
+    droppable = True             # 队列积压时可丢弃
+
+
+@dataclass
+class LogBatch:
+    """同一次分发中连续的日志行，合并后一次交给订阅方"""
+    lines: list = field(default_factory=list)   # [(message, level)]
+
+
+@dataclass
+class ContainerLogEvent:
+    service: str     # Compose 服务名
+    text: str
+    droppable = True
+
+
+@dataclass
+class LogWatchEvent:
+    rule: str        # 命中的监视规则名
+    service: str
+    text: str
+    groups: tuple = ()
+    level: str = "info"
+    message: str = ""
+
+
+@dataclass
+class ProgressEvent:
+    message: str
+    coalesce_key = "progress"    # 同一批次内只保留最新的一条
+
+
+@dataclass
+class PullProgressEvent:
+    phase: str       # start / stage / update / done / error
+    message: str
+
+    @property
+    def coalesce_key(self):
+        # 只有逐层进度可以合并，开始 / 阶段切换 / 结束必须按顺序送达
+        return "pull" if self.phase == "update" else None
+
+
+@dataclass
+class DockerInstallEvent:
+    success: bool
+
+
+@dataclass
+class StatusEvent:
+    status: str
+
+
+@dataclass
+class DeployInfoEvent:
+    info: dict
+
+
+@dataclass
+class InstallErrorEvent:
+    message: str
+
+
+@dataclass
+class BootFinishedEvent:
+    pass
+
+
+@dataclass
+class HealthEvent:
+    health: str      # service_watchdog.HEALTH_*
+    detail: str      # 延迟 / 恢复动作等说明
+
+
+@dataclass
+class ContainerLifecycleEvent:
+    event: object    # docker_events.ContainerEvent
+
+
+class Channel:
+    """
+    信号风格的发布入口，便于沿用 emit / connect 写法：
+    emit(*args) 发布 event_type(*args)，connect 的回调以事件字段为参数。
+    """
+
+    def __init__(self, bus, event_type):
+        self.bus = bus
+        self.event_type = event_type
+        self._adapters = {}
+
+    def emit(self, *args):
+        self.bus.publish(self.event_type(*args))
+
+    def connect(self, handler):
+        def adapter(event):
+            handler(*(getattr(event, item.name) for item in fields(event)))
+
+        self._adapters.setdefault(handler, []).append(adapter)
+        self.bus.subscribe(self.event_type, adapter)
+
+    def disconnect(self, handler):
+        adapters = self._adapters.get(handler)
+        if not adapters:
+            raise TypeError(f"{handler!r} 未连接")
+        self.bus.unsubscribe(self.event_type, adapters.pop())
+        if not adapters:
+            del self._adapters[handler]
+
+
+class EventBus:
+    """
+    后端到界面的事件总线，不依赖 Qt。
+
+    publish() 可在任意线程调用，只做一次 deque.append；消费方按固定帧率调用
+    dispatch()（界面用 ~30Hz 定时器，无界面时用 run()），在调用线程中回调订阅方。
+    每次分发前合并：带 coalesce_key 的事件只保留最新一条，连续日志合并为 LogBatch，
+    订阅 LogEvent 的回调仍逐行收到。
+
+    排队超过 max_pending 时（界面卡住未分发）先合并，再从最旧的日志类事件（droppable）丢起，
+    状态、部署信息等事件不丢；丢弃条数在下次分发时以一条警告日志告知。
+    """
+
+    MAX_PENDING = 20000
+
+    def __init__(self, max_pending=MAX_PENDING):
+        self._queue = deque()
+        self._handlers = {}
+        self._lock = threading.Lock()   # 只保护订阅表
+        self._queue_lock = threading.Lock()   # 裁剪与取出队列时互斥，publish 不加锁
+        self._local = threading.local()
+        self.max_pending = max_pending
+        self.dropped = 0
+
+    def channel(self, event_type):
+        return Channel(self, event_type)
+
+    def publish(self, event):
+        redirect = getattr(self._local, "redirect", None)
+        if redirect is not None:
+            event = redirect(event)
+            if event is None:
+                return
+        self._queue.append(event)
+        if len(self._queue) > self.max_pending:
+            self._trim()
+
+    def _trim(self):
+        """把队列裁剪到上限的 3/4，避免每次发布都触发"""
+        with self._queue_lock:
+            if len(self._queue) <= self.max_pending:
+                return
+            events = self._coalesce([self._queue.popleft() for _ in range(len(self._queue))])
+            excess = len(events) - self.max_pending * 3 // 4
+            kept = []
+            for event in events:
+                if excess > 0 and getattr(event, "droppable", False):
+                    excess -= 1
+                    self.dropped += 1
+                    continue
+                kept.append(event)
+            # 裁剪期间其他线程新发布的事件仍排在后面
+            self._queue.extendleft(reversed(kept))
+
+    @contextmanager
+    def redirected(self, redirect):
+        """在当前线程内，发布的事件先经 redirect(event) 转换，返回 None 的事件被丢弃"""
+        previous = getattr(self._local, "redirect", None)
+        self._local.redirect = redirect
+        try:
+            yield
+        finally:
+            self._local.redirect = previous
+
+    @property
+    def pending(self):
+        return len(self._queue)
+
+    def subscribe(self, event_type, handler):
+        with self._lock:
+            self._handlers[event_type] = self._handlers.get(event_type, ()) + (handler,)
+
+    def unsubscribe(self, event_type, handler):
+        with self._lock:
+            handlers = list(self._handlers.get(event_type, ()))
+            if handler in handlers:
+                handlers.remove(handler)
+                self._handlers[event_type] = tuple(handlers)
+
+    def drain(self):
+        """取出当前排队的全部事件并合并，返回按发布顺序排列的列表"""
+        with self._queue_lock:
+            batch = [self._queue.popleft() for _ in range(len(self._queue))]
+            dropped, self.dropped = self.dropped, 0
+        if dropped:
+            batch.insert(0, LogEvent(f"[事件总线] 界面处理不及，已丢弃 {dropped} 条日志", "warning"))
+
+        events = []
+        for event in self._coalesce(batch):
+            if isinstance(event, LogEvent):
+                if events and isinstance(events[-1], LogBatch):
+                    events[-1].lines.append((event.message, event.level))
+                else:
+                    events.append(LogBatch([(event.message, event.level)]))
+                continue
+            events.append(event)
+        return events
+
+    @staticmethod
+    def _coalesce(batch):
+        """带 coalesce_key 的事件只保留最新一条"""
+        latest = {}
+        for index, event in enumerate(batch):
+            key = getattr(event, "coalesce_key", None)
+            if key is not None:
+                latest[key] = index
+        return [
+            event for index, event in enumerate(batch)
+            if getattr(event, "coalesce_key", None) is None or latest[event.coalesce_key] == index
+        ]
+
+    def dispatch(self):
+        """分发一批事件，返回分发的事件数"""
+        events = self.drain()
+        handlers = self._handlers
+        for event in events:
+            if isinstance(event, LogBatch):
+                for handler in handlers.get(LogBatch, ()):
+                    self._call(handler, event)
+                line_handlers = handlers.get(LogEvent, ())
+                if line_handlers:
+                    for message, level in event.lines:
+                        for handler in line_handlers:
+                            self._call(handler, LogEvent(message, level))
+                continue
+            for handler in handlers.get(type(event), ()):
+                self._call(handler, event)
+        return len(events)
+
+    def run(self, stop_event, interval=1 / 30):
+        """无界面时在当前线程按固定间隔分发，直到 stop_event 被设置"""
+        while not stop_event.is_set():
+            started = time.monotonic()
+            self.dispatch()
+            stop_event.wait(max(0.0, interval - (time.monotonic() - started)))
+        self.dispatch()
+
+    @staticmethod
+    def _call(handler, event):
+        try:
+            handler(event)
+        except Exception:
+            # 订阅方的异常不能中断其余事件的分发
+            traceback.print_exc()
@@ -0,0 +1,103 @@
+import base64
+import hashlib
+import shlex
+
+from core.env_probe import SHELL_JSON_ESCAPE, parse_probe_output
+
+
+# 快速启动脚本版本，脚本逻辑变化时递增，旧版本记录的部署会先走一次完整流程
+FAST_START_VERSION = 2
+
+DRIFT_LABELS = {
+    "config": "部署配置缺失",
+    "docker": "Docker 服务不可用",
+    "compose": "Docker Compose 不可用",
+    "images": "镜像缺失",
+    "up": "Compose 启动失败",
+    "version": "快速启动脚本版本不匹配",
+    "output": "未获取到脚本结果",
+}
+
+
+def bundle_digest(*paths):
+    """随程序发布的部署文件（compose、.env 模板）的摘要，程序更新这些文件后快速启动标记随之失效"""
+    digest = hashlib.sha256()
+    for path in paths:
+        try:
+            with open(path, "rb") as fh:
+                digest.update(fh.read())
+        except OSError:
+            digest.update(b"missing")
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def fast_start_stamp(backend_key, deploy_mode, bundle):
+    """完整流程部署成功后写入配置的标记，标记一致才尝试快速启动；bundle 为 bundle_digest() 的结果"""
+    return f"{FAST_START_VERSION}:{backend_key}:{deploy_mode}:{bundle}"
+
+
+def build_fast_start_script(deploy_dir, extra_images=(), sudo=False):
+    """
+    生成在运行环境内一次执行完的启动脚本：检查部署配置 → 启动 Docker →
+    确认 Compose 所需镜像均已存在 → compose up -d，最后输出单行 JSON 结果。
+    任何一步与已知状态不符时不做修复，只在结果中报告 drift，由宿主机改走完整流程。
+    """
+    root = "sudo -n " if sudo else ""
+    extras = " ".join(shlex.quote(image) for image in extra_images)
+    return SHELL_JSON_ESCAPE + f"""started=$(date +%s%3N)
+deploy_dir={shlex.quote(deploy_dir)}
+drift=""; detail=""; missing=""; env_b64=""
+report() {{
+    printf '{{"version":{FAST_START_VERSION},"ok":%s,"drift":"%s","detail":"%s","missing_images":[%s],"env":"%s","elapsed_ms":%s}}\\n' \\
+        "$([ -z "$drift" ] && echo true || echo false)" "$drift" "$(esc "$detail")" "$missing" "$env_b64" \\
+        "$(( $(date +%s%3N) - started ))"
+    exit 0
+}}
+compose() {{ docker compose -f "$deploy_dir/docker-compose.yml" --env-file "$deploy_dir/.env" "$@"; }}
+
+if [ ! -f "$deploy_dir/.env" ] || [ ! -f "$deploy_dir/docker-compose.yml" ]; then
+    drift=config; report
+fi
+env_b64=$(base64 -w0 "$deploy_dir/.env")
+
+if ! docker info >/dev/null 2>&1; then
+    {root}systemctl start docker >/dev/null 2>&1
+    for i in $(seq 30); do docker info >/dev/null 2>&1 && break; sleep 1; done
+    docker info >/dev/null 2>&1 || {{ drift=docker; detail=$(docker info 2>&1 | tail -n 2); report; }}
+fi
+
+images=$(compose config --images 2>/dev/null) || {{ drift=compose; detail="docker compose config 失败"; report; }}
+for image in $images {extras}; do
+    docker image inspect "$image" >/dev/null 2>&1 || missing="$missing${{missing:+,}}\\"$(esc "$image")\\""
+done
+[ -n "$missing" ] && {{ drift=images; report; }}
+
+if ! out=$(cd "$deploy_dir" && compose up -d 2>&1); then
+    drift=up; detail=$(printf '%s' "$out" | tail -n 5)
+fi
+report
+"""
+
+
+def parse_fast_start_result(output):
+    """解析脚本输出，env 字段解码为 .env 文本；版本不一致或无输出时视为 drift"""
+    result = parse_probe_output(output)
+    if not result:
+        return {"ok": False, "drift": "output", "detail": "", "missing_images": [], "env": ""}
+    if result.get("version") != FAST_START_VERSION:
+        result.update(ok=False, drift="version")
+    try:
+        result["env"] = base64.b64decode(result.get("env") or "").decode("utf-8", errors="replace")
+    except ValueError:
+        result["env"] = ""
+    return result
+
+
+def describe_drift(result):
+    reason = DRIFT_LABELS.get(result.get("drift"), result.get("drift") or "未知原因")
+    if result.get("missing_images"):
+        reason += "：" + "、".join(result["missing_images"])
+    elif result.get("detail"):
+        reason += f"：{result['detail']}"
+    return reason
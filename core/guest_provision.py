@@ -0,0 +1,108 @@
+import json
+
+
+# 首次启动时由 cloud-init 执行的安装脚本及其日志
+PROVISION_SCRIPT_PATH = "/usr/local/sbin/nekro-provision.sh"
+PROVISION_LOG_PATH = "/var/log/nekro-provision.log"
+
+# 日志中的阶段标记行：NEKRO_STAGE|<阶段>|<start/ok/fail>|<说明>
+STAGE_MARKER = "NEKRO_STAGE"
+
+STAGE_LABELS = {
+    "mirror": "写入 Ubuntu 镜像源",
+    "deps": "安装前置依赖",
+    "docker": "安装 Docker",
+    "daemon": "配置 Docker 镜像加速",
+    "service": "启动 Docker 服务",
+    "verify": "校验 Docker 环境",
+    "done": "首次启动配置完成",
+}
+
+
+def parse_stage_line(line):
+    """解析阶段标记行，返回 (阶段, 状态, 说明)，普通日志行返回 None"""
+    if not line.startswith(STAGE_MARKER + "|"):
+        return None
+    parts = line.rstrip("\r\n").split("|", 3)
+    if len(parts) < 3:
+        return None
+    return parts[1], parts[2], parts[3] if len(parts) > 3 else ""
+
+
+def is_terminal_stage(stage, status):
+    return status == "fail" or (stage == "done" and status == "ok")
+
+
+def build_provision_script(username, apt_lines, docker_apt_mirrors, registry_mirrors):
+    """
+    生成在虚拟机内以 root 执行的 Docker 安装脚本。
+    所有输出写入 PROVISION_LOG_PATH，宿主机通过一条 SSH 连接跟踪该文件获取进度。
+    """
+    daemon_json = json.dumps({"registry-mirrors": list(registry_mirrors), "features": {"buildkit": True}})
+    mirror_attempts = "\n".join(
+        f"    [ \"$installed\" = 1 ] || {{ try_docker_repo '{name}' '{url}' && installed=1; }}"
+        for name, url in docker_apt_mirrors
+    )
+    apt_sources = "\n".join(apt_lines)
+    return f"""#!/bin/bash
+exec >>{PROVISION_LOG_PATH} 2>&1
+export DEBIAN_FRONTEND=noninteractive
+
+stage() {{ echo "{STAGE_MARKER}|$1|$2|$3"; }}
+run_stage() {{
+    local name="$1"; shift
+    stage "$name" start
+    if "$@"; then stage "$name" ok; else stage "$name" fail "exit $?"; exit 1; fi
+}}
+
+write_sources() {{
+    cat > /etc/apt/sources.list <<'NEKRO_EOF'
+{apt_sources}
+NEKRO_EOF
+}}
+
+try_docker_repo() {{
+    echo "使用 Docker 源: $1"
+    install -m 0755 -d /etc/apt/keyrings &&
+    curl -fsSL "$2/linux/ubuntu/gpg" | gpg --batch --yes --dearmor -o /etc/apt/keyrings/docker.gpg &&
+    chmod a+r /etc/apt/keyrings/docker.gpg &&
+    echo "deb [arch=$(dpkg --print-architecture) signed-by=/etc/apt/keyrings/docker.gpg] $2/linux/ubuntu $(. /etc/os-release && echo $VERSION_CODENAME) stable" > /etc/apt/sources.list.d/docker.list &&
+    apt-get update &&
+    apt-get install -y docker-ce docker-ce-cli containerd.io docker-buildx-plugin docker-compose-plugin
+}}
+
+install_docker() {{
+    installed=0
+{mirror_attempts}
+    [ "$installed" = 1 ]
+}}
+
+write_daemon_json() {{
+    mkdir -p /etc/docker &&
+    cat > /etc/docker/daemon.json <<'NEKRO_EOF'
+{daemon_json}
+NEKRO_EOF
+}}
+
+start_docker() {{
+    usermod -aG docker {username} && systemctl enable docker && systemctl restart docker
+}}
+
+verify_docker() {{
+    docker info >/dev/null && docker compose version
+}}
+
+run_stage mirror write_sources
+run_stage deps bash -c "apt-get update && apt-get install -y ca-certificates curl gnupg lsb-release"
+run_stage docker install_docker
+run_stage daemon write_daemon_json
+run_stage service start_docker
+run_stage verify verify_docker
+stage done ok
+"""
+
+
+def indent_block(content, spaces):
+    """把多行文本缩进后嵌入 cloud-config 的 YAML 块标量"""
+    pad = " " * spaces
+    return "\n".join(pad + line if line else "" for line in content.splitlines())
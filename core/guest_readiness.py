@@ -0,0 +1,172 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+READY_PATH = "/ready"
+
+
+async def probe_ssh_banner(host, port, timeout=0.5):
+    """建立 TCP 连接并读取 SSH 版本标识行，sshd 已在监听时返回 True"""
+    writer = None
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        banner = await asyncio.wait_for(reader.readline(), timeout)
+        return banner.startswith(b"SSH-")
+    except (OSError, asyncio.TimeoutError):
+        return False
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+async def _wait_for_banner(host, port, stop_event, initial_delay, max_delay):
+    delay = initial_delay
+    while not (stop_event and stop_event.is_set()):
+        if await probe_ssh_banner(host, port, timeout=max(max_delay, 0.2)):
+            return True
+        await asyncio.sleep(delay)
+        delay = min(delay * 1.5, max_delay)
+    return False
+
+
+async def _wait_until_ready(host, port, timeout, listener, stop_event, initial_delay, max_delay):
+    loop = asyncio.get_running_loop()
+    beacon = asyncio.Event()
+    tasks = {"ssh": asyncio.ensure_future(_wait_for_banner(host, port, stop_event, initial_delay, max_delay))}
+    if listener is not None:
+        unsubscribe = listener.subscribe(lambda: loop.call_soon_threadsafe(beacon.set))
+        tasks["phone-home"] = asyncio.ensure_future(beacon.wait())
+    else:
+        unsubscribe = None
+    try:
+        pending = set(tasks.values())
+        deadline = loop.time() + timeout
+        while pending:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return ""
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            if stop_event and stop_event.is_set():
+                return ""
+            for source, task in tasks.items():
+                if task in done and task.result() is not False:
+                    return source
+        return ""
+    finally:
+        if unsubscribe:
+            unsubscribe()
+        for task in tasks.values():
+            task.cancel()
+
+
+def wait_until_ready(host, port, timeout, listener=None, stop_event=None, initial_delay=0.05, max_delay=0.5):
+    """
+    同时等待 SSH 端口出现版本标识和虚拟机主动回报（如启用），先到者为准。
+    返回就绪来源 "ssh" / "phone-home"，超时或被停止时返回空字符串。
+    """
+    return asyncio.run(_wait_until_ready(host, port, timeout, listener, stop_event, initial_delay, max_delay))
+
+
+class PhoneHomeListener:
+    """
+    在宿主机网关地址上监听虚拟机的就绪回报。
+
+    虚拟机开机单元在 sshd / docker 就绪后请求 GET /ready?token=...，
+    令牌匹配时记录请求参数并通知所有订阅者。
+    """
+
+    def __init__(self, host, port, token):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.ready = threading.Event()
+        self.payload = {}
+        self.reported_at = None
+        self._server = None
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        listener = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                if url.path != READY_PATH or params.pop("token", "") != listener.token:
+                    self.send_response(403)
+                    self.end_headers()
+                    return
+                # 先记录再应答，虚拟机收到 204 时宿主机已确认就绪
+                listener._mark_ready(params)
+                self.send_response(204)
+                self.end_headers()
+
+            do_POST = do_GET
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError:
+            self._server = None
+            return False
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.2}, daemon=True).start()
+        return True
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def subscribe(self, callback):
+        """注册就绪回调（已就绪时立即调用），返回取消订阅函数"""
+        with self._lock:
+            self._callbacks.append(callback)
+            already_ready = self.ready.is_set()
+        if already_ready:
+            callback()
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._callbacks:
+                    self._callbacks.remove(callback)
+
+        return unsubscribe
+
+    def reset(self):
+        self.ready.clear()
+        self.payload = {}
+        self.reported_at = None
+
+    def _mark_ready(self, params):
+        with self._lock:
+            self.payload = params
+            self.reported_at = time.time()
+            self.ready.set()
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            callback()
+
+
+def render_ready_unit(gateway_ip, port, token):
+    """生成虚拟机内的就绪回报 systemd 单元，每次开机在 sshd 与 docker 之后执行"""
+    url = f"http://{gateway_ip}:{port}{READY_PATH}?token={token}"
+    return f"""[Unit]
+Description=Report readiness to Nekro Agent host
+After=network-online.target ssh.service docker.service
+Wants=network-online.target
+
+[Service]
+Type=oneshot
+ExecStart=/bin/sh -c 'for i in $$(seq 120); do curl -fsS -m 2 "{url}&docker=$$(systemctl is-active docker)" && exit 0; sleep 1; done; exit 0'
+
+[Install]
+WantedBy=multi-user.target
+"""
@@ -9,8 +9,27 @@ import tempfile
 import threading
 import time
 
+from core.artifact_cache import ArtifactCache
 from core.backend_base import BackendBase
+from core.disk_reclaim import DiskReclaimer
+from core.docker_events import events_command
+from core.docker_static import StaticDockerBundle, build_install_script
+from core.env_probe import GUEST_PROBE_SCRIPT, ProbeSnapshot, parse_probe_output, run_concurrently
+from core.fast_start import build_fast_start_script, bundle_digest, describe_drift, fast_start_stamp, parse_fast_start_result
+from core.guest_provision import (
+    PROVISION_LOG_PATH,
+    PROVISION_SCRIPT_PATH,
+    STAGE_LABELS,
+    build_provision_script,
+    indent_block,
+    is_terminal_stage,
+    parse_stage_line,
+)
+from core.guest_readiness import PhoneHomeListener, render_ready_unit, wait_until_ready
 from core.hyperv_manager import HyperVManager
+from core.log_follower import logs_command
+from core.metrics import STATS_COMMAND
+from core.readiness import ReadinessTracker, inspect_command, parse_inspect_output
 from core.mirror_config import (
     APT_MIRROR_LINES,
     DOCKER_APT_MIRRORS,
@@ -18,15 +37,21 @@ from core.mirror_config import (
     UBUNTU_CLOUD_IMAGE_URLS,
 )
 from core.runtime_image_fetcher import RuntimeImageFetcher
+from core.sizing import compute_profile, describe_profile, read_host_resources
 from core.ssh_transport import SSHTransport
 
 
+# 产物缓存中的只读基础盘，各虚拟机以差分盘方式挂在其上
+BASE_VHDX_NAME = "ubuntu-hyperv-base.vhdx"
+BASE_VHDX_FORMAT = 1
+
+
 class HyperVBackend(BackendBase):
     backend_key = "hyperv"
     display_name = "Hyper-V"
 
-    def __init__(self, config=None, parent=None):
-        super().__init__(config=config, parent=parent)
+    def __init__(self, config=None):
+        super().__init__(config=config)
         self.vm_name = self.config.get("hyperv_vm_name")
         self.switch_name = self.config.get("hyperv_switch_name")
         self.nat_name = self.config.get("hyperv_nat_name")
@@ -38,6 +63,9 @@ class HyperVBackend(BackendBase):
         self.base_path = self._resolve_base_path()
         self._stop_event = threading.Event()
         self._pending_deploy_info = None
+        self._guest_provisioning = False
+        self._phone_home = None
+        self._reclaim_lock = threading.Lock()
         self.manager = HyperVManager(self.vm_name, self.switch_name, self.nat_name, self.subnet)
         self.transport = SSHTransport(
             self.guest_ip,
@@ -46,24 +74,71 @@ class HyperVBackend(BackendBase):
             private_key=self.config.get("hyperv_ssh_key_path") or None,
         )
 
-    def _emit_pull_progress(self, phase, message):
-        self.progress_updated.emit(f"__pull_progress__|{phase}|{message}")
+    def attach_prewarmer(self, prewarmer):
+        super().attach_prewarmer(prewarmer)
+        if prewarmer is not None:
+            self._adopt_prewarm_session()
+
+    def _adopt_prewarm_session(self):
+        # 预热线程启动虚拟机时可能已打开提权会话，等其结束后交给 manager 复用
+        def _adopt():
+            self.prewarmer.wait()
+            self.manager.adopt_session(self.prewarmer.session)
+
+        threading.Thread(target=_adopt, daemon=True).start()
+
+    def _probe_environment(self):
+        """并发采集宿主机与虚拟机状态；虚拟机可达时再通过一次 SSH 执行运行环境内探测"""
+        self.log_received.emit("[环境检测] 并发采集 Hyper-V 与虚拟机状态...", "info")
+        started = time.time()
+        results = run_concurrently({
+            "host": self.manager.get_host_facts,
+            "vm_exists": self.manager.vm_exists,
+            "can_force_enable": self.manager.can_force_enable_on_home,
+            "image_cached": lambda: os.path.exists(os.path.join(self._runtime_cache_dir(), BASE_VHDX_NAME)),
+        })
+        for name, value in results.items():
+            if isinstance(value, Exception):
+                self.log_received.emit(f"[环境检测] {name} 检测异常: {value}", "debug")
+                results[name] = {} if name == "host" else False
+        snapshot = dict(results, key_ready=self._ssh_key_ready(), ssh_ready=False, guest={})
+
+        host = snapshot["host"]
+        if host.get("hyperv_enabled") and host.get("management_available") and snapshot["vm_exists"] and snapshot["key_ready"]:
+            snapshot["ssh_ready"] = self.wait_for_ssh_ready(timeout=12)
+            if snapshot["ssh_ready"]:
+                snapshot["guest"] = self._probe_guest()
+        self.log_received.emit(f"[环境检测] 采集完成，用时 {time.time() - started:.1f}s", "debug")
+        return snapshot
+
+    def _probe_guest(self):
+        try:
+            code, stdout, stderr = self.transport.exec("bash -s", timeout=60, input=GUEST_PROBE_SCRIPT)
+        except Exception as exc:
+            self.log_received.emit(f"[环境检测] 虚拟机内探测异常: {exc}", "debug")
+            return {}
+        data = parse_probe_output(stdout)
+        if not data and code != 0:
+            self.log_received.emit(f"[环境检测] 虚拟机内探测失败: {stderr or stdout}", "debug")
+        return data
 
     def get_check_funcs(self):
-        """返回 4 个检测步骤的 callable 列表，每个返回 (passed, detail)"""
+        """返回 4 个检测步骤的 callable 列表，每个返回 (passed, detail)；所有步骤共享一次并发采集的快照"""
+        snapshot = ProbeSnapshot(self._probe_environment)
         ctx = {}
 
         def check_hyperv():
-            edition = self.manager.get_windows_edition() or "Unknown"
-            is_home = self.manager.is_home_edition()
-            self.log_received.emit(f"[环境检测] Windows 版本: {edition}", "info")
+            host = snapshot.get()["host"]
+            can_force = snapshot.get()["can_force_enable"]
+            is_home = host.get("is_home", False)
+            self.log_received.emit(f"[环境检测] Windows 版本: {host.get('edition') or 'Unknown'}", "info")
 
-            hyperv_enabled = self.manager.is_hyperv_enabled()
-            management_available = self.manager.is_hyperv_management_available()
+            hyperv_enabled = host.get("hyperv_enabled", False)
+            management_available = host.get("management_available", False)
 
             if hyperv_enabled:
                 self.log_received.emit("[环境检测] ✓ Hyper-V 已启用", "info")
-            elif is_home and self.manager.can_force_enable_on_home():
+            elif is_home and can_force:
                 self.log_received.emit("[环境检测] ✗ Hyper-V 未启用，检测到家庭版，可尝试强制启用", "warning")
             else:
                 self.log_received.emit("[环境检测] ✗ Hyper-V 未启用", "error")
@@ -76,20 +151,17 @@ class HyperVBackend(BackendBase):
             ok = hyperv_enabled and management_available
             ctx["hyperv"] = ok
             detail = ""
-            if not ok and is_home and self.manager.can_force_enable_on_home():
+            if not ok and is_home and can_force:
                 detail = "家庭版可尝试强制启用"
             return (ok, detail)
 
         def check_vm():
-            cache_dir = self._runtime_cache_dir()
-            image_path = os.path.join(cache_dir, "ubuntu-hyperv.vhdx")
-            if os.path.exists(image_path):
+            if snapshot.get()["image_cached"]:
                 self.log_received.emit("[环境检测] ✓ 已发现本地基础镜像缓存", "info")
             else:
                 self.log_received.emit("[环境检测] 未发现本地基础镜像缓存，创建时会尝试下载", "warning")
 
-            vm_exists = self.manager.vm_exists()
-            if vm_exists:
+            if snapshot.get()["vm_exists"]:
                 self.log_received.emit(f"[环境检测] ✓ 虚拟机 {self.vm_name} 已存在", "info")
                 ctx["vm"] = True
                 return (True, self.vm_name)
@@ -100,22 +172,25 @@ class HyperVBackend(BackendBase):
             if not ctx.get("hyperv") or not ctx.get("vm"):
                 return (False, "")
 
-            key_ready = self._ssh_key_ready()
-            if key_ready:
+            if snapshot.get()["key_ready"]:
                 self.log_received.emit("[环境检测] ✓ SSH 密钥已准备", "info")
             else:
                 self.log_received.emit("[环境检测] ✗ SSH 密钥未准备", "warning")
                 return (False, "SSH 未就绪")
 
-            ssh_ready = self.wait_for_ssh_ready(timeout=12)
-            if not ssh_ready:
+            if not snapshot.get()["ssh_ready"]:
                 self.log_received.emit("[环境检测] ✗ SSH 尚未就绪", "warning")
                 return (False, "SSH 未就绪")
 
             self.log_received.emit("[环境检测] ✓ SSH 初始化已完成", "info")
-            docker_ready = self._guest_command_ok("docker info", timeout=30)
-            if docker_ready:
-                self.log_received.emit("[环境检测] ✓ Docker 可用", "info")
+            guest = snapshot.get()["guest"]
+            if guest.get("docker"):
+                self.log_received.emit(
+                    f"[环境检测] ✓ Docker 可用（{guest.get('docker_version', '')}），"
+                    f"本地镜像 {len(guest.get('images') or [])} 个，"
+                    f"剩余空间 {int(guest.get('disk_free_mb') or 0) / 1024:.1f} GB",
+                    "info",
+                )
                 ctx["docker"] = True
                 return (True, "SSH 已就绪")
             self.log_received.emit("[环境检测] ✗ Docker 不可用", "warning")
@@ -124,9 +199,9 @@ class HyperVBackend(BackendBase):
         def check_compose():
             if not ctx.get("docker"):
                 return (False, "")
-            compose_ready = self._guest_command_ok("docker compose version", timeout=20)
-            if compose_ready:
-                self.log_received.emit("[环境检测] ✓ Docker Compose 可用", "info")
+            guest = snapshot.get()["guest"]
+            if guest.get("compose"):
+                self.log_received.emit(f"[环境检测] ✓ Docker Compose 可用（{guest.get('compose_version', '')}）", "info")
                 return (True, "")
             self.log_received.emit("[环境检测] ✗ Docker Compose 不可用", "warning")
             return (False, "")
@@ -176,37 +251,9 @@ class HyperVBackend(BackendBase):
             self.log_received.emit(f"[Hyper-V] 创建目录失败: {exc}", "error")
             return False
 
-        base_image = os.path.join(self._runtime_cache_dir(), "ubuntu-hyperv.vhd")
-        base_vhdx = base_image.replace(".vhd", ".vhdx")
-        if not os.path.exists(base_image) and not os.path.exists(base_vhdx):
-            # 下载 VHD tar.gz 并解压
-            tar_path = base_image + ".tar.gz"
-            fetcher = RuntimeImageFetcher(
-                UBUNTU_CLOUD_IMAGE_URLS,
-                log=self.log_received.emit,
-                progress=self.progress_updated.emit,
-            )
-            if not fetcher.download(tar_path):
-                self.log_received.emit("[Hyper-V] 基础镜像下载失败", "error")
-                return False
-
-            self.progress_updated.emit("正在解压基础镜像...")
-            try:
-                import tarfile
-                with tarfile.open(tar_path, "r:gz") as tar:
-                    for member in tar.getmembers():
-                        if member.name.endswith(".vhd"):
-                            member.name = os.path.basename(base_image)
-                            tar.extract(member, path=os.path.dirname(base_image))
-                            break
-                    else:
-                        self.log_received.emit("[Hyper-V] tar.gz 中未找到 .vhd 文件", "error")
-                        return False
-                os.remove(tar_path)
-            except Exception as exc:
-                self.log_received.emit(f"[Hyper-V] 解压失败: {exc}", "error")
-                return False
-            self.log_received.emit("[Hyper-V] 基础镜像准备完成", "info")
+        base_vhdx = self._prepare_base_disk(install_dir)
+        if not base_vhdx:
+            return False
 
         self.progress_updated.emit("准备 SSH 密钥...")
         key_path = self._ensure_ssh_keypair(install_dir)
@@ -222,10 +269,27 @@ class HyperVBackend(BackendBase):
             return False
 
         self.progress_updated.emit("创建虚拟机...")
-        ok, vm_vhdx = self.manager.create_vm(install_dir, base_image)
+        host = read_host_resources(install_dir)
+        profile = compute_profile(host, self.config.get("deploy_mode"))
+        self.log_received.emit(f"[资源规格] {describe_profile(profile, host)}", "info")
+        for warning in profile.warnings:
+            self.log_received.emit(f"[资源规格] {warning}", "warning")
+        disk_started = time.time()
+        ok, vm_vhdx = self.manager.create_vm(install_dir, base_vhdx, profile)
         if not ok:
             self.log_received.emit("[Hyper-V] 创建虚拟机失败", "error")
             return False
+        if self.config.get("hyperv_disk_mode") == "standalone":
+            self.progress_updated.emit("合并差分磁盘...")
+            ok, vm_vhdx = self.manager.flatten_disk(vm_vhdx)
+            if not ok:
+                self.log_received.emit("[Hyper-V] 合并差分磁盘失败", "error")
+                return False
+        self.log_received.emit(
+            f"[Hyper-V] 虚拟磁盘就绪，耗时 {time.time() - disk_started:.1f}s，"
+            f"占用 {self._file_size_mb(vm_vhdx):.0f} MB",
+            "info",
+        )
         self.log_received.emit(f"[Hyper-V] 虚拟磁盘路径: {vm_vhdx}", "info")
 
         mac_address = self.manager.get_vm_mac_address()
@@ -234,7 +298,7 @@ class HyperVBackend(BackendBase):
             return False
 
         self.progress_updated.emit("写入 cloud-init 引导盘...")
-        seed_disk = self._build_cloud_init_seed(install_dir, mac_address, key_path)
+        seed_disk = self._build_cloud_init_seed(install_dir, mac_address, key_path, swap_mb=profile.swap_mb)
         if not seed_disk:
             return False
         if not self.manager.attach_seed_disk(seed_disk):
@@ -242,7 +306,7 @@ class HyperVBackend(BackendBase):
             return False
 
         self.progress_updated.emit("启动虚拟机...")
-        if not self.manager.start_vm():
+        if not self._start_vm():
             self.log_received.emit("[Hyper-V] 启动虚拟机失败", "error")
             return False
 
@@ -305,18 +369,18 @@ class HyperVBackend(BackendBase):
     def install_docker(self):
         if not self._ssh_key_ready():
             self.log_received.emit("[Hyper-V] SSH 密钥未准备，请先创建运行环境", "error")
-            self.progress_updated.emit("__docker_fail__")
+            self._emit_docker_result(False)
             return False
         if not self.wait_for_ssh_ready(timeout=20):
             self.log_received.emit("[Hyper-V] SSH 尚未就绪，无法安装 Docker", "error")
-            self.progress_updated.emit("__docker_fail__")
+            self._emit_docker_result(False)
             return False
 
         self.log_received.emit("[Hyper-V] 开始通过 SSH 安装 Docker...", "info")
 
         def _do_install():
             success = self._install_docker_sync()
-            self.progress_updated.emit("__docker_done__" if success else "__docker_fail__")
+            self._emit_docker_result(success)
 
         threading.Thread(target=_do_install, daemon=True).start()
         return True
@@ -327,38 +391,38 @@ class HyperVBackend(BackendBase):
 
         self.status_changed.emit("启动中...")
         self._stop_event.clear()
+        self._deploy_started = time.time()
 
         def _start():
+            self._await_prewarm()
             if not self.wait_for_ssh_ready(timeout=20):
                 self.log_received.emit("[Hyper-V] SSH 未就绪，无法部署服务", "error")
                 self.status_changed.emit("启动失败")
                 return
 
-            if deploy_mode == "napcat":
-                compose_file = "docker-compose_with_napcat.yml"
-            else:
-                compose_file = "docker-compose_withnot_napcat.yml"
+            deploy_dir = f"/home/{self.username}/nekro_agent"
+            if self._fast_start_eligible(deploy_mode) and self._fast_start(deploy_dir, deploy_mode):
+                return
 
-            compose_src = os.path.join(self.base_path, compose_file)
-            env_src = os.path.join(self.base_path, "env")
+            compose_src, env_src = self._bundle_files(deploy_mode)
             if not os.path.exists(compose_src):
                 self.log_received.emit(f"Compose 文件不存在: {compose_src}", "error")
                 self.status_changed.emit("启动失败")
                 return
 
-            deploy_dir = f"/home/{self.username}/nekro_agent"
             data_dir = self.config.get("data_dir") or f"/home/{self.username}/nekro_agent_data"
 
             try:
                 self._guest_exec(f"mkdir -p {deploy_dir} {data_dir}")
                 env_exists = self._guest_exec(f"test -f {deploy_dir}/.env && echo yes").strip() == "yes"
 
+                # compose 文件随程序更新（如健康检查定义），用户改动过的先备份
+                if not self._sync_compose_file(compose_src, deploy_dir, self._copy_to_guest):
+                    self.status_changed.emit("启动失败")
+                    return
                 if not env_exists:
                     self.log_received.emit("[Hyper-V] 首次部署，上传 Compose 配置", "info")
                     env_content = self._prepare_env(env_src, data_dir)
-                    if not self._copy_to_guest(compose_src, f"{deploy_dir}/docker-compose.yml"):
-                        self.status_changed.emit("启动失败")
-                        return
                     if not self._write_to_guest(env_content, f"{deploy_dir}/.env"):
                         self.status_changed.emit("启动失败")
                         return
@@ -400,11 +464,15 @@ class HyperVBackend(BackendBase):
                     return
 
                 self.is_running = True
+                if self.config.get("fast_start"):
+                    self.config.set("fast_start_stamp", self._fast_start_stamp(deploy_mode))
                 if not env_exists:
                     self._pending_deploy_info = (env_content, deploy_mode)
                     self._show_deploy_info(env_content, deploy_mode)
                     self._pending_deploy_info = None
-                self.status_changed.emit("运行中")
+                self.log_received.emit("[Hyper-V] Compose 服务已启动，等待就绪...", "info")
+                self.start_log_followers()
+                self._wait_ready(deploy_dir)
             except Exception as exc:
                 self.log_received.emit(f"[Hyper-V] 启动异常: {exc}", "error")
                 self.status_changed.emit("启动失败")
@@ -412,7 +480,123 @@ class HyperVBackend(BackendBase):
         threading.Thread(target=_start, daemon=True).start()
         return True
 
+    def _bundle_files(self, deploy_mode):
+        """随程序发布的 compose 文件与 .env 模板"""
+        if deploy_mode == "napcat":
+            compose_file = "docker-compose_with_napcat.yml"
+        else:
+            compose_file = "docker-compose_withnot_napcat.yml"
+        return os.path.join(self.base_path, compose_file), os.path.join(self.base_path, "env")
+
+    def _fast_start_stamp(self, deploy_mode):
+        return fast_start_stamp(self.backend_key, deploy_mode, bundle_digest(*self._bundle_files(deploy_mode)))
+
+    def _fast_start_eligible(self, deploy_mode):
+        if not self.config.get("fast_start"):
+            return False
+        stamp = self.config.get("fast_start_stamp")
+        if stamp and stamp != self._fast_start_stamp(deploy_mode):
+            self.log_received.emit("[Hyper-V] 部署文件或部署模式已变化，本次使用完整启动流程同步配置", "info")
+            return False
+        return bool(stamp)
+
+    def _fast_start(self, deploy_dir, deploy_mode):
+        """一次 SSH 调用完成检查与 compose up，成功返回 True，状态不符时清除标记并返回 False"""
+        self.log_received.emit("[Hyper-V] 检测到已验证的部署，快速启动 Compose 服务...", "info")
+        started = time.time()
+        script = build_fast_start_script(deploy_dir, ["kromiose/nekro-agent-sandbox"], sudo=True)
+        try:
+            _, stdout, _ = self.transport.exec("bash -s", timeout=180, input=script)
+            result = parse_fast_start_result(stdout)
+        except Exception as exc:
+            result = {"ok": False, "drift": "output", "detail": str(exc)}
+
+        if not result.get("ok"):
+            self.log_received.emit(f"[Hyper-V] 快速启动未完成（{describe_drift(result)}），改用完整启动流程", "warning")
+            self.config.set("fast_start_stamp", "")
+            return False
+
+        self.is_running = True
+        self.log_received.emit(f"[Hyper-V] Compose 服务已启动（快速启动 {time.time() - started:.1f}s），等待就绪...", "info")
+        self.start_log_followers()
+        self._wait_ready(deploy_dir)
+        return True
+
+    def _wait_ready(self, deploy_dir):
+        """根据容器状态与 compose 健康检查等待服务就绪，容器异常退出时提前失败"""
+        started = time.time()
+        self.start_event_watcher()
+        tracker = ReadinessTracker(
+            self.container_states,
+            timeout=300,
+            log=self.log_received.emit,
+            stop_event=self._stop_event,
+            sleep=self._wait_container_change,
+        )
+        ok, detail = tracker.wait()
+        if self._stop_event.is_set():
+            return
+        if ok:
+            self.log_received.emit(f"[Hyper-V] 服务已就绪！(耗时 {time.time() - started:.1f}s)", "info")
+            self.boot_finished.emit()
+            self.status_changed.emit("运行中")
+            self._start_monitoring()
+            return
+
+        self.log_received.emit(f"[Hyper-V] 服务启动失败: {detail}", "error")
+        for service in [state.service for state in tracker.states.values() if not state.ready][:2]:
+            _, tail, _ = self.transport.exec(
+                f"cd {deploy_dir} && docker compose -f docker-compose.yml --env-file .env logs --no-color --tail=20 {service}",
+                timeout=30,
+            )
+            if tail.strip():
+                self.log_received.emit(f"{service} 最近日志:\n{tail.strip()}", "error")
+        self.status_changed.emit("启动超时" if tracker.timed_out else "启动失败")
+
+    def recover_services(self, step):
+        """看门狗的恢复动作：重启异常容器 / 重启全部容器 / 重启虚拟机内的 dockerd"""
+        deploy_dir = f"/home/{self.username}/nekro_agent"
+        compose = f"cd {deploy_dir} && docker compose -f docker-compose.yml --env-file .env"
+        if step == "runtime":
+            # 重启虚拟机需要提权，无人值守时改为重启 dockerd
+            command = f"sudo -n systemctl restart docker && {compose} up -d"
+        elif step == "stack":
+            command = f"{compose} restart"
+        else:
+            services = [state.service for state in self.container_states().values() if not state.ready] or ["nekro_agent"]
+            command = f"{compose} restart {' '.join(services)}"
+        code, stdout, stderr = self.transport.exec(command, timeout=240)
+        if code != 0:
+            self.log_received.emit(f"[看门狗] 恢复命令失败: {(stderr or stdout).strip()[-300:]}", "error")
+        return code == 0
+
+    def _open_event_stream(self):
+        return self.transport.popen(events_command(f"/home/{self.username}/nekro_agent"))
+
+    def _open_log_stream(self, service, since):
+        return self.transport.popen(logs_command(f"/home/{self.username}/nekro_agent", service, since, env_file=True))
+
+    def _fetch_container_states(self):
+        _, output, _ = self.transport.exec(inspect_command(f"/home/{self.username}/nekro_agent"), timeout=30)
+        return parse_inspect_output(output)
+
+    def _runtime_exec(self, command, timeout=60):
+        return self.transport.exec(command, timeout=timeout)[1]
+
+    def _virtual_disk_bytes(self):
+        total = 0
+        for root, _, files in os.walk(self.get_default_install_dir()):
+            total += sum(os.path.getsize(os.path.join(root, name)) for name in files if name.lower().endswith(".vhdx"))
+        return total
+
+    def _default_data_dir(self):
+        return f"/home/{self.username}/nekro_agent_data"
+
+    def _open_stats_stream(self):
+        return self.transport.popen(STATS_COMMAND)
+
     def stop_services(self):
+        self._stop_monitoring()
         self._stop_event.set()
         was_running = self.is_running
         self.is_running = False
@@ -439,6 +623,8 @@ class HyperVBackend(BackendBase):
     def update_services(self):
         self.log_received.emit("[Hyper-V] 开始更新服务...", "info")
         self.status_changed.emit("更新中...")
+        # 更新期间服务会短暂不可用，暂停看门狗避免误判
+        self.stop_watchdog()
 
         def _update():
             deploy_dir = f"/home/{self.username}/nekro_agent"
@@ -474,6 +660,7 @@ class HyperVBackend(BackendBase):
 
                 self.log_received.emit("[Hyper-V] 服务更新完成", "info")
                 self.status_changed.emit("运行中")
+                self.start_watchdog()
             except Exception as exc:
                 self.log_received.emit(f"[Hyper-V] 更新异常: {exc}", "error")
                 self.status_changed.emit("更新失败")
@@ -481,6 +668,8 @@ class HyperVBackend(BackendBase):
         threading.Thread(target=_update, daemon=True).start()
 
     def uninstall_environment(self):
+        self._stop_monitoring()
+
         def _uninstall():
             self.status_changed.emit("卸载中...")
             install_dir = self.get_default_install_dir()
@@ -504,6 +693,7 @@ class HyperVBackend(BackendBase):
                 self.config.set("deploy_mode", "")
                 self.config.set("data_dir", "")
                 self.config.set("deploy_info", None)
+                self.config.set("fast_start_stamp", "")
                 self.config.set("hyperv_install_dir", "")
                 self.config.set("hyperv_ssh_key_path", "")
                 self.config.set("hyperv_seed_disk", "")
@@ -513,33 +703,199 @@ class HyperVBackend(BackendBase):
 
         threading.Thread(target=_uninstall, daemon=True).start()
 
+    def reclaim_disk(self):
+        if not self._reclaim_lock.acquire(blocking=False):
+            self.log_received.emit("[磁盘回收] 已有回收任务在进行中", "warning")
+            return False
+
+        def _stop_runtime():
+            # 先停掉看门狗与各监控线程，避免关机期间被判定为故障并触发恢复
+            self._stop_monitoring()
+            return self.manager.shutdown_vm()
+
+        def _reclaim():
+            try:
+                vhdx_path = self.manager.get_vm_disk_path()
+                if not vhdx_path or not os.path.exists(vhdx_path):
+                    self.log_received.emit("[磁盘回收] 未找到虚拟机磁盘", "error")
+                    return
+                reclaimer = DiskReclaimer(
+                    run_guest=self._reclaim_in_guest,
+                    stop_runtime=_stop_runtime,
+                    compact_disk=lambda: self.manager.compact_disk(vhdx_path),
+                    start_runtime=lambda: self._start_vm() and self.wait_for_ssh_ready(timeout=180),
+                    disk_size=lambda: os.path.getsize(vhdx_path),
+                    log=self.log_received.emit,
+                )
+                self.status_changed.emit("磁盘回收中...")
+                result = reclaimer.run()
+                self.config.set("disk_reclaim_last_run", time.time())
+                if not self.is_running:
+                    self.status_changed.emit("已停止")
+                elif not result.restarted:
+                    self.is_running = False
+                    self.status_changed.emit("启动失败")
+                else:
+                    # 虚拟机重启后 compose 服务随 dockerd 恢复，重新等待就绪并启动监控
+                    self.status_changed.emit("启动中...")
+                    self.start_log_followers()
+                    self._wait_ready(f"/home/{self.username}/nekro_agent")
+            finally:
+                self._reclaim_lock.release()
+
+        threading.Thread(target=_reclaim, daemon=True).start()
+        return True
+
+    def _reclaim_in_guest(self, script):
+        if not self.wait_for_ssh_ready(timeout=20):
+            return False, ""
+        if not self._write_to_guest(script, "/tmp/nekro-reclaim.sh"):
+            return False, ""
+        try:
+            code, stdout, _ = self.transport.exec("sudo bash /tmp/nekro-reclaim.sh", timeout=900)
+        except Exception as exc:
+            self.log_received.emit(f"[磁盘回收] 运行环境内清理异常: {exc}", "warning")
+            return False, ""
+        return code == 0, stdout
+
     def get_runtime_name(self):
         return self.vm_name
 
     def get_host_access_path(self, guest_path):
         return ""
 
+    def _prepare_base_disk(self, install_dir):
+        """
+        确保产物缓存中有转换好的只读基础盘 (.vhdx)。
+        只在首次使用时下载并转换，之后创建虚拟机只需新建差分盘。
+        已有差分盘引用旧基础盘时不重建，继续沿用旧盘。
+        """
+        cache = ArtifactCache.from_config(self.config, self.base_path)
+        base_vhdx = cache.path(BASE_VHDX_NAME)
+        stamp = cache.read_stamp(BASE_VHDX_NAME)
+        if stamp and stamp.get("format") == BASE_VHDX_FORMAT:
+            self.log_received.emit("[Hyper-V] 复用已缓存的基础磁盘", "info")
+            return base_vhdx
+
+        # 本机虚拟机的差分盘可能已不在 Hyper-V 中注册（虚拟机被删除），也要算作引用
+        candidates = [os.path.join(install_dir, f"{self.vm_name}.vhdx")]
+        if os.path.exists(base_vhdx):
+            children = self.manager.find_child_disks(base_vhdx, candidates)
+            if children is None:
+                self.log_received.emit("[Hyper-V] 无法确认基础磁盘是否仍被引用，暂不重建", "warning")
+                return base_vhdx
+            if children:
+                self.log_received.emit(
+                    f"[Hyper-V] 基础磁盘仍被 {len(children)} 个差分盘引用，暂不重建，继续沿用: "
+                    + ", ".join(children),
+                    "warning",
+                )
+                return base_vhdx
+
+        source_image = cache.path("ubuntu-hyperv.vhd")
+        if not os.path.exists(source_image):
+            # 下载 VHD tar.gz 并解压
+            tar_path = source_image + ".tar.gz"
+            fetcher = RuntimeImageFetcher(
+                UBUNTU_CLOUD_IMAGE_URLS,
+                log=self.log_received.emit,
+                progress=self.progress_updated.emit,
+            )
+            if not fetcher.download(tar_path):
+                self.log_received.emit("[Hyper-V] 基础镜像下载失败", "error")
+                return ""
+
+            self.progress_updated.emit("正在解压基础镜像...")
+            try:
+                import tarfile
+                with tarfile.open(tar_path, "r:gz") as tar:
+                    for member in tar.getmembers():
+                        if member.name.endswith(".vhd"):
+                            member.name = os.path.basename(source_image)
+                            tar.extract(member, path=os.path.dirname(source_image))
+                            break
+                    else:
+                        self.log_received.emit("[Hyper-V] tar.gz 中未找到 .vhd 文件", "error")
+                        return ""
+                os.remove(tar_path)
+            except Exception as exc:
+                self.log_received.emit(f"[Hyper-V] 解压失败: {exc}", "error")
+                return ""
+
+        self.progress_updated.emit("正在转换基础磁盘（仅首次）...")
+        started = time.time()
+        if not self.manager.prepare_base_disk(source_image, base_vhdx, candidates):
+            self.log_received.emit("[Hyper-V] 基础磁盘转换失败", "error")
+            return ""
+        cache.write_stamp(
+            BASE_VHDX_NAME,
+            format=BASE_VHDX_FORMAT,
+            source=os.path.basename(source_image),
+        )
+        try:
+            os.remove(source_image)
+        except OSError:
+            pass
+        self.log_received.emit(
+            f"[Hyper-V] 基础磁盘准备完成，耗时 {time.time() - started:.1f}s，"
+            f"大小 {self._file_size_mb(base_vhdx):.0f} MB",
+            "info",
+        )
+        return base_vhdx
+
+    @staticmethod
+    def _file_size_mb(path):
+        try:
+            return os.path.getsize(path) / (1024 * 1024)
+        except OSError:
+            return 0.0
+
     def _runtime_cache_dir(self):
-        configured = self.config.get("runtime_image_cache") or "runtime_cache"
-        if os.path.isabs(configured):
-            return configured
-        return os.path.join(self.base_path, configured)
+        return ArtifactCache.from_config(self.config, self.base_path).root
 
     def _configure_portproxy(self):
         self.manager.ensure_portproxy(8021, self.guest_ip, 8021)
         self.manager.ensure_portproxy(6099, self.guest_ip, 6099)
 
+    def _start_vm(self):
+        """启动虚拟机；先清除上一次开机的就绪回报，避免等待时误判为已就绪"""
+        listener = self._ensure_phone_home()
+        if listener:
+            listener.reset()
+        return self.manager.start_vm()
+
     def wait_for_ssh_ready(self, timeout=180):
         deadline = time.time() + timeout
-        while time.time() < deadline:
+        source = wait_until_ready(self.guest_ip, self.ssh_port, timeout, listener=self._ensure_phone_home())
+        if not source:
+            return False
+        self.log_received.emit(f"[Hyper-V] 虚拟机已就绪（{source}）", "debug")
+
+        # 端口就绪后确认密钥登录可用
+        while True:
             try:
                 code, stdout, _ = self.transport.exec("echo ok", timeout=10)
                 if code == 0 and stdout.strip() == "ok":
                     return True
             except Exception:
                 pass
-            time.sleep(5)
-        return False
+            if time.time() + 1 >= deadline:
+                return False
+            time.sleep(1)
+
+    def _ensure_phone_home(self):
+        """按需在网关地址上启动就绪回报监听，无法监听时返回 None 并只依赖端口探测"""
+        if self._phone_home is None and self.config.get("hyperv_phone_home"):
+            token = self.config.get("hyperv_phone_home_token")
+            if not token:
+                return None
+            listener = PhoneHomeListener(self.gateway_ip, self.config.get("hyperv_phone_home_port"), token)
+            if listener.start():
+                self._phone_home = listener
+            else:
+                self._phone_home = False
+                self.log_received.emit("[Hyper-V] 就绪回报监听启动失败，改用端口探测", "debug")
+        return self._phone_home or None
 
     def _resolve_base_path(self):
         if getattr(sys, "frozen", False):
@@ -602,10 +958,7 @@ class HyperVBackend(BackendBase):
         self.transport.private_key = key_path
         return key_path
 
-    def _build_cloud_init_seed(self, install_dir, raw_mac, key_path):
-        seed_dir = os.path.join(install_dir, "cloud-init")
-        os.makedirs(seed_dir, exist_ok=True)
-
+    def _build_cloud_init_seed(self, install_dir, raw_mac, key_path, swap_mb=0):
         try:
             with open(f"{key_path}.pub", "r", encoding="utf-8") as fh:
                 public_key = fh.read().strip()
@@ -616,6 +969,45 @@ class HyperVBackend(BackendBase):
         mac = ":".join(raw_mac[i:i + 2] for i in range(0, len(raw_mac), 2)).lower()
         prefix_length = self.subnet.split("/")[1]
 
+        # cloud-init 模式下首次启动时直接在虚拟机内完成 Docker 安装，宿主机只跟踪进度并校验结果
+        self._guest_provisioning = self.config.get("hyperv_provision_mode") == "cloud-init"
+        if self._guest_provisioning:
+            provision_script = build_provision_script(
+                self.username,
+                APT_MIRROR_LINES,
+                DOCKER_APT_MIRRORS,
+                DOCKER_REGISTRY_MIRRORS,
+            )
+            packages_section = ""
+            provision_files = f"""  - path: {PROVISION_SCRIPT_PATH}
+    permissions: '0755'
+    content: |
+{indent_block(provision_script, 6)}
+"""
+            provision_runcmd = f"  - [bash, {PROVISION_SCRIPT_PATH}]\n"
+        else:
+            packages_section = "package_update: true\npackages:\n  - openssh-server\n"
+            provision_files = ""
+            provision_runcmd = ""
+
+        ready_files = ""
+        ready_runcmd = ""
+        if self.config.get("hyperv_phone_home"):
+            token = self.config.get("hyperv_phone_home_token")
+            if not token:
+                token = self._random_token(24)
+                self.config.set("hyperv_phone_home_token", token)
+            ready_unit = render_ready_unit(self.gateway_ip, self.config.get("hyperv_phone_home_port"), token)
+            ready_files = f"""  - path: /etc/systemd/system/nekro-ready.service
+    permissions: '0644'
+    content: |
+{indent_block(ready_unit, 6)}
+"""
+            ready_runcmd = "  - systemctl enable --now --no-block nekro-ready.service\n"
+
+        if swap_mb:
+            packages_section += f"swap:\n  filename: /swap.img\n  size: {swap_mb * 1024 * 1024}\n  maxsize: {swap_mb * 1024 * 1024}\n"
+
         user_data = f"""#cloud-config
 users:
   - name: {self.username}
@@ -626,20 +1018,17 @@ users:
     lock_passwd: true
     ssh_authorized_keys:
       - {public_key}
-package_update: true
-packages:
-  - openssh-server
-write_files:
+{packages_section}write_files:
   - path: /etc/ssh/sshd_config.d/99-nekro-agent.conf
     permissions: '0644'
     content: |
       PasswordAuthentication no
       PubkeyAuthentication yes
       PermitRootLogin no
-runcmd:
+{provision_files}{ready_files}runcmd:
   - systemctl enable ssh
   - systemctl restart ssh
-"""
+{provision_runcmd}{ready_runcmd}"""
         meta_data = f"instance-id: {self.vm_name}\nlocal-hostname: {self.vm_name}\n"
         network_config = f"""version: 2
 ethernets:
@@ -659,16 +1048,13 @@ ethernets:
         - 1.1.1.1
 """
 
-        for name, content in {
+        seed_disk = os.path.join(install_dir, "cloud-init-seed.iso")
+        seed_files = {
             "user-data": user_data,
             "meta-data": meta_data,
             "network-config": network_config,
-        }.items():
-            with open(os.path.join(seed_dir, name), "w", encoding="utf-8", newline="\n") as fh:
-                fh.write(content)
-
-        seed_disk = os.path.join(install_dir, "cloud-init-seed.iso")
-        if not self.manager.create_seed_disk(seed_disk, seed_dir):
+        }
+        if not self.manager.create_seed_disk(seed_disk, seed_files):
             self.log_received.emit("[Hyper-V] 生成 cloud-init 引导盘失败", "error")
             return ""
 
@@ -709,6 +1095,17 @@ ethernets:
 
     def _install_docker_sync(self):
         self.log_received.emit("[Hyper-V] 开始安装 Docker...", "info")
+        if self._guest_provisioning:
+            if self._follow_guest_provision() and self._verify_guest_docker():
+                self.log_received.emit("[Hyper-V] Docker 安装完成（首次启动配置）", "info")
+                return True
+            self.log_received.emit("[Hyper-V] 首次启动配置未完成，改用 SSH 逐步安装", "warning")
+
+        if self.config.get("docker_provision_mode") == "static":
+            if self._install_docker_static():
+                return True
+            self.log_received.emit("[Hyper-V] 静态包安装失败，改用 apt 安装", "warning")
+
         apt_sources = "\n".join(APT_MIRROR_LINES)
         steps = [
             (
@@ -766,14 +1163,118 @@ ethernets:
         ):
             return False
 
+        if not self._verify_guest_docker():
+            return False
+
+        self.log_received.emit("[Hyper-V] Docker 安装完成", "info")
+        return True
+
+    def _verify_guest_docker(self):
         if not self._guest_command_ok("docker info", timeout=30):
             self.log_received.emit("[Hyper-V] Docker daemon 启动后仍不可用", "error")
             return False
         if not self._guest_command_ok("docker compose version", timeout=20):
             self.log_received.emit("[Hyper-V] Docker Compose 安装后仍不可用", "error")
             return False
+        return True
 
-        self.log_received.emit("[Hyper-V] Docker 安装完成", "info")
+    def _follow_guest_provision(self, timeout=900):
+        """通过一条 SSH 连接跟踪虚拟机内首次启动配置日志，直到出现结束标记"""
+        command = (
+            f"if [ ! -e {PROVISION_LOG_PATH} ] && cloud-init status 2>/dev/null | grep -q 'status: done'; then "
+            "echo 'NEKRO_STAGE|provision|fail|未找到首次启动配置日志'; exit 0; fi; "
+            f"sudo tail -n +1 -F {PROVISION_LOG_PATH} 2>/dev/null"
+        )
+        args = [
+            "ssh",
+            *self.transport._base_args(),
+            f"{self.username}@{self.guest_ip}",
+            command,
+        ]
+        try:
+            proc = subprocess.Popen(
+                args,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                encoding="utf-8",
+                errors="replace",
+            )
+        except Exception as exc:
+            self.log_received.emit(f"[Hyper-V] 跟踪首次启动配置失败: {exc}", "error")
+            return False
+
+        timer = threading.Timer(timeout, proc.kill)
+        timer.daemon = True
+        timer.start()
+        succeeded = False
+        finished = False
+        try:
+            for line in proc.stdout:
+                parsed = parse_stage_line(line)
+                if parsed is None:
+                    if line.strip():
+                        self.log_received.emit(f"[cloud-init] {line.strip()}", "debug")
+                    continue
+                stage, status, message = parsed
+                label = STAGE_LABELS.get(stage, stage)
+                if status == "start":
+                    self.progress_updated.emit(f"{label}...")
+                elif status == "ok":
+                    self.log_received.emit(f"[Hyper-V] ✓ {label}", "info")
+                else:
+                    self.log_received.emit(f"[Hyper-V] {label}失败 {message}".strip(), "error")
+                if is_terminal_stage(stage, status):
+                    succeeded = status == "ok"
+                    finished = True
+                    break
+        finally:
+            timer.cancel()
+            if proc.poll() is None:
+                proc.kill()
+            proc.wait()
+
+        if not finished:
+            self.log_received.emit("[Hyper-V] 首次启动配置超时或连接中断", "error")
+        return succeeded
+
+    def _install_docker_static(self):
+        """上传宿主机缓存的 Docker 静态二进制包并在虚拟机内安装，不依赖 apt"""
+        self.progress_updated.emit("准备 Docker 静态安装包...")
+        bundle = StaticDockerBundle(
+            ArtifactCache.from_config(self.config, self.base_path),
+            log=self.log_received.emit,
+            progress=self.progress_updated.emit,
+        )
+        paths = bundle.ensure()
+        if not paths:
+            return False
+
+        remote_dir = "/tmp/nekro-docker"
+        if not self._run_guest_step(f"mkdir -p {remote_dir}", "创建上传目录"):
+            return False
+        remote_paths = []
+        for path in paths:
+            remote_path = f"{remote_dir}/{os.path.basename(path)}"
+            self.progress_updated.emit(f"上传 {os.path.basename(path)}...")
+            if not self._copy_to_guest(path, remote_path):
+                return False
+            remote_paths.append(remote_path)
+
+        script = build_install_script(*remote_paths, DOCKER_REGISTRY_MIRRORS, docker_user=self.username)
+        if not self._write_to_guest(script, f"{remote_dir}/install.sh"):
+            return False
+        self.progress_updated.emit("安装 Docker 静态二进制...")
+        if not self._run_guest_step(
+            f"sudo bash {remote_dir}/install.sh && rm -rf {remote_dir}",
+            "Docker 静态包安装",
+            timeout=300,
+        ):
+            return False
+        if not self._guest_command_ok("docker info", timeout=30):
+            self.log_received.emit("[Hyper-V] Docker daemon 启动后仍不可用", "error")
+            return False
+        self.log_received.emit("[Hyper-V] Docker 静态包安装完成", "info")
         return True
 
     def _run_guest_step(self, command, desc, timeout=180):
@@ -1,16 +1,25 @@
+import json
 import os
 import subprocess
 
+from core.disk_reclaim import compact_vhdx_command
+from core.iso_builder import write_iso
 from core.powershell import run_powershell, ElevatedSession
+from core.sizing import hyperv_sizing_command
+
+
+# 家庭版 EditionID（小写）
+HOME_EDITIONS = {"core", "coren", "corecountryspecific", "coresinglelanguage"}
 
 
 class HyperVManager:
-    def __init__(self, vm_name, switch_name, nat_name, subnet):
+    def __init__(self, vm_name, switch_name, nat_name, subnet, session=None):
         self.vm_name = vm_name
         self.switch_name = switch_name
         self.nat_name = nat_name
         self.subnet = subnet
-        self._elevated = None
+        # 可注入已有的提权会话（或任何提供 run/stop 的对象），默认首次使用时创建
+        self._elevated = session
 
     def _admin(self):
         """获取或创建提权会话（首次使用时弹 UAC）"""
@@ -18,6 +27,15 @@ class HyperVManager:
             self._elevated = ElevatedSession()
         return self._elevated
 
+    @property
+    def session(self):
+        return self._elevated
+
+    def adopt_session(self, session):
+        """复用其他组件已打开的提权会话，避免再次弹 UAC"""
+        if self._elevated is None and session is not None:
+            self._elevated = session
+
     def is_hyperv_enabled(self):
         result = run_powershell(
             "(Get-Service vmms -ErrorAction SilentlyContinue).Status"
@@ -31,8 +49,7 @@ class HyperVManager:
         return result.stdout.strip() if result.ok else ""
 
     def is_home_edition(self):
-        edition = self.get_windows_edition().lower()
-        return edition in {"core", "coren", "corecountryspecific", "coreSingleLanguage".lower()}
+        return self.get_windows_edition().lower() in HOME_EDITIONS
 
     def is_hyperv_management_available(self):
         result = run_powershell(
@@ -40,6 +57,31 @@ class HyperVManager:
         )
         return result.ok and result.stdout == "yes"
 
+    def get_host_facts(self):
+        """一次 PowerShell 调用读取 Windows 版本、vmms 服务状态和 Hyper-V 管理命令是否可用"""
+        result = run_powershell(
+            "[pscustomobject]@{ "
+            "edition = (Get-ItemProperty 'HKLM:\\SOFTWARE\\Microsoft\\Windows NT\\CurrentVersion').EditionID; "
+            "vmms = [string](Get-Service vmms -ErrorAction SilentlyContinue).Status; "
+            "management = [bool](Get-Command Get-VM -ErrorAction SilentlyContinue) "
+            "} | ConvertTo-Json -Compress"
+        )
+        facts = {"edition": "", "is_home": False, "hyperv_enabled": False, "management_available": False}
+        if not result.ok:
+            return facts
+        try:
+            data = json.loads(result.stdout)
+        except ValueError:
+            return facts
+        edition = data.get("edition") or ""
+        facts.update(
+            edition=edition,
+            is_home=edition.lower() in HOME_EDITIONS,
+            hyperv_enabled="Running" in (data.get("vmms") or ""),
+            management_available=bool(data.get("management")),
+        )
+        return facts
+
     def can_force_enable_on_home(self):
         packages_dir = os.path.join(
             os.environ.get("SystemRoot", r"C:\Windows"),
@@ -87,26 +129,71 @@ class HyperVManager:
             self._show_error_window("配置 NAT", command, result)
         return result.ok
 
-    def create_vm(self, vm_dir, base_vhdx):
+    @staticmethod
+    def _child_disks_script(base_vhdx, candidates=()):
+        """
+        列出以 base_vhdx 为父盘的磁盘：已注册虚拟机的磁盘加上 candidates 中存在的文件。
+        Get-VHD 返回的 ParentPath 为反斜杠路径，统一为正斜杠后比较（-eq 不区分大小写）。
+        """
+        extra = "".join(f" + @('{path}')" for path in (path.replace("\\", "/") for path in candidates))
+        return (
+            f"(@(Get-VM | Get-VMHardDiskDrive | ForEach-Object {{ $_.Path }}){extra}) | "
+            "Where-Object { $_ -and (Test-Path $_) } | Sort-Object -Unique | "
+            "ForEach-Object { Get-VHD -Path $_ -ErrorAction SilentlyContinue } | "
+            f"Where-Object {{ $_.ParentPath -and (($_.ParentPath -replace '\\\\', '/') -eq '{base_vhdx}') }} | "
+            "ForEach-Object { $_.Path }"
+        )
+
+    def find_child_disks(self, base_vhdx, candidates=()):
+        """返回仍以 base_vhdx 为父盘的差分盘路径；查询失败时返回 None"""
+        base_vhdx = base_vhdx.replace("\\", "/")
+        result = self._admin().run(self._child_disks_script(base_vhdx, candidates))
+        if not result.ok:
+            return None
+        return [line.strip() for line in result.stdout.splitlines() if line.strip()]
+
+    def prepare_base_disk(self, source_image, base_vhdx, candidates=()):
+        """
+        把下载的 .vhd 一次性转换为动态 .vhdx 基础盘并设为只读，供各虚拟机的差分盘共用。
+        差分盘按父盘的标识引用基础盘，替换后原有虚拟机将无法启动，
+        因此基础盘仍被引用时拒绝替换（candidates 为未注册但可能存在的差分盘路径）。
+        """
+        source_image = source_image.replace("\\", "/")
+        base_vhdx = base_vhdx.replace("\\", "/")
+        partial = base_vhdx[: -len(".vhdx")] + ".partial.vhdx"
+        command = (
+            f"if (Test-Path '{base_vhdx}') {{ "
+            f"$children = @({self._child_disks_script(base_vhdx, candidates)}); "
+            f"if ($children.Count -gt 0) {{ throw ('基础磁盘仍被差分盘引用，拒绝替换: ' + ($children -join ', ')) }} }}; "
+            f"if (Test-Path '{partial}') {{ Remove-Item '{partial}' -Force }}; "
+            f"Convert-VHD -Path '{source_image}' -DestinationPath '{partial}' -VHDType Dynamic; "
+            f"if (Test-Path '{base_vhdx}') {{ Remove-Item '{base_vhdx}' -Force }}; "
+            f"Move-Item -Path '{partial}' -Destination '{base_vhdx}'; "
+            f"Set-ItemProperty -Path '{base_vhdx}' -Name IsReadOnly -Value $true"
+        )
+        result = self._admin().run(command, timeout=600)
+        if not result.ok:
+            self._show_error_window("转换基础磁盘", command, result)
+        return result.ok
+
+    def create_vm(self, vm_dir, base_vhdx, profile=None):
+        """以只读基础盘为父盘创建差分磁盘并创建虚拟机，不复制基础盘数据；profile 为资源规格"""
         os.makedirs(vm_dir, exist_ok=True)
         vm_vhdx = os.path.join(vm_dir, f"{self.vm_name}.vhdx").replace("\\", "/")
         base_vhdx = base_vhdx.replace("\\", "/")
-        # 支持传入 .vhd，自动转换为 .vhdx
-        if base_vhdx.endswith(".vhd") and not base_vhdx.endswith(".vhdx"):
-            convert_step = (
-                f"if (-not (Test-Path '{vm_vhdx}')) {{ "
-                f"Convert-VHD -Path '{base_vhdx}' -DestinationPath '{vm_vhdx}' -VHDType Dynamic }}; "
-            )
+        if profile:
+            startup_memory = f"{profile.memory_mb}MB"
+            sizing = hyperv_sizing_command(self.vm_name, profile)
         else:
-            convert_step = (
-                f"if (-not (Test-Path '{vm_vhdx}')) {{ Copy-Item -Path '{base_vhdx}' -Destination '{vm_vhdx}' -Force }}; "
-            )
+            startup_memory = "4GB"
+            sizing = f"Set-VMProcessor -VMName '{self.vm_name}' -Count 2 | Out-Null"
         command = (
-            convert_step
-            + f"if (-not (Get-VM -Name '{self.vm_name}' -ErrorAction SilentlyContinue)) {{ "
-            f"New-VM -Name '{self.vm_name}' -MemoryStartupBytes 4GB -Generation 2 -VHDPath '{vm_vhdx}' "
+            f"if (-not (Test-Path '{vm_vhdx}')) {{ "
+            f"New-VHD -Path '{vm_vhdx}' -ParentPath '{base_vhdx}' -Differencing | Out-Null }}; "
+            f"if (-not (Get-VM -Name '{self.vm_name}' -ErrorAction SilentlyContinue)) {{ "
+            f"New-VM -Name '{self.vm_name}' -MemoryStartupBytes {startup_memory} -Generation 2 -VHDPath '{vm_vhdx}' "
             f"-SwitchName '{self.switch_name}' | Out-Null; "
-            f"Set-VMProcessor -VMName '{self.vm_name}' -Count 2 | Out-Null; "
+            f"{sizing}; "
             f"Set-VMFirmware -VMName '{self.vm_name}' -EnableSecureBoot Off | Out-Null }}"
         )
         result = self._admin().run(command, timeout=300)
@@ -114,6 +201,28 @@ class HyperVManager:
             self._show_error_window("创建虚拟机", command, result)
         return result.ok, vm_vhdx
 
+    def flatten_disk(self, vm_vhdx):
+        """
+        把虚拟机的差分盘合并为独立的动态磁盘，使其不再依赖基础盘。
+        需在虚拟机关机时执行；磁盘已是独立磁盘时不做任何操作。返回 (成功, 当前磁盘路径)。
+        """
+        vm_vhdx = vm_vhdx.replace("\\", "/")
+        flat_vhdx = vm_vhdx[: -len(".vhdx")] + "-flat.vhdx"
+        command = (
+            f"if ((Get-VHD -Path '{vm_vhdx}').VhdType -eq 'Differencing') {{ "
+            f"if (Test-Path '{flat_vhdx}') {{ Remove-Item '{flat_vhdx}' -Force }}; "
+            f"Convert-VHD -Path '{vm_vhdx}' -DestinationPath '{flat_vhdx}' -VHDType Dynamic; "
+            f"$drive = Get-VMHardDiskDrive -VMName '{self.vm_name}' | Select-Object -First 1; "
+            f"Set-VMHardDiskDrive -VMHardDiskDrive $drive -Path '{flat_vhdx}'; "
+            f"Remove-Item '{vm_vhdx}' -Force; "
+            f"'{flat_vhdx}' }} else {{ '{vm_vhdx}' }}"
+        )
+        result = self._admin().run(command, timeout=600)
+        if not result.ok:
+            self._show_error_window("合并差分磁盘", command, result)
+            return False, vm_vhdx
+        return True, (result.stdout.strip().splitlines() or [vm_vhdx])[-1]
+
     def get_vm_mac_address(self):
         result = self._admin().run(
             f"(Get-VMNetworkAdapter -VMName '{self.vm_name}' | Select-Object -First 1 -ExpandProperty MacAddress)"
@@ -147,6 +256,28 @@ class HyperVManager:
             f"Remove-VM -Name '{self.vm_name}' -Force }}",
         ).ok
 
+    def shutdown_vm(self, timeout=180):
+        """通过集成服务正常关机（相比 -TurnOff 不会丢失未落盘的数据）"""
+        return self._admin().run(
+            f"$vm = Get-VM -Name '{self.vm_name}' -ErrorAction SilentlyContinue; "
+            f"if ($vm -and $vm.State -ne 'Off') {{ Stop-VM -Name '{self.vm_name}' -Force }}",
+            timeout=timeout,
+        ).ok
+
+    def get_vm_disk_path(self):
+        result = self._admin().run(
+            f"(Get-VMHardDiskDrive -VMName '{self.vm_name}' | Select-Object -First 1 -ExpandProperty Path)"
+        )
+        return result.stdout.strip() if result.ok else ""
+
+    def compact_disk(self, vhdx_path):
+        """压缩虚拟机磁盘，需在虚拟机关机后执行"""
+        command = compact_vhdx_command(vhdx_path)
+        result = self._admin().run(command, timeout=1800)
+        if not result.ok:
+            self._show_error_window("压缩虚拟磁盘", command, result)
+        return result.ok
+
     def stop_elevated(self):
         """停止提权会话"""
         if self._elevated:
@@ -178,26 +309,13 @@ class HyperVManager:
             creationflags=subprocess.CREATE_NEW_CONSOLE,
         )
 
-    def create_seed_disk(self, seed_disk_path, source_dir):
-        """用 IMAPI2 创建 cloud-init NoCloud ISO（cidata 卷标）"""
-        seed_disk_path = seed_disk_path.replace("\\", "/")
-        source_dir = source_dir.replace("\\", "/")
-        os.makedirs(os.path.dirname(seed_disk_path), exist_ok=True)
-        command = (
-            f"if (Test-Path '{seed_disk_path}') {{ Remove-Item '{seed_disk_path}' -Force }}; "
-            f"$fsi = New-Object -ComObject IMAPI2FS.MsftFileSystemImage; "
-            f"$fsi.FileSystemsToCreate = 3; "
-            f"$fsi.VolumeName = 'cidata'; "
-            f"$fsi.Root.AddTree('{source_dir}', $false); "
-            f"$result = $fsi.CreateResultImage(); "
-            f"$stream = $result.ImageStream; "
-            f"$stream.Seek(0, 0) | Out-Null; "
-            f"$fs = [System.IO.File]::Create('{seed_disk_path}'); "
-            f"$buf = New-Object byte[] 2048; "
-            f"while (($n = $stream.Read($buf, 0, $buf.Length)) -gt 0) {{ $fs.Write($buf, 0, $n) }}; "
-            f"$fs.Close()"
-        )
-        return run_powershell(command, timeout=180).ok
+    def create_seed_disk(self, seed_disk_path, files):
+        """在进程内生成 cloud-init NoCloud ISO（cidata 卷标），files 为 {文件名: 内容}"""
+        try:
+            write_iso(seed_disk_path, files, volume_id="cidata")
+            return True
+        except (OSError, ValueError):
+            return False
 
     def ensure_portproxy(self, listen_port, connect_address, connect_port):
         command = (
@@ -0,0 +1,175 @@
+import os
+import re
+import struct
+import time
+
+
+SECTOR_SIZE = 2048
+# 系统区固定占用前 16 个扇区，卷描述符从第 16 扇区开始
+SYSTEM_AREA_SECTORS = 16
+JOLIET_ESCAPE = b"%/E"   # UCS-2 Level 3
+
+
+def _both_16(value):
+    return struct.pack("<H", value) + struct.pack(">H", value)
+
+
+def _both_32(value):
+    return struct.pack("<I", value) + struct.pack(">I", value)
+
+
+def _pad(data, length, fill=b" "):
+    return data[:length] + fill * (length - len(data[:length]))
+
+
+def _ucs2(text, length):
+    """Joliet 文本字段：UCS-2 大端，按 UCS-2 空格补齐"""
+    encoded = text.encode("utf-16-be")[: length - length % 2]
+    padded = encoded + "\x20".encode("utf-16-be") * ((length - len(encoded)) // 2)
+    return padded + b"\x00" * (length - len(padded))
+
+
+def _dir_datetime(ts):
+    return bytes([ts.tm_year - 1900, ts.tm_mon, ts.tm_mday, ts.tm_hour, ts.tm_min, ts.tm_sec, 0])
+
+
+def _volume_datetime(ts):
+    return time.strftime("%Y%m%d%H%M%S00", ts).encode("ascii") + b"\x00"
+
+
+def _sectors(size):
+    return max(1, (size + SECTOR_SIZE - 1) // SECTOR_SIZE)
+
+
+def _iso9660_name(name, used):
+    """转换为 ISO9660 Level 1 文件名（8.3 大写 d 字符 + ;1），重名时追加序号"""
+    stem, _, ext = name.upper().rpartition(".") if "." in name else (name.upper(), "", "")
+    stem = re.sub(r"[^A-Z0-9_]", "_", stem) or "_"
+    ext = re.sub(r"[^A-Z0-9_]", "_", ext)[:3]
+    candidate = stem[:8]
+    counter = 1
+    while f"{candidate}.{ext}" in used:
+        suffix = str(counter)
+        candidate = stem[: 8 - len(suffix)] + suffix
+        counter += 1
+    used.add(f"{candidate}.{ext}")
+    return f"{candidate}.{ext};1".encode("ascii")
+
+
+def _dir_record(identifier, extent, size, ts, is_dir=False):
+    length = 33 + len(identifier)
+    padding = b"\x00" if len(identifier) % 2 == 0 else b""
+    return (
+        bytes([length + len(padding), 0])
+        + _both_32(extent)
+        + _both_32(size)
+        + _dir_datetime(ts)
+        + bytes([0x02 if is_dir else 0x00, 0, 0])
+        + _both_16(1)
+        + bytes([len(identifier)])
+        + identifier
+        + padding
+    )
+
+
+def _directory_extent(root_extent, entries, ts):
+    """生成根目录数据：. / .. 以及按标识符排序的文件记录"""
+    records = [
+        _dir_record(b"\x00", root_extent, SECTOR_SIZE, ts, is_dir=True),
+        _dir_record(b"\x01", root_extent, SECTOR_SIZE, ts, is_dir=True),
+    ]
+    for identifier, extent, size in sorted(entries):
+        records.append(_dir_record(identifier, extent, size, ts))
+    data = b"".join(records)
+    if len(data) > SECTOR_SIZE:
+        raise ValueError("文件数量过多，根目录超出单个扇区")
+    return _pad(data, SECTOR_SIZE, b"\x00")
+
+
+def _path_table(root_extent, big_endian):
+    fmt = ">" if big_endian else "<"
+    return bytes([1, 0]) + struct.pack(fmt + "I", root_extent) + struct.pack(fmt + "H", 1) + b"\x00\x00"
+
+
+def _volume_descriptor(kind, volume_id, total_sectors, path_table_size,
+                       l_table, m_table, root_extent, ts, joliet=False):
+    def text(value, length):
+        return _ucs2(value, length) if joliet else _pad(value.encode("ascii"), length)
+
+    created = _volume_datetime(ts)
+    descriptor = (
+        bytes([kind]) + b"CD001" + bytes([1, 0])
+        + text("", 32)                                       # 系统标识
+        + text(volume_id, 32)                                # 卷标
+        + b"\x00" * 8
+        + _both_32(total_sectors)
+        + _pad(JOLIET_ESCAPE if joliet else b"", 32, b"\x00")
+        + _both_16(1)                                        # 卷集大小
+        + _both_16(1)                                        # 卷序号
+        + _both_16(SECTOR_SIZE)
+        + _both_32(path_table_size)
+        + struct.pack("<I", l_table) + b"\x00" * 4
+        + struct.pack(">I", m_table) + b"\x00" * 4
+        + _dir_record(b"\x00", root_extent, SECTOR_SIZE, ts, is_dir=True)
+        + text("", 128) * 4                                  # 卷集 / 发布者 / 准备者 / 应用标识
+        + text("", 37) * 3                                   # 版权 / 摘要 / 书目文件
+        + created + created
+        + b"0" * 16 + b"\x00"                                # 过期时间
+        + created
+        + bytes([1, 0])
+    )
+    return _pad(descriptor, SECTOR_SIZE, b"\x00")
+
+
+def build_iso(files, volume_id="cidata", timestamp=None):
+    """
+    在内存中生成包含 ISO9660 + Joliet 的单目录光盘镜像。
+    files 为 {文件名: bytes 或 str}，timestamp 固定后输出逐字节可复现。
+    """
+    ts = time.gmtime(time.time() if timestamp is None else timestamp)
+    payloads = [
+        (name, content.encode("utf-8") if isinstance(content, str) else bytes(content))
+        for name, content in files.items()
+    ]
+
+    # 扇区布局：描述符(16-18) | 路径表 L/M ×2 (19-22) | 根目录 ×2 (23-24) | 文件数据
+    pvd_l, pvd_m, joliet_l, joliet_m = 19, 20, 21, 22
+    pvd_root, joliet_root = 23, 24
+    next_extent = 25
+    used_names = set()
+    iso_entries, joliet_entries, data_extents = [], [], []
+    for name, data in payloads:
+        iso_entries.append((_iso9660_name(name, used_names), next_extent, len(data)))
+        joliet_entries.append((name.encode("utf-16-be")[:128], next_extent, len(data)))
+        data_extents.append(data)
+        next_extent += _sectors(len(data))
+    total_sectors = next_extent
+    path_table_size = len(_path_table(0, False))
+
+    sectors = [
+        b"\x00" * SECTOR_SIZE * SYSTEM_AREA_SECTORS,
+        _volume_descriptor(1, volume_id, total_sectors, path_table_size, pvd_l, pvd_m, pvd_root, ts),
+        _volume_descriptor(2, volume_id, total_sectors, path_table_size, joliet_l, joliet_m, joliet_root, ts, joliet=True),
+        _pad(bytes([255]) + b"CD001" + bytes([1]), SECTOR_SIZE, b"\x00"),
+        _pad(_path_table(pvd_root, False), SECTOR_SIZE, b"\x00"),
+        _pad(_path_table(pvd_root, True), SECTOR_SIZE, b"\x00"),
+        _pad(_path_table(joliet_root, False), SECTOR_SIZE, b"\x00"),
+        _pad(_path_table(joliet_root, True), SECTOR_SIZE, b"\x00"),
+        _directory_extent(pvd_root, iso_entries, ts),
+        _directory_extent(joliet_root, joliet_entries, ts),
+    ]
+    for data in data_extents:
+        sectors.append(_pad(data, _sectors(len(data)) * SECTOR_SIZE, b"\x00"))
+    return b"".join(sectors)
+
+
+def write_iso(path, files, volume_id="cidata", timestamp=None):
+    """生成镜像并写入文件（先写临时文件再替换）"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as fh:
+        fh.write(build_iso(files, volume_id=volume_id, timestamp=timestamp))
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,129 @@
+import threading
+import time
+
+from core.log_store import parse_compose_log_line
+
+
+def logs_command(deploy_dir, service, since=None, tail=50, env_file=False):
+    """单个服务的日志跟随命令：不带服务前缀、带时间戳，有续读位置时从该位置开始"""
+    window = f"--since {since:.9f}" if since else f"--tail={tail}"
+    env = " --env-file .env" if env_file else ""
+    return (
+        f"cd {deploy_dir} && docker compose -f docker-compose.yml{env} "
+        f"logs -f --no-log-prefix --timestamps {window} {service}"
+    )
+
+
+def service_source(service):
+    """服务名 → 日志来源（NapCat 与其余服务分开显示）"""
+    return "napcat" if "napcat" in service else "nekro"
+
+
+class LogFollower:
+    """
+    跟随一个服务的日志，断开后从续读位置重连。
+
+    cursor 为 (最后一行的时间戳, 该时间戳下已读行数)：重连时用 --since 从该时间戳开始，
+    跳过时间戳相同且已读过的行，既不重复也不遗漏。
+    on_line(service, 时间戳, 文本, display) 逐行回调；每秒超过 max_rate 行时
+    display 为 False（只保存不显示），被省略的行数定期通过 log 报告，
+    一个服务刷屏不会挤占其他服务的显示。on_cursor(service, cursor) 在每次推进续读位置后回调。
+    """
+
+    def __init__(self, service, open_stream, on_line, cursor=None, on_cursor=None, log=None,
+                 max_rate=200, reconnect_delay=2.0, max_reconnect_delay=30.0):
+        self.service = service
+        self.open_stream = open_stream
+        self.on_line = on_line
+        self.on_cursor = on_cursor or (lambda service, cursor: None)
+        self.log = log or (lambda message, level="info": None)
+        self.max_rate = max_rate
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.cursor = tuple(cursor) if cursor else (0.0, 0)
+        self.suppressed = 0
+        self._window_start = 0.0
+        self._window_count = 0
+        self._stop = threading.Event()
+        self._process = None
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        process = self._process
+        if process is not None and process.poll() is None:
+            try:
+                process.terminate()
+            except Exception:
+                pass
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    def feed(self, line, skip):
+        """处理一行原始输出，skip 为续读时仍需跳过的同时间戳行数，返回新的 skip"""
+        stamp, text = parse_compose_log_line(line)
+        if stamp is None:
+            # 没有时间戳的行（如 compose 自身的提示）沿用上一行的时间
+            stamp = self.cursor[0] or time.time()
+        else:
+            last, seen = self.cursor
+            if stamp < last:
+                return skip
+            if stamp == last and skip > 0:
+                return skip - 1
+            self.cursor = (stamp, seen + 1 if stamp == last else 1)
+            self.on_cursor(self.service, self.cursor)
+        self.on_line(self.service, stamp, text, self._allow_display())
+        return skip
+
+    def _allow_display(self):
+        now = time.monotonic()
+        if now - self._window_start >= 1.0:
+            if self.suppressed:
+                self.log(f"[容器日志] {self.service} 输出过快，界面省略了 {self.suppressed} 行（已完整保存）", "warning")
+                self.suppressed = 0
+            self._window_start, self._window_count = now, 0
+        self._window_count += 1
+        if self._window_count > self.max_rate:
+            self.suppressed += 1
+            return False
+        return True
+
+    def _run(self):
+        delay = self.reconnect_delay
+        while not self._stop.is_set():
+            started = time.monotonic()
+            since, skip = self.cursor
+            try:
+                self._process = self.open_stream(self.service, since or None)
+                for line in self._process.stdout:
+                    if self._stop.is_set():
+                        break
+                    if isinstance(line, bytes):
+                        line = line.decode("utf-8", errors="replace")
+                    line = line.rstrip("\r\n")
+                    if line:
+                        skip = self.feed(line, skip)
+            except Exception as exc:
+                if not self._stop.is_set():
+                    self.log(f"[容器日志] 读取 {self.service} 日志失败: {exc}", "debug")
+            finally:
+                if self._process is not None and self._process.poll() is None:
+                    try:
+                        self._process.terminate()
+                    except Exception:
+                        pass
+            if self._stop.is_set():
+                break
+            # 容器停止或重启时 logs -f 会退出：持续较久的连接立即重连，短时间内反复退出则退避
+            delay = self.reconnect_delay if time.monotonic() - started > 60 else min(delay * 2, self.max_reconnect_delay)
+            self._stop.wait(delay)
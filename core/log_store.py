@@ -0,0 +1,363 @@
+import bisect
+import calendar
+import glob
+import heapq
+import itertools
+import json
+import os
+import re
+import struct
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+
+SOURCES = ("app", "nekro", "napcat")
+SOURCE_LABELS = {"app": "应用", "nekro": "Nekro Agent", "napcat": "NapCat"}
+
+# 级别编码：索引里只存一个字节（与日志视图共用）
+LEVELS = ("info", "warning", "error", "debug", "vm")
+LEVEL_CODES = {name: code for code, name in enumerate(LEVELS)}
+LEVEL_CODES["warn"] = LEVEL_CODES["warning"]
+
+# 索引项：时间戳、行在数据文件中的偏移、级别、来源，共 14 字节
+INDEX_ENTRY = struct.Struct("<dIBB")
+NEWLINE_MARK = "\x1f"   # 多行日志在数据文件中以该字符代替换行，保证一条记录一行
+
+
+# docker compose logs --timestamps 的输出："<服务>-1  | 2024-05-01T12:34:56.123456789Z 内容"
+_COMPOSE_TIMESTAMP = re.compile(
+    r"^(?P<prefix>[^|]*\|\s)?(?P<date>\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d)(?:\.(?P<fraction>\d+))?"
+    r"(?P<zone>Z|[+-]\d\d:\d\d)\s?(?P<rest>.*)$",
+    re.DOTALL,
+)
+
+
+def parse_compose_log_line(line):
+    """拆出 compose 日志行中的时间戳，返回 (Unix 时间或 None, 去掉时间戳后的文本)"""
+    match = _COMPOSE_TIMESTAMP.match(line)
+    if not match:
+        return None, line
+    stamp = calendar.timegm(time.strptime(match.group("date"), "%Y-%m-%dT%H:%M:%S"))
+    stamp += float(f"0.{match.group('fraction')}") if match.group("fraction") else 0.0
+    zone = match.group("zone")
+    if zone != "Z":
+        sign = 1 if zone[0] == "+" else -1
+        stamp -= sign * (int(zone[1:3]) * 3600 + int(zone[4:6]) * 60)
+    return stamp, (match.group("prefix") or "") + match.group("rest")
+
+
+@dataclass
+class LogRecord:
+    time: float
+    source: str
+    level: str
+    text: str
+
+
+class _Segment:
+    """一个分段：<创建毫秒>.log 保存文本行，<创建毫秒>.idx 保存定长索引"""
+
+    def __init__(self, base):
+        self.base = base
+        self.start = int(os.path.basename(base)) / 1000
+        # 已统计的索引项数、最早 / 最晚时间、是否按时间有序、最后一项的时间
+        self.stats = (0, float("inf"), float("-inf"), True, float("-inf"))
+
+    @property
+    def data_path(self):
+        return self.base + ".log"
+
+    @property
+    def index_path(self):
+        return self.base + ".idx"
+
+    def size(self):
+        try:
+            return os.path.getsize(self.data_path) + os.path.getsize(self.index_path)
+        except OSError:
+            return 0
+
+    def read_index(self):
+        try:
+            with open(self.index_path, "rb") as fh:
+                data = fh.read()
+        except OSError:
+            return b""
+        return data[:len(data) - len(data) % INDEX_ENTRY.size]
+
+    def update_stats(self, index):
+        """统计新增索引项的时间范围与是否有序（分段只追加，已统计的部分不再重复计算）"""
+        counted, low, high, ordered, last = self.stats
+        count = len(index) // INDEX_ENTRY.size
+        if count < counted:
+            counted, low, high, ordered, last = 0, float("inf"), float("-inf"), True, float("-inf")
+        for stamp, _, _, _ in INDEX_ENTRY.iter_unpack(index[counted * INDEX_ENTRY.size:count * INDEX_ENTRY.size]):
+            if stamp < last:
+                ordered = False
+            last = stamp
+            low = min(low, stamp)
+            high = max(high, stamp)
+        self.stats = (count, low, high, ordered, last)
+        return self.stats
+
+
+class LogStore:
+    """
+    本地日志存储：应用日志与各容器日志按到达顺序追加到分段文件，每行一条记录，
+    另有定长索引（时间 → 偏移、级别、来源），记录保留各自的原始时间。
+
+    append() 只放进内存队列，后台线程每 flush_interval 秒批量写入；
+    search() 按各分段的时间范围跳过无关分段，时间有序的分段按索引二分定位，
+    续读补回的旧日志使分段无序时改为逐项过滤；之后在整块数据上做一次
+    （不区分大小写的）子串 / 正则匹配，各分段结果合并后按时间倒序逐条产出。
+    单个分段超过 segment_bytes 后新建分段，总大小超过 max_bytes 或超过
+    retention_days 天的分段整体删除。cursors 保存日志读取的续读位置。
+    """
+
+    def __init__(self, directory, segment_bytes=8 * 1024 * 1024, max_bytes=512 * 1024 * 1024,
+                 retention_days=14, flush_interval=1.0, log=None, clock=time.time):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.retention_days = retention_days
+        self.flush_interval = flush_interval
+        self.log = log or (lambda message, level="info": None)
+        self.clock = clock
+        self._pending = deque()
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._data = None
+        self._index = None
+        self._data_size = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._segments = sorted(
+            (_Segment(path[:-4]) for path in glob.glob(os.path.join(directory, "*.idx"))
+             if os.path.basename(path)[:-4].isdigit()),
+            key=lambda segment: segment.start,
+        )
+        self._cursor_path = os.path.join(directory, "cursors.json")
+        try:
+            with open(self._cursor_path, "r", encoding="utf-8") as fh:
+                self.cursors = json.load(fh)
+        except (OSError, ValueError):
+            self.cursors = {}
+        self._cursors_dirty = False
+
+    # ------------------------------------------------------------------ #
+    #  写入
+    # ------------------------------------------------------------------ #
+
+    def append(self, source, level, text, timestamp=None):
+        """追加一条记录（任意线程调用）"""
+        self._pending.append((timestamp if timestamp is not None else self.clock(), source, level, text))
+
+    def set_cursor(self, name, value):
+        self.cursors[name] = value
+        self._cursors_dirty = True
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+        with self._lock:
+            self._close_files()
+
+    def flush(self):
+        """把队列中的记录写入当前分段，返回写入条数"""
+        count = 0
+        with self._lock:
+            while self._pending:
+                stamp, source, level, text = self._pending.popleft()
+                line = text.replace("\r", "").replace("\n", NEWLINE_MARK).encode("utf-8", errors="replace") + b"\n"
+                if self._data is None:
+                    self._roll(new_segment=False)
+                elif self._data_size + len(line) > self.segment_bytes:
+                    self._roll(new_segment=True)
+                # 先写数据再写索引，索引指向的行总是完整的
+                self._data.write(line)
+                self._index.write(INDEX_ENTRY.pack(
+                    stamp, self._data_size, LEVEL_CODES.get(level, 0),
+                    SOURCES.index(source) if source in SOURCES else 0,
+                ))
+                self._data_size += len(line)
+                count += 1
+            if count:
+                self._data.flush()
+                self._index.flush()
+            if self._cursors_dirty:
+                self._cursors_dirty = False
+                with open(self._cursor_path, "w", encoding="utf-8") as fh:
+                    json.dump(self.cursors, fh)
+        return count
+
+    def _roll(self, new_segment):
+        """打开写入分段：启动后优先续写未写满的最新分段，新分段以创建时间命名"""
+        self._close_files()
+        segment = self._segments[-1] if self._segments else None
+        if new_segment or segment is None or segment.size() >= self.segment_bytes:
+            base = os.path.join(self.directory, f"{int(self.clock() * 1000):013d}")
+            if segment is not None and base <= segment.base:
+                base = os.path.join(self.directory, f"{int(segment.start * 1000) + 1:013d}")
+            segment = _Segment(base)
+            self._segments.append(segment)
+            self._prune()
+        self._data = open(segment.data_path, "ab")
+        self._index = open(segment.index_path, "ab")
+        self._data_size = self._data.tell()
+
+    def _close_files(self):
+        for handle in (self._data, self._index):
+            if handle is not None:
+                handle.close()
+        self._data = self._index = None
+
+    def _prune(self):
+        """删除超出总大小或保留期的最旧分段（保留当前分段）"""
+        cutoff = self.clock() - self.retention_days * 86400
+        total = sum(segment.size() for segment in self._segments)
+        while len(self._segments) > 1:
+            oldest, following = self._segments[0], self._segments[1]
+            if total <= self.max_bytes and following.start >= cutoff:
+                break
+            total -= oldest.size()
+            for path in (oldest.data_path, oldest.index_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._segments.pop(0)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except OSError as exc:
+                self.log(f"[日志存储] 写入失败: {exc}", "warning")
+
+    # ------------------------------------------------------------------ #
+    #  查询
+    # ------------------------------------------------------------------ #
+
+    def search(self, pattern="", regex=False, start=None, end=None, sources=None, levels=None, limit=2000):
+        """
+        按条件查找记录，按时间倒序逐条产出 LogRecord，最多 limit 条。
+        pattern 为空时只按时间 / 来源 / 级别过滤；正则无效时抛出 re.error。
+        """
+        matcher = None
+        if pattern:
+            raw = pattern.encode("utf-8")
+            # 每条记录一行：^ / $ 按记录边界匹配
+            matcher = re.compile(raw if regex else re.escape(raw), re.IGNORECASE | re.MULTILINE)
+        source_codes = {SOURCES.index(name) for name in sources if name in SOURCES} if sources else None
+        level_codes = {LEVEL_CODES[name] for name in levels if name in LEVEL_CODES} if levels else None
+        self.flush()
+        with self._lock:
+            segments = list(self._segments)
+
+        candidates = []
+        for segment in segments:
+            index = segment.read_index()
+            count, low, high, ordered, _ = segment.update_stats(index)
+            if not count or (start is not None and high < start) or (end is not None and low > end):
+                continue
+            candidates.append((high, segment, index, ordered))
+        # 按各分段最晚时间从新到旧打开，堆顶记录比所有未打开分段的最晚时间都新时才产出，
+        # 分段之间时间交错（续读补回的旧日志写在较新的分段里）时结果仍按时间倒序
+        candidates.sort(key=lambda item: item[0], reverse=True)
+        heap, tiebreak, opened, produced = [], itertools.count(), 0, 0
+        while produced < limit:
+            while opened < len(candidates) and (not heap or candidates[opened][0] >= -heap[0][0]):
+                _, segment, index, ordered = candidates[opened]
+                opened += 1
+                records = self._search_segment(segment, index, ordered, matcher, start, end, source_codes, level_codes)
+                record = next(records, None)
+                if record is not None:
+                    heapq.heappush(heap, (-record.time, next(tiebreak), record, records))
+            if not heap:
+                return
+            _, _, record, records = heapq.heappop(heap)
+            yield record
+            produced += 1
+            record = next(records, None)
+            if record is not None:
+                heapq.heappush(heap, (-record.time, next(tiebreak), record, records))
+
+    def _search_segment(self, segment, index, ordered, matcher, start, end, source_codes, level_codes):
+        """在一个分段中查找，按时间倒序产出"""
+        count = len(index) // INDEX_ENTRY.size
+        if ordered:
+            stamps = _StampView(index, count)
+            low = bisect.bisect_left(stamps, start) if start is not None else 0
+            high = bisect.bisect_right(stamps, end) if end is not None else count
+        else:
+            low, high = 0, count
+        if low >= high:
+            return
+        entries = list(INDEX_ENTRY.iter_unpack(index[low * INDEX_ENTRY.size:high * INDEX_ENTRY.size]))
+        offsets = [entry[1] for entry in entries]
+        first = offsets[0]
+        with open(segment.data_path, "rb") as fh:
+            fh.seek(first)
+            if high < count:
+                block = fh.read(INDEX_ENTRY.unpack_from(index, high * INDEX_ENTRY.size)[1] - first)
+            else:
+                block = fh.read()
+        relative = [offset - first for offset in offsets]
+        if high == count:
+            # 数据文件可能已写入尚未建立索引的行，截到最后一条已索引记录的行尾
+            block = block[:block.find(b"\n", relative[-1]) + 1]
+
+        if matcher is None:
+            rows = range(len(entries))
+        else:
+            rows, cursor = [], 0
+            while True:
+                match = matcher.search(block, cursor)
+                if match is None:
+                    break
+                row = bisect.bisect_right(relative, match.start()) - 1
+                next_row = relative[row + 1] if row + 1 < len(relative) else len(block)
+                # 跨过记录间换行的匹配（如 \s、[^x]）不算，只在该记录内重新匹配
+                if match.end() < next_row or matcher.search(block, relative[row], next_row - 1) is not None:
+                    rows.append(row)
+                cursor = next_row
+                if cursor <= match.start():
+                    cursor = match.start() + 1
+
+        if not ordered:
+            rows = [row for row in rows if (start is None or entries[row][0] >= start) and (end is None or entries[row][0] <= end)]
+            rows.sort(key=lambda row: entries[row][0])
+        for row in reversed(rows):
+            stamp, _, level, source = entries[row]
+            if source_codes is not None and source not in source_codes:
+                continue
+            if level_codes is not None and level not in level_codes:
+                continue
+            line_end = relative[row + 1] - 1 if row + 1 < len(relative) else len(block) - 1
+            if line_end < relative[row]:
+                continue
+            text = block[relative[row]:line_end].decode("utf-8", errors="replace").replace(NEWLINE_MARK, "\n")
+            yield LogRecord(stamp, SOURCES[source] if source < len(SOURCES) else "app",
+                            LEVELS[level] if level < len(LEVELS) else "info", text)
+
+
+class _StampView:
+    """把索引字节按时间戳序列暴露给 bisect，不必先解包全部索引项"""
+
+    def __init__(self, index, count):
+        self._index = index
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, position):
+        return INDEX_ENTRY.unpack_from(self._index, position * INDEX_ENTRY.size)[0]
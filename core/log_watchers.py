@@ -0,0 +1,229 @@
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+
+from core.event_bus import LogWatchEvent
+
+
+@dataclass
+class WatchRule:
+    """
+    一条日志监视规则。literals 为预筛用的固定子串（不区分大小写，至少一个），
+    只有包含其中任一子串的行才会执行 pattern；services 为空时对所有服务生效。
+    同一服务、同一匹配分组在 debounce 秒内只产生一次事件。
+    """
+    name: str
+    literals: tuple
+    pattern: str
+    services: tuple = ()
+    level: str = "info"
+    message: str = ""        # 可引用 {service} 与 {0} {1} ...（匹配分组），为空时不输出日志
+    debounce: float = 30.0
+    regex: object = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.literals = tuple(self.literals)
+        self.services = tuple(self.services)
+        self.regex = re.compile(self.pattern, re.IGNORECASE)
+
+    def describe(self, service, groups):
+        return self.message.format(*groups, service=service) if self.message else ""
+
+
+DEFAULT_RULES = (
+    WatchRule(
+        "napcat_token", ("token=",), r"WebUi.*token=([a-zA-Z0-9]+)",
+        services=("nekro_napcat",), debounce=0,
+    ),
+    WatchRule(
+        "napcat_qrcode", ("二维码", "qrcode", "扫码"), r"二维码|qr\s?code|扫码登录",
+        services=("nekro_napcat",), level="warning",
+        message="[NapCat] 等待扫码登录，请打开 NapCat WebUI 完成登录", debounce=120,
+    ),
+    WatchRule(
+        "napcat_login", ("登录成功", "login success"), r"登录成功|login success",
+        services=("nekro_napcat",), message="[NapCat] QQ 登录成功", debounce=60,
+    ),
+    WatchRule(
+        "onebot_disconnect", ("断开", "disconnect", "connection closed"),
+        r"(onebot|websocket|ws).*(断开|disconnect|connection closed)",
+        level="warning", message="[{service}] OneBot 连接断开", debounce=60,
+    ),
+    WatchRule(
+        "postgres_error", ("postgres", "asyncpg", "psycopg", "could not connect"),
+        r"(postgres|asyncpg|psycopg).*(connection refused|could not connect|connect call failed|"
+        r"too many clients|password authentication failed|the database system is)",
+        services=("nekro_agent", "nekro_postgres"), level="error",
+        message="[{service}] 数据库连接异常", debounce=60,
+    ),
+    WatchRule(
+        "agent_ready", ("application startup complete", "uvicorn running on"),
+        r"application startup complete|uvicorn running on",
+        services=("nekro_agent",), message="[Nekro Agent] 服务启动完成", debounce=300,
+    ),
+)
+
+
+def _trie_pattern(literals):
+    """
+    把一组固定子串编成前缀树形式的正则（a(?:bc|d)|x...），每个位置只需按首字符分支一次，
+    耗时基本不随子串数量增加，相当于一个由 re 模块执行的 Aho-Corasick 预筛。
+    """
+    trie = {}
+    for literal in literals:
+        node = trie
+        for char in literal:
+            node = node.setdefault(char, {})
+        node[""] = None
+
+    def build(node):
+        # 已到某个子串的结尾时不必再向下展开：更长的子串以它开头，命中位置相同
+        if "" in node:
+            return ""
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items())]
+        return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+
+    return build(trie)
+
+
+class LogWatcher:
+    """
+    可增删规则的日志监视器（任意线程调用 scan）。
+
+    所有规则的预筛子串合并成一个前缀树正则，先对每行做一次预筛，
+    只有命中子串的规则才执行各自的完整正则，规则增多时吞吐基本不变。
+    """
+
+    def __init__(self, rules=DEFAULT_RULES, clock=time.monotonic):
+        self.clock = clock
+        self._rules = {}
+        self._fired = {}
+        self._lock = threading.Lock()
+        self._prefilter = (None, {})
+        for rule in rules:
+            self._rules[rule.name] = rule
+        self._rebuild()
+
+    @property
+    def rules(self):
+        return list(self._rules.values())
+
+    def add(self, rule):
+        with self._lock:
+            self._rules[rule.name] = rule
+            self._rebuild()
+
+    def remove(self, name):
+        with self._lock:
+            if self._rules.pop(name, None) is not None:
+                self._rebuild()
+
+    def _rebuild(self):
+        by_literal = {}
+        for rule in self._rules.values():
+            for literal in rule.literals:
+                by_literal.setdefault(literal.lower(), []).append(rule)
+        # 预筛正则与子串表一起替换，scan 读到的总是一致的一组
+        self._prefilter = re.compile(_trie_pattern(by_literal)) if by_literal else None, by_literal
+
+    def candidates(self, text):
+        """预筛：返回该行可能命中的规则"""
+        prefilter, by_literal = self._prefilter
+        if prefilter is None:
+            return []
+        lowered = text.lower()
+        match = prefilter.search(lowered)
+        if match is None:
+            return []
+        rules = []
+        while match is not None:
+            # 前缀树正则只匹配最短子串，按命中位置逐一取出以该位置开头的全部子串
+            start = match.start()
+            for literal, owners in by_literal.items():
+                if lowered.startswith(literal, start):
+                    rules.extend(rule for rule in owners if rule not in rules)
+            match = prefilter.search(lowered, start + 1)
+        return rules
+
+    def scan(self, service, text):
+        """检查一行日志，返回触发的 LogWatchEvent 列表（已去抖）"""
+        events = []
+        for rule in self.candidates(text):
+            if rule.services and service not in rule.services:
+                continue
+            match = rule.regex.search(text)
+            if match is None:
+                continue
+            groups = match.groups()
+            if not self._allow(rule, service, groups):
+                continue
+            events.append(LogWatchEvent(rule.name, service, text, groups, rule.level, rule.describe(service, groups)))
+        return events
+
+    def _allow(self, rule, service, groups):
+        if rule.debounce <= 0:
+            return True
+        key = (rule.name, service, groups)
+        now = self.clock()
+        with self._lock:
+            last = self._fired.get(key)
+            if last is not None and now - last < rule.debounce:
+                return False
+            self._fired[key] = now
+        return True
+
+
+if __name__ == "__main__":
+    # 吞吐测试：python -m core.log_watchers [日志文件]
+    # 日志文件为容器日志（如 docker compose logs --no-log-prefix 的输出），未指定时生成模拟日志；
+    # 在默认规则之外逐步加入更多规则，对比预筛与逐条正则两种方式每秒处理的行数
+    import random
+    import sys
+
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "r", encoding="utf-8", errors="replace") as fh:
+            corpus = [line.rstrip("\n") for line in fh if line.strip()]
+    else:
+        rng = random.Random(7)
+        samples = [
+            "INFO:     127.0.0.1:53422 - \"GET /api/health HTTP/1.1\" 200 OK",
+            "[2024-05-01 12:00:00] [INFO] 收到群消息 (123456789) 用户: 今天天气不错，大家出来玩吗",
+            "11-02 14:33:10 [info] 测试bot | 接收 <- 群聊 [某某群(123456)] [张三(654321)] 哈哈哈",
+            "DEBUG nekro_agent.services.agent: 调用模型 gpt-4o-mini 用时 1.42s tokens=1832",
+            "LOG:  checkpoint complete: wrote 12 buffers (0.1%); 0 WAL file(s) added, 0 removed",
+            "[WARNING] sandbox container exited with code 0 after 3.2s",
+        ]
+        rare = [
+            "[NapCat] [WebUi] WebUi Local Panel Url: http://127.0.0.1:6099/webui?token=abc123def",
+            "[OneBot] [WebSocket Client] 连接已断开，5 秒后重连",
+            "asyncpg.exceptions.ConnectionDoesNotExistError: postgres connection refused",
+            "INFO:     Application startup complete.",
+        ]
+        corpus = [rng.choice(rare) if rng.random() < 0.002 else rng.choice(samples) for _ in range(200000)]
+
+    services = ("nekro_agent", "nekro_napcat", "nekro_postgres")
+
+    def extra_rules(count):
+        # 模拟后续加入的规则：每条两个少见的子串
+        return [
+            WatchRule(f"extra_{index}", (f"marker{index}x", f"告警{index}号"), rf"marker{index}x|告警{index}号", debounce=0)
+            for index in range(count)
+        ]
+
+    def measure(scan):
+        started = time.perf_counter()
+        for position, line in enumerate(corpus):
+            scan(services[position % 3], line)
+        return len(corpus) / (time.perf_counter() - started)
+
+    print(f"日志行数: {len(corpus)}")
+    print(f"{'规则数':>6}  {'预筛 (行/秒)':>14}  {'逐条正则 (行/秒)':>16}")
+    for extra in (0, 10, 50, 200):
+        rules = list(DEFAULT_RULES) + extra_rules(extra)
+        watcher = LogWatcher(rules, clock=lambda: 0.0)
+
+        def naive(service, text, rules=rules):
+            return [rule for rule in rules if (not rule.services or service in rule.services) and rule.regex.search(text)]
+
+        print(f"{len(rules):>6}  {measure(watcher.scan):>14,.0f}  {measure(naive):>16,.0f}")
@@ -0,0 +1,185 @@
+import glob
+import gzip
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+
+
+class AsyncLogWriter:
+    """
+    替代 stdout / stderr 的异步日志写入器。
+
+    write() 只把文本放进有界队列，满时丢弃并计数，不阻塞调用线程（界面线程）；
+    后台线程批量写入文件与控制台，每 flush_interval 秒落盘一次。
+    日志文件超过 max_bytes 或写满 rotate_interval 秒后轮转为
+    <名称>.<时间>.log.gz，保留最近 backups 个且不超过 retention_days 天。
+    """
+
+    def __init__(self, path, max_bytes=10 * 1024 * 1024, rotate_interval=86400, backups=10,
+                 retention_days=14, queue_size=10000, flush_interval=1.0, console=None, compress=True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.backups = backups
+        self.retention_days = retention_days
+        self.flush_interval = flush_interval
+        self.console = console if console is not None else sys.__stdout__
+        self.compress = compress
+        self.dropped = 0
+        self._reported_dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._file = None
+        self._size = 0
+        self._opened_at = 0.0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._open()
+        if self._size and (self._size >= self.max_bytes or time.time() - self._opened_at >= self.rotate_interval):
+            self._rotate()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------------------------------ #
+    #  文件对象接口
+    # ------------------------------------------------------------------ #
+
+    @property
+    def encoding(self):
+        return "utf-8"
+
+    def isatty(self):
+        return False
+
+    def write(self, message):
+        if message:
+            try:
+                self._queue.put_nowait(message)
+            except queue.Full:
+                self.dropped += 1
+        return len(message)
+
+    def flush(self):
+        # 由后台线程定期落盘，这里不阻塞调用方
+        pass
+
+    def close(self, timeout=5):
+        """停止后台线程并写入剩余内容（程序退出时调用）"""
+        self._stop.set()
+        self._thread.join(timeout)
+        if self._file is not None:
+            self._write_batch(self._take_batch())
+            self._file.close()
+            self._file = None
+
+    # ------------------------------------------------------------------ #
+    #  后台写入
+    # ------------------------------------------------------------------ #
+
+    def _run(self):
+        last_flush = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                first = None
+            batch = self._take_batch(first)
+            try:
+                self._write_batch(batch)
+                if time.monotonic() - last_flush >= self.flush_interval:
+                    self._file.flush()
+                    last_flush = time.monotonic()
+            except Exception:
+                pass
+
+    def _take_batch(self, first=None, limit=1000):
+        batch = [first] if first is not None else []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if self.dropped != self._reported_dropped:
+            batch.append(f"[LOG] 日志输出过快，已丢弃 {self.dropped - self._reported_dropped} 条\n")
+            self._reported_dropped = self.dropped
+        return batch
+
+    def _write_batch(self, batch):
+        if not batch:
+            return
+        text = "".join(batch)
+        if self._size >= self.max_bytes or time.time() - self._opened_at >= self.rotate_interval:
+            self._rotate()
+        self._file.write(text)
+        self._size += len(text.encode("utf-8", errors="replace"))
+        self._write_console(text)
+
+    def _write_console(self, text):
+        if self.console is None:
+            return
+        try:
+            self.console.write(text)
+            self.console.flush()
+        except UnicodeEncodeError:
+            # 控制台编码不支持时替换无法编码的字符
+            try:
+                encoding = getattr(self.console, "encoding", None) or "utf-8"
+                self.console.write(text.encode(encoding, errors="replace").decode(encoding, errors="replace"))
+                self.console.flush()
+            except Exception:
+                pass
+        except Exception:
+            pass
+
+    # ------------------------------------------------------------------ #
+    #  轮转与清理
+    # ------------------------------------------------------------------ #
+
+    def _open(self):
+        self._file = open(self.path, "a", encoding="utf-8", errors="replace")
+        try:
+            stat = os.stat(self.path)
+            self._size = stat.st_size
+            # Windows 上 st_ctime 为文件创建时间
+            self._opened_at = stat.st_ctime if self._size and sys.platform == "win32" else time.time()
+        except OSError:
+            self._size, self._opened_at = 0, time.time()
+
+    def _rotate(self):
+        self._file.close()
+        root, ext = os.path.splitext(self.path)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        target, index = f"{root}.{stamp}{ext}", 0
+        while os.path.exists(target) or os.path.exists(target + ".gz"):
+            index += 1
+            target = f"{root}.{stamp}-{index}{ext}"
+        try:
+            os.replace(self.path, target)
+            if self.compress:
+                with open(target, "rb") as src, gzip.open(target + ".gz", "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                os.remove(target)
+        except OSError:
+            pass
+        self._open()
+        self._opened_at = time.time()
+        self._prune()
+
+    def _prune(self):
+        root, ext = os.path.splitext(self.path)
+        segments = []
+        for segment in glob.glob(f"{root}.*{ext}*"):
+            try:
+                segments.append((os.path.getmtime(segment), segment))
+            except OSError:
+                pass
+        cutoff = time.time() - self.retention_days * 86400
+        for index, (mtime, segment) in enumerate(sorted(segments, reverse=True)):
+            if index >= self.backups or mtime < cutoff:
+                try:
+                    os.remove(segment)
+                except OSError:
+                    pass
@@ -0,0 +1,245 @@
+import json
+import re
+import threading
+import time
+from array import array
+
+
+# 持续输出运行环境内全部运行中容器（含 nekro-agent 创建的沙盒容器）的资源占用，每行一个 JSON
+STATS_COMMAND = "docker stats --format '{{json .}}'"
+
+_ANSI = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]")
+_SIZE = re.compile(r"^\s*([0-9.]+)\s*([A-Za-z]*)\s*$")
+_UNITS = {
+    "": 1, "b": 1,
+    "kb": 1000, "mb": 1000 ** 2, "gb": 1000 ** 3, "tb": 1000 ** 4,
+    "kib": 1024, "mib": 1024 ** 2, "gib": 1024 ** 3, "tib": 1024 ** 4,
+}
+
+# 每个容器保留的序列，均为每秒速率或瞬时值
+SERIES = ("cpu", "mem", "net_rx", "net_tx", "blk_read", "blk_write")
+
+
+def parse_size(text):
+    """'12.5MiB' / '3.4kB' / '0B' → 字节数，无法解析返回 0"""
+    match = _SIZE.match(text or "")
+    if not match:
+        return 0.0
+    return float(match.group(1)) * _UNITS.get(match.group(2).lower(), 1)
+
+
+def parse_pair(text):
+    """'1.2MB / 3.4kB' → (1200000.0, 3400.0)"""
+    left, _, right = (text or "").partition("/")
+    return parse_size(left), parse_size(right)
+
+
+def parse_percent(text):
+    try:
+        return float((text or "").strip().rstrip("%") or 0)
+    except ValueError:
+        return 0.0
+
+
+def parse_stats_line(line):
+    """解析 docker stats 的一行 JSON 输出，返回 dict，无法解析返回 None"""
+    line = _ANSI.sub("", line or "").strip()
+    if not line.startswith("{"):
+        return None
+    try:
+        data = json.loads(line)
+    except ValueError:
+        return None
+    name = data.get("Name") or data.get("Container")
+    if not name or name == "--":
+        return None
+    mem_used, mem_limit = parse_pair(data.get("MemUsage"))
+    net_rx, net_tx = parse_pair(data.get("NetIO"))
+    blk_read, blk_write = parse_pair(data.get("BlockIO"))
+    try:
+        pids = int(data.get("PIDs") or 0)
+    except ValueError:
+        pids = 0
+    return {
+        "name": name,
+        "cpu": parse_percent(data.get("CPUPerc")),
+        "mem": mem_used,
+        "mem_limit": mem_limit,
+        "net_rx": net_rx,
+        "net_tx": net_tx,
+        "blk_read": blk_read,
+        "blk_write": blk_write,
+        "pids": pids,
+    }
+
+
+def display_name(container_name, project="nekro_agent"):
+    """Compose 容器名 nekro_agent-nekro_postgres-1 → nekro_postgres，其他容器（沙盒）保持原名"""
+    prefix = f"{project}-"
+    if container_name.startswith(prefix):
+        service, _, index = container_name[len(prefix):].rpartition("-")
+        if service and index.isdigit():
+            return service if index == "1" else f"{service}#{index}"
+    return container_name
+
+
+class RingBuffer:
+    """定长环形缓冲区，预先分配 array('d')，追加时不再分配内存"""
+
+    __slots__ = ("capacity", "_data", "_head", "_count")
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._data = array("d", bytes(8 * capacity))
+        self._head = 0
+        self._count = 0
+
+    def append(self, value):
+        self._data[self._head] = value
+        self._head = (self._head + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+
+    def __len__(self):
+        return self._count
+
+    def last(self):
+        return self._data[self._head - 1] if self._count else 0.0
+
+    def values(self):
+        """按时间顺序返回全部样本"""
+        if self._count < self.capacity:
+            return self._data[:self._count]
+        return self._data[self._head:] + self._data[:self._head]
+
+    def peak(self):
+        return max(self.values()) if self._count else 0.0
+
+
+class ContainerMetrics:
+    """单个容器的资源序列；网络与磁盘由累计值换算为每秒速率"""
+
+    def __init__(self, name, capacity):
+        self.name = name
+        self.label = display_name(name)
+        self.series = {key: RingBuffer(capacity) for key in SERIES}
+        self.mem_limit = 0.0
+        self.pids = 0
+        self.last_seen = 0.0
+        self._totals = None
+
+    def add(self, sample, now):
+        totals = (sample["net_rx"], sample["net_tx"], sample["blk_read"], sample["blk_write"])
+        if self._totals is None or now <= self.last_seen:
+            rates = (0.0, 0.0, 0.0, 0.0)
+        else:
+            elapsed = now - self.last_seen
+            # 容器重启后累计值归零，负值按 0 处理
+            rates = tuple(max(0.0, (cur - prev) / elapsed) for cur, prev in zip(totals, self._totals))
+        self._totals = totals
+        self.last_seen = now
+        self.mem_limit = sample["mem_limit"]
+        self.pids = sample["pids"]
+        self.series["cpu"].append(sample["cpu"])
+        self.series["mem"].append(sample["mem"])
+        for key, rate in zip(("net_rx", "net_tx", "blk_read", "blk_write"), rates):
+            self.series[key].append(rate)
+
+
+class MetricsCollector:
+    """
+    读取 docker stats 的流式输出，按容器维护定长历史。
+
+    open_stream() 返回 Popen 风格对象（stdout 按行输出）；流结束后按退避重连。
+    超过 stale_after 秒未出现的容器（已停止 / 已删除的沙盒）从表中移除。
+    version 在每次有新样本时递增，界面据此跳过无变化的刷新。
+    on_sample(显示名, 样本) 在采集线程中回调，用于写入历史存储。
+    """
+
+    def __init__(self, open_stream, capacity=300, stale_after=15, on_sample=None, log=None, clock=time.monotonic):
+        self.open_stream = open_stream
+        self.on_sample = on_sample
+        self.capacity = capacity
+        self.stale_after = stale_after
+        self.log = log or (lambda message, level="info": None)
+        self.clock = clock
+        self.version = 0
+        self._containers = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._process = None
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        process = self._process
+        if process is not None and process.poll() is None:
+            try:
+                process.terminate()
+            except Exception:
+                pass
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    def add_sample(self, sample):
+        now = self.clock()
+        with self._lock:
+            container = self._containers.get(sample["name"])
+            if container is None:
+                container = self._containers[sample["name"]] = ContainerMetrics(sample["name"], self.capacity)
+            container.add(sample, now)
+            for name in [name for name, item in self._containers.items() if now - item.last_seen > self.stale_after]:
+                del self._containers[name]
+            self.version += 1
+        if self.on_sample is not None:
+            self.on_sample(container.label, sample)
+
+    def containers(self):
+        """当前容器列表（按显示名排序），序列可能正被采集线程追加，仅用于显示"""
+        with self._lock:
+            return sorted(self._containers.values(), key=lambda item: item.label)
+
+    def _run(self):
+        delay = 2.0
+        while not self._stop.is_set():
+            try:
+                self._process = self.open_stream()
+                for line in self._process.stdout:
+                    if self._stop.is_set():
+                        break
+                    if isinstance(line, bytes):
+                        line = line.decode("utf-8", errors="replace")
+                    # 刷新之间的清屏控制符可能和 JSON 在同一行
+                    for part in line.split("\x1b[2J"):
+                        sample = parse_stats_line(part)
+                        if sample is not None:
+                            self.add_sample(sample)
+                            delay = 2.0
+            except Exception as exc:
+                if not self._stop.is_set():
+                    self.log(f"[资源监控] 读取 docker stats 失败: {exc}", "debug")
+            finally:
+                if self._process is not None and self._process.poll() is None:
+                    try:
+                        self._process.terminate()
+                    except Exception:
+                        pass
+            self._stop.wait(delay)
+            delay = min(delay * 2, 30.0)
+
+
+def format_bytes(value, suffix=""):
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(value) < 1024 or unit == "GB":
+            return f"{value:.0f}{unit}{suffix}" if unit == "B" else f"{value:.1f}{unit}{suffix}"
+        value /= 1024
+    return f"{value:.1f}GB{suffix}"
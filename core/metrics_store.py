@@ -0,0 +1,185 @@
+import csv
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+
+# 汇总粒度（秒）→ 保留时长（秒）
+DEFAULT_RETENTION = {
+    60: 7 * 86400,
+    600: 30 * 86400,
+    3600: 365 * 86400,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS points (
+    series TEXT NOT NULL,
+    resolution INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    total REAL NOT NULL,
+    low REAL NOT NULL,
+    high REAL NOT NULL,
+    PRIMARY KEY (series, resolution, bucket)
+) WITHOUT ROWID
+"""
+
+UPSERT = """
+INSERT INTO points (series, resolution, bucket, count, total, low, high) VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (series, resolution, bucket) DO UPDATE SET
+    count = count + excluded.count,
+    total = total + excluded.total,
+    low = min(low, excluded.low),
+    high = max(high, excluded.high)
+"""
+
+
+class MetricsStore:
+    """
+    指标历史存储（SQLite）：只保存按 1 分钟 / 10 分钟 / 1 小时汇总后的
+    count / sum / min / max，各粒度按 retention 清理。
+
+    record() 只把样本放进内存队列，后台线程每 flush_interval 秒在一个事务内
+    汇总写入，持续采集几乎没有开销；查询与导出前会先落盘未写入的样本。
+    """
+
+    def __init__(self, path, retention=None, flush_interval=10, prune_interval=3600, log=None, clock=time.time):
+        self.path = path
+        self.log = log or (lambda message, level="info": None)
+        self.retention = dict(retention or DEFAULT_RETENTION)
+        self.flush_interval = flush_interval
+        self.prune_interval = prune_interval
+        self.clock = clock
+        self._pending = deque()
+        self._db_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._last_prune = 0.0
+        self._thread = None
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(SCHEMA)
+        self._db.commit()
+
+    # ------------------------------------------------------------------ #
+    #  写入
+    # ------------------------------------------------------------------ #
+
+    def record(self, series, value, timestamp=None):
+        """记录一个样本（任意线程调用）"""
+        self._pending.append((series, float(value), timestamp if timestamp is not None else self.clock()))
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+        with self._db_lock:
+            self._db.close()
+
+    def flush(self):
+        """把队列中的样本汇总后写入，返回写入的样本数"""
+        batch = []
+        while self._pending:
+            batch.append(self._pending.popleft())
+        if not batch:
+            return 0
+        rows = {}
+        for series, value, timestamp in batch:
+            for resolution in self.retention:
+                key = (series, resolution, int(timestamp // resolution * resolution))
+                row = rows.get(key)
+                if row is None:
+                    rows[key] = [1, value, value, value]
+                else:
+                    row[0] += 1
+                    row[1] += value
+                    row[2] = min(row[2], value)
+                    row[3] = max(row[3], value)
+        with self._db_lock:
+            with self._db:
+                self._db.executemany(UPSERT, [(*key, *row) for key, row in rows.items()])
+        return len(batch)
+
+    def prune(self):
+        now = self.clock()
+        with self._db_lock:
+            with self._db:
+                for resolution, keep in self.retention.items():
+                    self._db.execute(
+                        "DELETE FROM points WHERE resolution = ? AND bucket < ?", (resolution, now - keep)
+                    )
+        self._last_prune = now
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+                if self.clock() - self._last_prune >= self.prune_interval:
+                    self.prune()
+            except sqlite3.Error as exc:
+                self.log(f"[指标历史] 写入失败: {exc}", "warning")
+
+    # ------------------------------------------------------------------ #
+    #  查询
+    # ------------------------------------------------------------------ #
+
+    def series_names(self, prefix=""):
+        self.flush()
+        with self._db_lock:
+            rows = self._db.execute(
+                "SELECT DISTINCT series FROM points WHERE resolution = ? AND series LIKE ? ORDER BY series",
+                (min(self.retention), prefix + "%"),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def pick_resolution(self, start, end, max_points=500):
+        """选能覆盖该时间段（未超出保留期）且点数不超过 max_points 的最细粒度"""
+        span = max(1, end - start)
+        now = self.clock()
+        for resolution in sorted(self.retention):
+            if start >= now - self.retention[resolution] and span / resolution <= max_points:
+                return resolution
+        return max(self.retention)
+
+    def query(self, series, start, end=None, resolution=None, max_points=500):
+        """返回 [(时间戳, 平均值, 最小值, 最大值)]，按时间升序"""
+        end = end if end is not None else self.clock()
+        resolution = resolution or self.pick_resolution(start, end, max_points)
+        self.flush()
+        with self._db_lock:
+            rows = self._db.execute(
+                "SELECT bucket, total / count, low, high FROM points "
+                "WHERE series = ? AND resolution = ? AND bucket >= ? AND bucket <= ? ORDER BY bucket",
+                (series, resolution, int(start // resolution * resolution), int(end)),
+            ).fetchall()
+        return rows
+
+    def export_csv(self, path, series=None, start=0, end=None, resolution=None):
+        """导出为 CSV（时间、指标、平均、最小、最大、样本数），返回导出的行数"""
+        end = end if end is not None else self.clock()
+        resolution = resolution or min(self.retention)
+        self.flush()
+        names = series or self.series_names()
+        count = 0
+        with self._db_lock:
+            with open(path, "w", newline="", encoding="utf-8-sig") as fh:
+                writer = csv.writer(fh)
+                writer.writerow(["time", "series", "avg", "min", "max", "samples"])
+                for name in names:
+                    for bucket, total, samples, low, high in self._db.execute(
+                        "SELECT bucket, total, count, low, high FROM points "
+                        "WHERE series = ? AND resolution = ? AND bucket >= ? AND bucket <= ? ORDER BY bucket",
+                        (name, resolution, int(start), int(end)),
+                    ):
+                        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(bucket))
+                        writer.writerow([stamp, name, round(total / samples, 4), low, high, samples])
+                        count += 1
+        return count
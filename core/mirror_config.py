@@ -23,3 +23,15 @@ DOCKER_APT_MIRRORS = [
     ("阿里云", "https://mirrors.aliyun.com/docker-ce"),
     ("官方源", "https://download.docker.com"),
 ]
+
+# Docker 静态二进制包（dockerd / containerd / runc 等）下载源，按优先级排列
+DOCKER_STATIC_BASE_URLS = [
+    "https://mirrors.aliyun.com/docker-ce/linux/static/stable/x86_64",
+    "https://mirrors.tuna.tsinghua.edu.cn/docker-ce/linux/static/stable/x86_64",
+    "https://download.docker.com/linux/static/stable/x86_64",
+]
+
+# Docker Compose 插件 Release 下载源
+COMPOSE_RELEASE_BASE_URLS = [
+    "https://github.com/docker/compose/releases/download",
+]
@@ -0,0 +1,118 @@
+import subprocess
+import sys
+import threading
+
+
+PREWARM_PHASE = "运行环境预热"
+
+# 在发行版内拉起 dockerd 并等待其可用
+WSL_WARM_COMMAND = (
+    "systemctl start docker >/dev/null 2>&1; "
+    "for i in $(seq 60); do docker info >/dev/null 2>&1 && exit 0; sleep 1; done; exit 1"
+)
+
+
+class RuntimePrewarmer:
+    """
+    进程启动后立即在后台预热运行环境：WSL 启动发行版并拉起 dockerd，
+    Hyper-V 启动虚拟机并等待 SSH 就绪。不依赖 Qt，可在构建界面之前启动；
+    之后的启动流程通过 wait() 接上已预热的运行环境。
+    """
+
+    def __init__(self, config, timeline=None, log=None):
+        self.config = config
+        self.timeline = timeline
+        self.log = log or (lambda message: None)
+        self.backend_key = (config.get("backend") or "wsl").lower()
+        self.ok = False
+        self.detail = ""
+        self.session = None  # Hyper-V 预热时打开的提权会话，交给后端复用
+        self._done = threading.Event()
+        self._thread = None
+
+    def should_run(self):
+        return bool(
+            self.config.get("prewarm_runtime")
+            and not self.config.get("first_run")
+            and self.config.get("deploy_mode")
+        )
+
+    def start(self):
+        if self._thread is not None:
+            return True
+        if not self.should_run():
+            self._done.set()
+            return False
+        if self.timeline:
+            self.timeline.begin(PREWARM_PHASE)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return True
+
+    @property
+    def started(self):
+        return self._thread is not None
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """等待预热结束，返回是否预热成功（超时返回 False）"""
+        return self._done.wait(timeout) and self.ok
+
+    def _run(self):
+        try:
+            if self.backend_key == "hyperv":
+                self.ok = self._warm_hyperv()
+            else:
+                self.ok = self._warm_wsl()
+        except Exception as exc:
+            self.ok = False
+            self.detail = str(exc)
+        finally:
+            elapsed = ""
+            if self.timeline:
+                self.timeline.end(PREWARM_PHASE)
+                elapsed = f"，耗时 {self.timeline.duration(PREWARM_PHASE):.1f}s"
+            result = "完成" if self.ok else f"未完成（{self.detail or '未知原因'}）"
+            self.log(f"运行环境预热{result}{elapsed}")
+            self._done.set()
+
+    def _warm_wsl(self):
+        distro = self.config.get("wsl_distro") or "NekroAgent"
+        proc = subprocess.run(
+            ["wsl", "-d", distro, "--", "bash", "-c", WSL_WARM_COMMAND],
+            capture_output=True, timeout=180,
+            creationflags=0x08000000 if sys.platform == "win32" and getattr(sys, "frozen", False) else 0,
+        )
+        if proc.returncode != 0:
+            self.detail = f"dockerd 未就绪，返回码 {proc.returncode}"
+        return proc.returncode == 0
+
+    def _warm_hyperv(self):
+        # 预热在启动最早期执行，Hyper-V 相关模块只在需要时导入
+        import asyncio
+        from core.guest_readiness import probe_ssh_banner, wait_until_ready
+        from core.hyperv_manager import HyperVManager
+
+        host = self.config.get("hyperv_guest_ip")
+        port = self.config.get("hyperv_ssh_port") or 22
+        # 虚拟机已在运行时无需提权
+        if asyncio.run(probe_ssh_banner(host, port, timeout=1.0)):
+            return True
+        manager = HyperVManager(
+            self.config.get("hyperv_vm_name"),
+            self.config.get("hyperv_switch_name"),
+            self.config.get("hyperv_nat_name"),
+            self.config.get("hyperv_subnet"),
+        )
+        started = manager.start_vm()
+        self.session = manager.session
+        if not started:
+            self.detail = "启动虚拟机失败"
+            return False
+        if not wait_until_ready(host, port, 180):
+            self.detail = "等待 SSH 就绪超时"
+            return False
+        return True
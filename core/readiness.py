@@ -0,0 +1,143 @@
+import time
+from dataclasses import dataclass
+
+
+# 列出 compose 项目内全部容器（含已退出的）的服务名、状态、健康状态、退出码和重启次数
+INSPECT_FORMAT = (
+    '{{index .Config.Labels "com.docker.compose.service"}}|{{.State.Status}}|'
+    "{{if .State.Health}}{{.State.Health.Status}}{{end}}|{{.State.ExitCode}}|{{.RestartCount}}"
+)
+
+
+def inspect_command(deploy_dir):
+    """生成在运行环境内执行的容器状态查询命令"""
+    return (
+        f"cd {deploy_dir} && ids=$(docker compose -f docker-compose.yml --env-file .env ps -aq) && "
+        f"[ -n \"$ids\" ] && docker inspect --format '{INSPECT_FORMAT}' $ids"
+    )
+
+
+@dataclass
+class ContainerState:
+    service: str
+    status: str          # created / running / restarting / exited / dead ...
+    health: str          # starting / healthy / unhealthy，未定义健康检查时为空
+    exit_code: int = 0
+    restarts: int = 0
+
+    @property
+    def ready(self):
+        if self.health:
+            return self.health == "healthy"
+        return self.status == "running"
+
+    def describe(self):
+        text = self.status
+        if self.health:
+            text += f" / {self.health}"
+        if self.status in ("exited", "dead"):
+            text += f"（退出码 {self.exit_code}）"
+        return text
+
+
+def parse_inspect_output(output):
+    """解析 inspect_command 的输出，返回 {服务名: ContainerState}"""
+    states = {}
+    for line in (output or "").splitlines():
+        parts = line.strip().split("|")
+        if len(parts) != 5 or not parts[0]:
+            continue
+        service, status, health, exit_code, restarts = parts
+        try:
+            states[service] = ContainerState(service, status, health, int(exit_code or 0), int(restarts or 0))
+        except ValueError:
+            continue
+    return states
+
+
+class ReadinessTracker:
+    """
+    跟踪 compose 服务的容器状态与健康检查，判断整体是否就绪。
+
+    fetch() 返回 {服务名: ContainerState}；状态有变化时立即缩短轮询间隔，
+    否则按指数退避拉长。出现以下情况时提前判定失败，不必等到超时：
+      - 容器处于 dead 状态，或连续两次查询都以非 0 退出码处于退出状态
+        （第一次看到时可能正由重启策略拉起）
+      - 健康检查判定 unhealthy（重试次数已用完）
+      - 跟踪期间重启次数达到 max_restarts（崩溃循环）
+    必需服务未定义健康检查时（旧版 compose 文件），容器运行后再用 probe() 确认。
+    """
+
+    def __init__(self, fetch, required=("nekro_agent",), timeout=300, max_restarts=3,
+                 initial_delay=0.5, max_delay=5.0, log=None, stop_event=None, probe=None,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.fetch = fetch
+        self.probe = probe
+        self.required = tuple(required)
+        self.timeout = timeout
+        self.max_restarts = max_restarts
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.log = log or (lambda message, level="info": None)
+        self.stop_event = stop_event
+        self.clock = clock
+        self.sleep = sleep
+        self.states = {}
+        self.timed_out = False
+        self._baseline_restarts = {}
+        self._exited = set()
+
+    def update(self, states):
+        """处理一次状态快照，返回 (结论, 说明, 是否有变化)，结论为 ready / failed / waiting"""
+        changed = False
+        for service, state in sorted(states.items()):
+            previous = self.states.get(service)
+            if previous is None or (previous.status, previous.health) != (state.status, state.health):
+                changed = True
+                self.log(f"[就绪检测] {service}: {state.describe()}", "debug")
+            self._baseline_restarts.setdefault(service, state.restarts)
+        self.states = states
+
+        exited = {service for service, state in states.items() if state.status == "exited" and state.exit_code != 0}
+        confirmed, self._exited = exited & self._exited, exited
+        for service, state in sorted(states.items()):
+            if state.status == "dead" or service in confirmed:
+                return "failed", f"{service} 已退出（{state.describe()}）", changed
+            if state.health == "unhealthy":
+                return "failed", f"{service} 健康检查失败", changed
+            restarts = state.restarts - self._baseline_restarts.get(service, state.restarts)
+            if restarts >= self.max_restarts:
+                return "failed", f"{service} 反复重启（{restarts} 次）", changed
+
+        missing = [service for service in self.required if service not in states]
+        if missing:
+            return "waiting", f"等待容器创建: {', '.join(missing)}", changed
+        pending = [service for service, state in sorted(states.items()) if not state.ready]
+        if pending:
+            return "waiting", "等待: " + ", ".join(f"{s}({states[s].describe()})" for s in pending), changed
+        unchecked = [service for service in self.required if not states[service].health]
+        if unchecked and self.probe and not self.probe():
+            return "waiting", f"等待服务响应: {', '.join(unchecked)}", changed
+        return "ready", "", changed
+
+    def wait(self):
+        """阻塞直到就绪、失败、超时或被停止，返回 (ok, 说明)"""
+        deadline = self.clock() + self.timeout
+        delay = self.initial_delay
+        detail = "尚未获取到容器状态"
+        while not (self.stop_event and self.stop_event.is_set()):
+            try:
+                verdict, detail, changed = self.update(self.fetch())
+            except Exception as exc:
+                verdict, changed = "waiting", False
+                detail = f"获取容器状态失败: {exc}"
+            if verdict == "ready":
+                return True, ""
+            if verdict == "failed":
+                return False, detail
+            if self.clock() >= deadline:
+                self.timed_out = True
+                return False, f"等待超时（{detail}）"
+            delay = self.initial_delay if changed else min(delay * 1.6, self.max_delay)
+            self.sleep(min(delay, max(0.0, deadline - self.clock())))
+        return False, "已停止"
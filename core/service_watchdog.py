@@ -0,0 +1,237 @@
+import threading
+import time
+from collections import deque
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+
+# 恢复阶梯：依次尝试重启异常服务 → 重启整个 Compose 项目 → 重启运行环境
+RECOVERY_STEPS = ("service", "stack", "runtime")
+RECOVERY_LABELS = {
+    "service": "重启异常服务",
+    "stack": "重启全部服务",
+    "runtime": "重启运行环境",
+}
+
+HEALTH_OK = "正常"
+HEALTH_DEGRADED = "服务降级"
+HEALTH_DOWN = "无响应"
+HEALTH_RECOVERING = "恢复中"
+HEALTH_GAVE_UP = "自动恢复已暂停"
+
+
+def http_probe(url, timeout=5):
+    """请求一次服务地址，返回 (是否正常, 耗时秒, 说明)"""
+    started = time.perf_counter()
+    try:
+        with urlopen(url, timeout=timeout) as response:
+            status = response.status
+        return status < 500, time.perf_counter() - started, f"HTTP {status}"
+    except HTTPError as exc:
+        # 4xx（未登录、路径不存在等）说明服务仍在响应，只有 5xx 视为异常
+        return exc.code < 500, time.perf_counter() - started, f"HTTP {exc.code}"
+    except Exception as exc:
+        return False, time.perf_counter() - started, str(getattr(exc, "reason", exc))
+
+
+class LatencyWindow:
+    """最近 size 次成功探测的耗时，用于计算 p50 / p99"""
+
+    def __init__(self, size=120):
+        self._samples = deque(maxlen=size)
+
+    def add(self, seconds):
+        self._samples.append(seconds)
+
+    def clear(self):
+        self._samples.clear()
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, q):
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))
+        return ordered[index]
+
+
+class RestartLimiter:
+    """滑动时间窗内最多执行 max_actions 次恢复，两次之间至少间隔 cooldown 秒，防止反复重启"""
+
+    def __init__(self, max_actions=3, window=1800, cooldown=60, clock=time.monotonic):
+        self.max_actions = max_actions
+        self.window = window
+        self.cooldown = cooldown
+        self.clock = clock
+        self._history = deque()
+
+    def allow(self):
+        now = self.clock()
+        while self._history and now - self._history[0] > self.window:
+            self._history.popleft()
+        if len(self._history) >= self.max_actions:
+            return False
+        return not self._history or now - self._history[-1] >= self.cooldown
+
+    def record(self):
+        self._history.append(self.clock())
+
+
+class ServiceWatchdog:
+    """
+    服务就绪后持续探测服务地址，统计响应耗时并按恢复阶梯自动恢复。
+
+    - 成功探测的 p99 超过 slo_p99 秒或偶发探测失败时报告“服务降级”
+    - 连续 failure_threshold 次失败时报告“无响应”，执行阶梯的下一步；
+      恢复后留出 grace 秒等待服务重新就绪，期间不计失败
+    - 连续 stable_checks 次正常后阶梯回到第一步
+    - 恢复次数受 RestartLimiter 限制，超出后只报告不再重启
+
+    probe() 返回 (ok, 耗时秒, 说明)；recover(step) 执行恢复，返回是否成功；
+    on_health(health, detail) 在健康状态或说明变化时回调。
+    notify() 接收容器事件：容器异常退出时立即探测，5 分钟内重启次数达到
+    crash_loop_threshold 时报告服务降级（重启由容器自身的重启策略负责）。
+    """
+
+    def __init__(self, probe, recover, on_health=None, log=None, interval=15, failure_threshold=3,
+                 slo_p99=2.0, min_samples=10, steps=RECOVERY_STEPS, limiter=None, grace=90,
+                 stable_checks=20, crash_loop_threshold=3, clock=time.monotonic):
+        self.probe = probe
+        self.recover = recover
+        self.on_health = on_health or (lambda health, detail: None)
+        self.log = log or (lambda message, level="info": None)
+        self.interval = interval
+        self.failure_threshold = failure_threshold
+        self.slo_p99 = slo_p99
+        self.min_samples = min_samples
+        self.steps = tuple(steps) or RECOVERY_STEPS
+        self.limiter = limiter or RestartLimiter(clock=clock)
+        self.grace = grace
+        self.stable_checks = stable_checks
+        self.crash_loop_threshold = crash_loop_threshold
+        self.clock = clock
+
+        self.latency = LatencyWindow()
+        self.health = HEALTH_OK
+        self.detail = ""
+        self.failures = 0
+        self._step_index = 0
+        self._ok_streak = 0
+        self._grace_until = 0.0
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._crash_loop = ""          # 崩溃循环说明，对应服务恢复健康后清除
+        self._crash_loop_service = ""
+        self._thread = None
+
+    # ------------------------------------------------------------------ #
+    #  线程控制
+    # ------------------------------------------------------------------ #
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    def notify(self, event, restarts):
+        """容器事件回调，restarts 为该服务各时间窗（秒）内的重启次数"""
+        recent = restarts.get(300, 0)
+        if recent >= self.crash_loop_threshold:
+            self._crash_loop = f"{event.service} 5 分钟内重启 {recent} 次"
+            self._crash_loop_service = event.service
+            self.log(f"[看门狗] {self._crash_loop}，疑似崩溃循环", "warning")
+        elif event.service == self._crash_loop_service and event.health == "healthy":
+            self._crash_loop = self._crash_loop_service = ""
+        if event.abnormal:
+            self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.check_once()
+            except Exception as exc:
+                self.log(f"[看门狗] 检查异常: {exc}", "warning")
+
+    # ------------------------------------------------------------------ #
+    #  单次检查
+    # ------------------------------------------------------------------ #
+
+    def latency_summary(self):
+        p50, p99 = self.latency.percentile(50), self.latency.percentile(99)
+        if p50 is None:
+            return "暂无数据"
+        return f"p50 {p50 * 1000:.0f}ms / p99 {p99 * 1000:.0f}ms"
+
+    def check_once(self):
+        """探测一次并更新状态，返回当前健康状态"""
+        ok, elapsed, detail = self.probe()
+        if self._stop.is_set():
+            return self.health
+        if ok:
+            self.failures = 0
+            self.latency.add(elapsed)
+            self._ok_streak += 1
+            if self._step_index and self._ok_streak >= self.stable_checks:
+                self._step_index = 0
+            p99 = self.latency.percentile(99)
+            if self._crash_loop:
+                self._set_health(HEALTH_DEGRADED, self._crash_loop)
+            elif len(self.latency) >= self.min_samples and p99 > self.slo_p99:
+                self._set_health(HEALTH_DEGRADED, f"{self.latency_summary()}，超过 {self.slo_p99 * 1000:.0f}ms")
+            else:
+                self._set_health(HEALTH_OK, self.latency_summary())
+            return self.health
+
+        self._ok_streak = 0
+        if self.clock() < self._grace_until:
+            return self.health
+        self.failures += 1
+        if self.failures < self.failure_threshold:
+            self._set_health(HEALTH_DEGRADED, f"探测失败 {self.failures} 次: {detail}")
+            return self.health
+
+        if not self.limiter.allow():
+            self._set_health(HEALTH_GAVE_UP, f"连续 {self.failures} 次无响应，恢复次数已达上限: {detail}")
+            return self.health
+
+        step = self.steps[self._step_index]
+        self._step_index = min(self._step_index + 1, len(self.steps) - 1)
+        self.limiter.record()
+        self._set_health(HEALTH_RECOVERING, f"连续 {self.failures} 次无响应，{RECOVERY_LABELS.get(step, step)}")
+        self.log(f"[看门狗] 服务无响应（{detail}），{RECOVERY_LABELS.get(step, step)}", "warning")
+        try:
+            recovered = self.recover(step)
+        except Exception as exc:
+            recovered = False
+            self.log(f"[看门狗] {RECOVERY_LABELS.get(step, step)}失败: {exc}", "error")
+        self.failures = 0
+        self.latency.clear()
+        self._grace_until = self.clock() + self.grace
+        if not recovered:
+            self._set_health(HEALTH_DOWN, f"{RECOVERY_LABELS.get(step, step)}未成功")
+        return self.health
+
+    def _set_health(self, health, detail):
+        changed_health = health != self.health
+        if changed_health or detail != self.detail:
+            self.health, self.detail = health, detail
+            self.on_health(health, detail)
+        if changed_health and health == HEALTH_OK:
+            self.log(f"[看门狗] 服务恢复正常（{detail}）", "info")
+
@@ -0,0 +1,207 @@
+import ctypes
+import os
+import re
+import shutil
+from dataclasses import dataclass, field
+
+
+MB = 1024 * 1024
+GB = 1024 * MB
+
+# 各部署模式的服务内存基线（MB）：postgres + qdrant + nekro-agent (+ napcat) + 沙盒余量
+WORKLOAD_BASELINE_MB = {
+    "lite": 3072,
+    "napcat": 4608,
+}
+# 各部署模式期望的 vCPU 上限
+WORKLOAD_VCPUS = {
+    "lite": 4,
+    "napcat": 6,
+}
+# 始终为 Windows 保留的内存（MB）
+HOST_RESERVE_MB = 4096
+# 可用磁盘低于此值时不配置 swap（GB）
+LOW_DISK_GB = 20
+
+
+@dataclass
+class HostResources:
+    total_memory_mb: int
+    cpu_count: int
+    free_disk_gb: float
+
+
+@dataclass
+class SizingProfile:
+    deploy_mode: str
+    memory_mb: int           # 启动内存 / WSL memory 上限
+    memory_min_mb: int       # Hyper-V 动态内存下限
+    memory_max_mb: int       # Hyper-V 动态内存上限
+    vcpus: int
+    swap_mb: int
+    auto_memory_reclaim: str
+    sparse_vhd: bool
+    headroom_mb: int         # 运行环境占满上限后宿主机剩余内存
+    warnings: list = field(default_factory=list)
+
+
+def _total_memory_mb():
+    if os.name == "nt":
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [
+                ("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong),
+                ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+                ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+                ("ullAvailExtendedVirtual", ctypes.c_ulonglong),
+            ]
+
+        status = MEMORYSTATUSEX()
+        status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return int(status.ullTotalPhys // MB)
+        return 0
+    try:
+        return int(os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // MB)
+    except (ValueError, OSError, AttributeError):
+        return 0
+
+
+def read_host_resources(disk_path=None):
+    """读取宿主机内存、CPU 核数和安装目录所在磁盘的剩余空间"""
+    disk_path = disk_path or os.path.expanduser("~")
+    while disk_path and not os.path.exists(disk_path):
+        parent = os.path.dirname(disk_path)
+        if parent == disk_path:
+            break
+        disk_path = parent
+    try:
+        free_gb = shutil.disk_usage(disk_path).free / GB
+    except OSError:
+        free_gb = 0.0
+    return HostResources(_total_memory_mb(), os.cpu_count() or 1, round(free_gb, 1))
+
+
+def _round_down(value_mb, step=256):
+    return max(step, int(value_mb) // step * step)
+
+
+def compute_profile(host, deploy_mode):
+    """按宿主机资源和部署模式计算运行环境规格"""
+    mode = deploy_mode if deploy_mode in WORKLOAD_BASELINE_MB else "napcat"
+    baseline = WORKLOAD_BASELINE_MB[mode]
+    warnings = []
+
+    # 给 Windows 至少保留 HOST_RESERVE_MB 或 1/4 内存，剩余部分最多给到基线的 1.5 倍
+    reserve = max(HOST_RESERVE_MB, host.total_memory_mb // 4)
+    available = max(0, host.total_memory_mb - reserve)
+    memory = _round_down(min(baseline * 3 // 2, max(available, baseline // 2)))
+    if available < baseline:
+        warnings.append(
+            f"宿主机内存 {host.total_memory_mb / 1024:.1f} GB 偏少，"
+            f"{mode} 模式建议至少 {(baseline + HOST_RESERVE_MB) / 1024:.0f} GB"
+        )
+    memory_max = _round_down(max(memory, min(available, baseline * 2)))
+    memory_min = _round_down(min(memory, 1024))
+
+    vcpus = max(1, min(WORKLOAD_VCPUS[mode], host.cpu_count // 2 or 1, host.cpu_count - 1 or 1))
+
+    if host.free_disk_gb < LOW_DISK_GB:
+        swap = 0
+        warnings.append(f"安装磁盘剩余 {host.free_disk_gb:.0f} GB，已关闭 swap")
+    else:
+        swap = _round_down(min(memory // 4, 4096))
+
+    return SizingProfile(
+        deploy_mode=mode,
+        memory_mb=memory,
+        memory_min_mb=memory_min,
+        memory_max_mb=memory_max,
+        vcpus=vcpus,
+        swap_mb=swap,
+        auto_memory_reclaim="gradual",
+        sparse_vhd=True,
+        headroom_mb=max(0, host.total_memory_mb - memory_max),
+        warnings=warnings,
+    )
+
+
+def describe_profile(profile, host):
+    """生成展示给用户的规格与余量说明"""
+    return (
+        f"{profile.deploy_mode} 模式: 内存 {profile.memory_mb / 1024:.1f} GB"
+        f"（动态 {profile.memory_min_mb / 1024:.1f}-{profile.memory_max_mb / 1024:.1f} GB），"
+        f"{profile.vcpus} 核，swap {profile.swap_mb / 1024:.1f} GB；"
+        f"宿主机 {host.total_memory_mb / 1024:.1f} GB / {host.cpu_count} 核，"
+        f"预计剩余 {profile.headroom_mb / 1024:.1f} GB"
+    )
+
+
+def wslconfig_settings(profile):
+    """返回 {节: {键: 值}}，只包含本程序管理的 .wslconfig 项"""
+    return {
+        "wsl2": {
+            "memory": f"{profile.memory_mb}MB",
+            "processors": str(profile.vcpus),
+            "swap": f"{profile.swap_mb}MB",
+        },
+        "experimental": {
+            "autoMemoryReclaim": profile.auto_memory_reclaim,
+            "sparseVhd": "true" if profile.sparse_vhd else "false",
+        },
+    }
+
+
+def render_wslconfig(profile, existing=""):
+    """
+    把规格合并进已有的 .wslconfig 文本：只补充尚未设置的键，
+    用户已设置的值（该文件同时影响其他发行版和 Docker Desktop）以及其他节、注释原样保留。
+    """
+    pending = {section: dict(values) for section, values in wslconfig_settings(profile).items()}
+    lines = existing.splitlines()
+    output = []
+    section = None
+
+    def flush(target):
+        # 追加到该节末尾、节后空行之前
+        blanks = 0
+        while output and not output[-1].strip():
+            output.pop()
+            blanks += 1
+        for key, value in pending.pop(target, {}).items():
+            output.append(f"{key}={value}")
+        output.extend([""] * blanks)
+
+    for line in lines:
+        header = re.match(r"^\s*\[([^\]]+)\]\s*$", line)
+        if header:
+            if section in pending:
+                flush(section)
+            section = header.group(1).strip().lower()
+            output.append(line)
+            continue
+        entry = re.match(r"^\s*([A-Za-z0-9_.]+)\s*=", line)
+        if entry and section in pending:
+            key = next((k for k in pending[section] if k.lower() == entry.group(1).lower()), None)
+            if key:
+                pending[section].pop(key)
+        output.append(line)
+    if section in pending:
+        flush(section)
+
+    for name in list(pending):
+        if output and output[-1].strip():
+            output.append("")
+        output.append(f"[{name}]")
+        flush(name)
+    return "\n".join(output) + "\n"
+
+
+def hyperv_sizing_command(vm_name, profile):
+    """生成应用规格的 PowerShell 命令（需在虚拟机关机时执行）"""
+    return (
+        f"Set-VMMemory -VMName '{vm_name}' -DynamicMemoryEnabled $true "
+        f"-StartupBytes {profile.memory_mb}MB -MinimumBytes {profile.memory_min_mb}MB "
+        f"-MaximumBytes {profile.memory_max_mb}MB | Out-Null; "
+        f"Set-VMProcessor -VMName '{vm_name}' -Count {profile.vcpus} | Out-Null"
+    )
@@ -25,9 +25,11 @@ class SSHTransport:
             args.extend(["-i", self.private_key])
         return args
 
-    def exec(self, command, timeout=60):
+    def exec(self, command, timeout=60, input=None):
+        """执行远程命令，input 为写入远程命令标准输入的文本"""
         proc = subprocess.run(
             ["ssh", *self._base_args(), f"{self.username}@{self.host}", command],
+            input=input,
             capture_output=True,
             text=True,
             encoding="utf-8",
@@ -36,6 +38,17 @@ class SSHTransport:
         )
         return proc.returncode, proc.stdout.strip(), proc.stderr.strip()
 
+    def popen(self, command):
+        """启动长期运行的远程命令（如事件订阅），按行读取其文本输出"""
+        return subprocess.Popen(
+            ["ssh", *self._base_args(), "-o", "ServerAliveInterval=15", f"{self.username}@{self.host}", command],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+        )
+
     def copy_to_guest(self, local_path, remote_path, timeout=120):
         remote = f"{self.username}@{self.host}:{remote_path}"
         proc = subprocess.run(
@@ -0,0 +1,155 @@
+import ctypes
+import os
+import sys
+import threading
+import time
+
+
+class StartupTimeline:
+    """
+    记录启动过程中的时间点和阶段（相对进程启动），用于分析启动耗时。
+    阶段可以跨线程：begin / end 分别在不同线程调用也可以。
+    """
+
+    def __init__(self, origin=None):
+        self.origin = time.perf_counter() if origin is None else origin
+        self._lock = threading.Lock()
+        self._marks = []       # [(名称, 时间)]
+        self._phases = {}      # 名称 -> [开始, 结束]
+
+    def now(self):
+        return time.perf_counter() - self.origin
+
+    def mark(self, name):
+        with self._lock:
+            self._marks.append((name, self.now()))
+
+    def begin(self, name):
+        with self._lock:
+            self._phases[name] = [self.now(), None]
+
+    def end(self, name):
+        with self._lock:
+            if name in self._phases and self._phases[name][1] is None:
+                self._phases[name][1] = self.now()
+
+    def duration(self, name):
+        """阶段耗时（秒），未开始返回 None，未结束时返回已进行的时间"""
+        with self._lock:
+            span = self._phases.get(name)
+        if not span:
+            return None
+        return (span[1] if span[1] is not None else self.now()) - span[0]
+
+    def report(self):
+        """按时间顺序输出时间点与阶段"""
+        with self._lock:
+            rows = [(at, f"{name}") for name, at in self._marks]
+            for name, (start, end) in self._phases.items():
+                if end is None:
+                    rows.append((start, f"{name} 开始（进行中）"))
+                else:
+                    rows.append((start, f"{name} 开始，耗时 {end - start:.3f}s"))
+        rows.sort(key=lambda row: row[0])
+        return "\n".join(f"  +{at:7.3f}s  {text}" for at, text in rows)
+
+
+class _TimedLoader:
+    """包装模块加载器，记录 create_module + exec_module 的耗时（含其内部嵌套导入）"""
+
+    def __init__(self, loader, name, profiler):
+        self._loader = loader
+        self._name = name
+        self._profiler = profiler
+
+    def create_module(self, spec):
+        started = time.perf_counter()
+        try:
+            return self._loader.create_module(spec)
+        finally:
+            self._profiler.add(self._name, time.perf_counter() - started)
+
+    def exec_module(self, module):
+        started = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler.add(self._name, time.perf_counter() - started)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class ImportProfiler:
+    """
+    debug 模式下统计各模块导入耗时：插到 sys.meta_path 最前面，
+    把其他查找器返回的加载器包一层计时。耗时为累计值，包含子模块导入。
+    """
+
+    def __init__(self):
+        self.timings = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def install(self):
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def add(self, name, seconds):
+        with self._lock:
+            self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def find_spec(self, fullname, path=None, target=None):
+        if getattr(self._local, "busy", False):
+            return None
+        self._local.busy = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                        spec.loader = _TimedLoader(spec.loader, fullname, self)
+                    return spec
+            return None
+        finally:
+            self._local.busy = False
+
+    def report(self, limit=15):
+        with self._lock:
+            rows = sorted(self.timings.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return "\n".join(f"  {seconds * 1000:8.1f} ms  {name}" for name, seconds in rows)
+
+
+def resident_memory_mb():
+    """当前进程常驻内存（MB），无法获取时返回 0"""
+    if os.name == "nt":
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [
+                ("cb", ctypes.c_ulong), ("PageFaultCount", ctypes.c_ulong),
+                ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(PROCESS_MEMORY_COUNTERS)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize / (1024 * 1024)
+        return 0.0
+    try:
+        with open("/proc/self/statm", "r") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+# 进程内共享的启动时间线，尽早导入以接近进程启动时刻
+timeline = StartupTimeline()
@@ -0,0 +1,226 @@
+import codecs
+import re
+
+
+# WSL 自身输出的提示（如 localhost 代理 / NAT 模式警告），与命令输出混在 stderr 里；
+# 按公共前缀合并并匹配小写文本，避免 IGNORECASE 下逐位置尝试每个分支
+_NOISE_PATTERN = re.compile(r"localhost (?:代理配置|proxy)|nat (?:模式下的 wsl|mode)|未镜像到 wsl")
+_LINE_BREAK = re.compile(r"\r\n|[\r\n]")
+
+
+def detect_encoding(data):
+    """
+    根据开头的字节判断编码：BOM → utf-16；奇数位置大多为 0x00，或偶数偏移处的换行符后跟 0x00
+    → 无 BOM 的 utf-16-le（wsl.exe 的输出，以中文为主时只有换行符带 0x00）；
+    能按 UTF-8 解码 → utf-8；否则 gbk。只用切片、count、find 等字节操作，不逐字节循环。
+    """
+    if data.startswith((b"\xff\xfe", b"\xfe\xff")):
+        return "utf-16"
+    odd = data[1::2]
+    if len(data) >= 4 and odd.count(0) / len(odd) > 0.7:
+        return "utf-16-le"
+    index = data.find(b"\n\x00")
+    while index != -1:
+        if index % 2 == 0:
+            return "utf-16-le"
+        index = data.find(b"\n\x00", index + 1)
+    try:
+        # 样本末尾可能截断了多字节字符，按未结束的流校验
+        codecs.getincrementaldecoder("utf-8")().decode(data, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "gbk"
+
+
+def decode_output(data):
+    """一次性解码完整的命令输出，识别出的编码解码失败时依次尝试 utf-8、gbk、latin1"""
+    if isinstance(data, str):
+        return data
+    if not isinstance(data, (bytes, bytearray)):
+        return str(data)
+    if not data:
+        return ""
+    encoding = detect_encoding(data)
+    for candidate in (encoding, "utf-8", "gbk"):
+        try:
+            return data.decode(candidate)
+        except UnicodeDecodeError:
+            continue
+    return data.decode("latin1", errors="replace")
+
+
+def is_wsl_noise(text, garbled=True):
+    """
+    判断是否为 WSL 系统噪音（WSL 警告、UTF-16 解码残留的乱码）。
+    garbled=False 时不按非 ASCII 占比判断乱码，用于已正确解码、可能大量含中文的输出。
+    """
+    if not text:
+        return False
+    # 原文含大量 null 字节说明是 UTF-16 解码残留
+    if text.count("\x00") > 0.2 * len(text):
+        return True
+    stripped = text.replace("\x00", "").strip().lstrip("\ufeff").lower()
+    if stripped.startswith("wsl:") or _NOISE_PATTERN.search(stripped):
+        return True
+    if not garbled or text.isascii():
+        return False
+    # 非 ASCII 字符占比超过 30% 则认为是乱码
+    ascii_count = len(text.encode("ascii", errors="ignore"))
+    return len(text) - ascii_count > 0.3 * len(text)
+
+
+def clean_output(data, max_len=500):
+    """解码并去掉 WSL 噪音行，max_len 为 0 时不截断"""
+    lines = [line for line in decode_output(data).splitlines() if line.strip() and not is_wsl_noise(line)]
+    result = "\n".join(lines)
+    return result[:max_len] if max_len else result
+
+
+class StreamDecoder:
+    """
+    单个输出流的增量解码器：攒够 sample_size 字节、出现第一个换行或流结束时识别一次编码，
+    之后用对应的增量解码器处理后续数据块，跨块截断的多字节字符 / UTF-16 码元不会被解坏。
+    feed() 返回已完整的行，不完整的行留到下一块。
+    """
+
+    def __init__(self, sample_size=64, errors="replace"):
+        self.sample_size = sample_size
+        self.errors = errors
+        self.encoding = None
+        self._decoder = None
+        self._head = b""
+        self._partial = ""
+
+    def decode(self, chunk, final=False):
+        """解码一块数据，返回文本（编码未确定前返回空串）"""
+        if self._decoder is None:
+            self._head += chunk
+            if len(self._head) < self.sample_size and not final and not self._has_line(self._head):
+                return ""
+            chunk, self._head = self._head, b""
+            self.encoding = detect_encoding(chunk) if chunk else "utf-8"
+            self._decoder = codecs.getincrementaldecoder(self.encoding)(self.errors)
+        return self._decoder.decode(chunk, final)
+
+    @staticmethod
+    def _has_line(head):
+        """样本中已有完整的第一行，不必等满 sample_size"""
+        index = head.find(b"\n")
+        if index == -1:
+            return False
+        # 结尾的 \n 若位于偶数偏移，可能是 UTF-16-LE 换行的前半个码元，等下一块确认
+        return index < len(head) - 1 or index % 2 == 1 or b"\x00" not in head
+
+    def feed(self, chunk, final=False):
+        """解码一块数据，返回其中完整的行（不含换行符）"""
+        text = self._partial + self.decode(chunk, final)
+        carry = ""
+        if not final and text.endswith("\r"):
+            # 末尾的 \r 可能是被截断的 \r\n，留到下一块再判断
+            text, carry = text[:-1], "\r"
+        lines = _LINE_BREAK.split(text)
+        tail = lines.pop()
+        if final:
+            self._partial = ""
+            if tail:
+                lines.append(tail)
+        else:
+            self._partial = tail + carry
+        return lines
+
+    def close(self):
+        """流结束：返回剩余的行"""
+        return self.feed(b"", final=True)
+
+
+class DecodedProcess:
+    """
+    包装流式输出的子进程：stdout 经 iter_stream_lines 解码为文本行并去掉 WSL 提示行，
+    poll / terminate / wait 等转给原进程，可直接交给日志跟随、容器事件与资源采集线程。
+    """
+
+    def __init__(self, process):
+        self.process = process
+        self.stdout = (line for line in iter_stream_lines(process.stdout) if not is_wsl_noise(line, garbled=False))
+
+    def __getattr__(self, name):
+        return getattr(self.process, name)
+
+
+def iter_stream_lines(stream, chunk_size=65536, sample_size=64):
+    """从字节流按块读取并逐行产出，有多少读多少，不等待整行或整块"""
+    decoder = StreamDecoder(sample_size)
+    read = getattr(stream, "read1", stream.read)
+    while True:
+        chunk = read(chunk_size)
+        if not chunk:
+            break
+        yield from decoder.feed(chunk)
+    yield from decoder.close()
+
+
+if __name__ == "__main__":
+    # 微基准：python -m core.stream_decoder
+    # 对比旧的逐字节生成器检测 + 整体重试解码，与按块增量解码的耗时
+    import time
+
+    def legacy_decode(data):
+        if len(data) >= 4:
+            null_at_odd = sum(1 for i in range(1, len(data), 2) if data[i] == 0)
+            if null_at_odd / ((len(data) + 1) // 2) > 0.7:
+                try:
+                    return data.decode("utf-16-le")
+                except UnicodeDecodeError:
+                    pass
+        for encoding in ("utf-8", "gbk", "latin1"):
+            try:
+                return data.decode(encoding)
+            except UnicodeDecodeError:
+                continue
+
+    def legacy_noise(text):
+        stripped = text.strip().lstrip("\ufeff\x00").replace("\x00", "")
+        if stripped.startswith("wsl:"):
+            return True
+        if text and text.count("\x00") / len(text) > 0.2:
+            return True
+        patterns = ("localhost 代理配置", "localhost proxy", "NAT 模式下的 WSL", "NAT mode", "未镜像到 WSL")
+        if any(p.lower() in stripped.lower() for p in patterns):
+            return True
+        return sum(1 for c in text if ord(c) > 127) / len(text) > 0.3 if text else False
+
+    def timed(label, func, repeat=3):
+        best = min(_run(func) for _ in range(repeat))
+        print(f"  {label:<28} {best * 1000:>9.1f} ms")
+        return best
+
+    def _run(func):
+        started = time.perf_counter()
+        func()
+        return time.perf_counter() - started
+
+    text = "".join(
+        f"NekroAgent  Running  2  第 {index} 行：docker pull layer {index:08x} Downloading 12.3MB/45.6MB\n"
+        for index in range(100000)
+    )
+    samples = {"UTF-16-LE": text.encode("utf-16-le"), "UTF-8": text.encode("utf-8")}
+    lines = text.splitlines()
+
+    for name, data in samples.items():
+        print(f"{name}（{len(data) / 1024 / 1024:.1f} MB）")
+        timed("旧：逐字节检测 + 重试解码", lambda: legacy_decode(data))
+        timed("新：decode_output", lambda: decode_output(data))
+
+        def chunked(data=data):
+            decoder = StreamDecoder()
+            count = 0
+            for offset in range(0, len(data), 4093):   # 奇数块长，故意截断字符
+                count += len(decoder.feed(data[offset:offset + 4093]))
+            count += len(decoder.close())
+            assert count == len(lines), count
+
+        timed("新：StreamDecoder 4KB 分块", chunked)
+
+    print("噪音行判断")
+    timed("旧：子串逐个比较 + 逐字符 ord()", lambda: [legacy_noise(line) for line in lines])
+    timed("新：is_wsl_noise", lambda: [is_wsl_noise(line) for line in lines])
@@ -4,12 +4,26 @@ import os
 import time
 import sys
 import secrets
+import shutil
 import string
 import tempfile
-import re
+import gzip
+import difflib
 from urllib.request import urlopen, Request
 from urllib.error import URLError
+from core.artifact_cache import ArtifactCache, parse_sha256sums
 from core.backend_base import BackendBase
+from core.powershell import ElevatedSession
+from core.disk_reclaim import DiskReclaimer, compact_vhdx_command
+from core.docker_events import events_command
+from core.docker_static import DOCKER_STATIC_VERSION, EXIT_MISSING_IPTABLES, StaticDockerBundle, build_install_script, sha256_of
+from core.env_probe import GUEST_PROBE_SCRIPT, ProbeSnapshot, parse_probe_output, run_concurrently
+from core.fast_start import build_fast_start_script, bundle_digest, describe_drift, fast_start_stamp, parse_fast_start_result
+from core.log_follower import logs_command
+from core.metrics import STATS_COMMAND
+from core.readiness import ReadinessTracker, inspect_command, parse_inspect_output
+from core.sizing import compute_profile, describe_profile, read_host_resources, render_wslconfig
+from core.stream_decoder import DecodedProcess, clean_output, decode_output, is_wsl_noise, iter_stream_lines
 
 
 # 专用 WSL 发行版名称
@@ -38,6 +52,32 @@ ROOTFS_URLS = [
     "https://mirror.sjtu.edu.cn/ubuntu-cloud-images/wsl/jammy/current/ubuntu-jammy-wsl-amd64-ubuntu22.04lts.rootfs.tar.gz",
     "https://cloud-images.ubuntu.com/wsl/jammy/current/ubuntu-jammy-wsl-amd64-ubuntu22.04lts.rootfs.tar.gz",
 ]
+# rootfs 文件名；同目录下的 SHA256SUMS 给出当前版本的校验值（各镜像站一致），
+# 与快照版本戳中记录的值不同说明 rootfs 已换代
+ROOTFS_NAME = os.path.basename(ROOTFS_URLS[0])
+
+# 黄金快照：Docker 已安装配置、尚无任何用户数据时导出的发行版，重装时直接导入
+GOLDEN_SNAPSHOT_NAME = "wsl-golden.tar.gz"
+GOLDEN_SNAPSHOT_FORMAT = 1
+GOLDEN_SNAPSHOT_MAX_AGE = 30 * 24 * 3600  # 超过 30 天认为 Docker 版本已过旧，后台刷新
+GOLDEN_BUILD_DISTRO = "NekroAgentGolden"  # 后台刷新快照时使用的临时发行版
+
+# Docker 镜像加速器
+REGISTRY_MIRRORS = [
+    "https://docker.m.daocloud.io",
+    "https://docker.1ms.run",
+    "https://ccr.ccs.tencentyun.com",
+]
+
+WSL_CONF_CONTENT = """[boot]
+systemd = true
+
+[interop]
+appendWindowsPath = false
+
+[user]
+default = root
+"""
 
 
 class WSLManager(BackendBase):
@@ -58,12 +98,24 @@ class WSLManager(BackendBase):
                     self.base_path = os.path.dirname(self.base_path)
 
         self.is_running = False
-        self._log_process = None
         self._stop_event = threading.Event()
+        self._reclaim_lock = threading.Lock()
+        self._home_dir = ""
 
     def get_runtime_name(self):
         return DISTRO_NAME
 
+    def _deploy_dir(self, distro=DISTRO_NAME):
+        """发行版内的部署目录（默认用户的 $HOME/nekro_agent），解析成功后缓存"""
+        if not self._home_dir:
+            home = self._wsl_exec(distro, "echo $HOME").strip().splitlines()
+            # 输出可能混有 WSL 提示行，取最后一行绝对路径
+            if home and home[-1].startswith("/"):
+                self._home_dir = home[-1].rstrip("/") or "/root"
+            else:
+                return "/root/nekro_agent"
+        return f"{self._home_dir}/nekro_agent"
+
     def get_host_access_path(self, guest_path):
         normalized = guest_path or "/"
         return f"\\\\wsl$\\{DISTRO_NAME}{normalized}"
@@ -92,9 +144,6 @@ class WSLManager(BackendBase):
             except Exception:
                 pass
 
-    def _emit_pull_progress(self, phase, message):
-        self.progress_updated.emit(f"__pull_progress__|{phase}|{message}")
-
     def _get_local_images(self, distro):
         """获取 WSL 内已存在的 docker 镜像列表，返回 set of 'repo:tag'"""
         try:
@@ -133,14 +182,11 @@ class WSLManager(BackendBase):
                 stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
                 creationflags=self._creation_flags(),
             )
-            while True:
-                line = proc.stdout.readline()
-                if not line and proc.poll() is not None:
-                    break
-                if line:
-                    text = self._safe_decode(line).strip()
-                    if text and not self._is_wsl_noise(text):
-                        self._emit_pull_progress("update", text)
+            # 按块增量解码，wsl.exe 的 UTF-16 输出不会在换行处被截成半个字符
+            for line in iter_stream_lines(proc.stdout):
+                text = line.strip()
+                if text and not is_wsl_noise(text):
+                    self._emit_pull_progress("update", text)
 
             proc.wait()
             if proc.returncode != 0:
@@ -157,39 +203,73 @@ class WSLManager(BackendBase):
     #  环境检测
     # ------------------------------------------------------------------ #
 
+    def _probe_environment(self):
+        """并发采集 WSL 状态、发行版列表和运行环境内快照，返回一份检测结果"""
+        self.log_received.emit("[环境检测] 并发采集 WSL 状态、发行版与运行环境信息...", "info")
+        started = time.time()
+        results = run_concurrently({
+            "wsl": self._probe_wsl_status,
+            "distros": self._list_distros,
+            "guest": lambda: self._probe_guest(DISTRO_NAME),
+        })
+        snapshot = {
+            "wsl": results["wsl"] if isinstance(results["wsl"], tuple) else (False, f"检测异常: {results['wsl']}"),
+            "distros": results["distros"] if isinstance(results["distros"], list) else [],
+            "guest": results["guest"] if isinstance(results["guest"], dict) else {},
+        }
+        for name, value in results.items():
+            if isinstance(value, Exception):
+                self.log_received.emit(f"[环境检测] {name} 检测异常: {value}", "debug")
+        self.log_received.emit(f"[环境检测] 采集完成，用时 {time.time() - started:.1f}s", "debug")
+        return snapshot
+
+    def _probe_wsl_status(self):
+        """返回 (ok, 说明)"""
+        try:
+            proc = subprocess.run(
+                ["wsl", "--status"],
+                capture_output=True, timeout=10,
+                creationflags=self._creation_flags(),
+            )
+            return (proc.returncode == 0, f"返回码: {proc.returncode}")
+        except FileNotFoundError:
+            return (False, "wsl 命令未找到")
+
+    def _probe_guest(self, distro):
+        """在发行版内执行一次探测脚本，发行版不存在或脚本失败时返回空字典"""
+        proc = subprocess.run(
+            ["wsl", "-d", distro, "--", "bash", "-s"],
+            input=GUEST_PROBE_SCRIPT.encode("utf-8"),
+            capture_output=True, timeout=60,
+            creationflags=self._creation_flags(),
+        )
+        data = parse_probe_output(self._safe_decode(proc.stdout))
+        if not data and proc.returncode != 0:
+            self.log_received.emit(f"运行环境探测失败: {self._clean_stderr(proc.stderr, 300)}", "debug")
+        return data
+
     def get_check_funcs(self):
-        """返回 4 个检测步骤的 callable 列表，每个返回 (passed, detail)"""
+        """返回 4 个检测步骤的 callable 列表，每个返回 (passed, detail)；所有步骤共享一次并发采集的快照"""
+        snapshot = ProbeSnapshot(self._probe_environment)
         ctx = {}
 
         def check_wsl():
             self.log_received.emit("[环境检测] 1/4 检测 WSL2...", "info")
-            try:
-                proc = subprocess.run(
-                    ["wsl", "--status"],
-                    capture_output=True, timeout=10,
-                    creationflags=self._creation_flags(),
-                )
-                ok = (proc.returncode == 0)
-                ctx["wsl"] = ok
-                if ok:
-                    self.log_received.emit("[环境检测] ✓ WSL2 已安装", "info")
-                else:
-                    self.log_received.emit("[环境检测] ✗ WSL2 未安装，返回码: " + str(proc.returncode), "error")
-                return (ok, "")
-            except FileNotFoundError:
-                self.log_received.emit("[环境检测] ✗ wsl 命令未找到", "error")
-                ctx["wsl"] = False
-                return (False, "")
-            except Exception as e:
-                self.log_received.emit(f"[环境检测] ✗ WSL 检测异常: {e}", "error")
-                ctx["wsl"] = False
-                return (False, "")
+            ok, reason = snapshot.get()["wsl"]
+            ctx["wsl"] = ok
+            if ok:
+                self.log_received.emit("[环境检测] ✓ WSL2 已安装", "info")
+            else:
+                self.log_received.emit(f"[环境检测] ✗ WSL2 未安装，{reason}", "error")
+            return (ok, "")
 
         def check_distro():
             self.log_received.emit("[环境检测] 2/4 检测 NekroAgent 发行版...", "info")
             if not ctx.get("wsl"):
                 return (False, "未创建")
-            if self._distro_exists():
+            distros = snapshot.get()["distros"]
+            self.log_received.emit(f"WSL 发行版列表: {distros}", "debug")
+            if DISTRO_NAME in distros:
                 ctx["distro"] = True
                 self.log_received.emit(f"[环境检测] ✓ {DISTRO_NAME} 发行版已存在", "info")
                 return (True, DISTRO_NAME)
@@ -200,46 +280,33 @@ class WSLManager(BackendBase):
             self.log_received.emit("[环境检测] 3/4 检测 Docker...", "info")
             if not ctx.get("distro"):
                 return (False, "")
-            try:
-                proc = subprocess.run(
-                    ["wsl", "-d", DISTRO_NAME, "--", "bash", "-c",
-                     "docker info"],
-                    capture_output=True, timeout=30,
-                    creationflags=self._creation_flags(),
+            guest = snapshot.get()["guest"]
+            ok = bool(guest.get("docker"))
+            ctx["docker"] = ok
+            if ok:
+                self.log_received.emit(
+                    f"[环境检测] ✓ Docker 可用（{guest.get('docker_version', '')}），"
+                    f"本地镜像 {len(guest.get('images') or [])} 个，"
+                    f"剩余空间 {int(guest.get('disk_free_mb') or 0) / 1024:.1f} GB",
+                    "info",
                 )
-                ok = (proc.returncode == 0)
-                ctx["docker"] = ok
-                if ok:
-                    self.log_received.emit("[环境检测] ✓ Docker 可用", "info")
-                else:
-                    self.log_received.emit("[环境检测] ✗ Docker 检测失败", "error")
-                    self.log_received.emit(f"返回码: {proc.returncode}", "error")
-                    self.log_received.emit(f"STDERR: {self._clean_stderr(proc.stderr, 300)}", "error")
-                return (ok, "")
-            except Exception as e:
-                self.log_received.emit(f"[环境检测] ✗ Docker 检测异常: {e}", "error")
-                return (False, "")
+            else:
+                self.log_received.emit("[环境检测] ✗ Docker 检测失败", "error")
+                if guest.get("docker_error"):
+                    self.log_received.emit(f"STDERR: {guest['docker_error']}", "error")
+            return (ok, "")
 
         def check_compose():
             self.log_received.emit("[环境检测] 4/4 检测 Docker Compose...", "info")
             if not ctx.get("docker"):
                 return (False, "")
-            try:
-                proc = subprocess.run(
-                    ["wsl", "-d", DISTRO_NAME, "--", "bash", "-c",
-                     "docker compose version"],
-                    capture_output=True, timeout=10,
-                    creationflags=self._creation_flags(),
-                )
-                ok = (proc.returncode == 0)
-                if ok:
-                    self.log_received.emit("[环境检测] ✓ Docker Compose 可用", "info")
-                else:
-                    self.log_received.emit("[环境检测] ✗ Docker Compose 检测失败", "error")
-                return (ok, "")
-            except Exception as e:
-                self.log_received.emit(f"[环境检测] ✗ Docker Compose 检测异常: {e}", "error")
-                return (False, "")
+            guest = snapshot.get()["guest"]
+            ok = bool(guest.get("compose"))
+            if ok:
+                self.log_received.emit(f"[环境检测] ✓ Docker Compose 可用（{guest.get('compose_version', '')}）", "info")
+            else:
+                self.log_received.emit("[环境检测] ✗ Docker Compose 检测失败", "error")
+            return (ok, "")
 
         return [check_wsl, check_distro, check_docker, check_compose]
 
@@ -262,8 +329,8 @@ class WSLManager(BackendBase):
             "compose_available": results[3][0],
         }
 
-    def _distro_exists(self):
-        """检查 NekroAgent 专用发行版是否已存在"""
+    def _list_distros(self):
+        """返回已注册的 WSL 发行版名称列表，失败时返回空列表"""
         try:
             proc = subprocess.run(
                 ["wsl", "-l", "-q"],
@@ -272,95 +339,38 @@ class WSLManager(BackendBase):
             )
             if proc.returncode != 0:
                 self.log_received.emit(f"wsl -l 失败，返回码: {proc.returncode}", "debug")
-                return False
+                return []
 
             # 安全解码 wsl -l 输出
             output = self._safe_decode(proc.stdout)
-            lines = [l.strip().strip('\x00') for l in output.splitlines()
-                     if l.strip().strip('\x00')]
-            self.log_received.emit(f"WSL 发行版列表: {lines}", "debug")
-            exists = DISTRO_NAME in lines
-            if exists:
-                self.log_received.emit(f"找到 {DISTRO_NAME} 发行版", "debug")
-            else:
-                self.log_received.emit(f"未找到 {DISTRO_NAME} 发行版", "debug")
-            return exists
+            return [l.strip().strip('\x00') for l in output.splitlines()
+                    if l.strip().strip('\x00')]
         except Exception as e:
-            self.log_received.emit(f"_distro_exists 异常: {e}", "debug")
-            return False
+            self.log_received.emit(f"wsl -l 异常: {e}", "debug")
+            return []
+
+    def _distro_exists(self):
+        """检查 NekroAgent 专用发行版是否已存在"""
+        lines = self._list_distros()
+        self.log_received.emit(f"WSL 发行版列表: {lines}", "debug")
+        exists = DISTRO_NAME in lines
+        if exists:
+            self.log_received.emit(f"找到 {DISTRO_NAME} 发行版", "debug")
+        else:
+            self.log_received.emit(f"未找到 {DISTRO_NAME} 发行版", "debug")
+        return exists
 
     def _get_distro(self):
         """返回当前使用的发行版名称"""
         return DISTRO_NAME
 
     def _safe_decode(self, data):
-        """安全解码字节数据，智能检测编码"""
-        if isinstance(data, str):
-            return data
-        if isinstance(data, bytes):
-            # 优先检测 BOM（wsl 带 BOM 的 UTF-16 输出）
-            if data.startswith((b'\xff\xfe', b'\xfe\xff')):
-                try:
-                    return data.decode('utf-16')
-                except Exception:
-                    pass
-
-            # 检测无 BOM 的 UTF-16-LE：特征是奇数字节位置有大量 0x00
-            if len(data) >= 4:
-                null_at_odd = sum(1 for i in range(1, len(data), 2) if data[i] == 0)
-                total_odd = (len(data) + 1) // 2
-                if total_odd > 0 and null_at_odd / total_odd > 0.7:
-                    try:
-                        return data.decode('utf-16-le')
-                    except Exception:
-                        pass
-
-            # 尝试其他编码，不使用 errors='ignore' 以便能正确检测失败
-            for encoding in ['utf-8', 'gbk', 'latin1']:
-                try:
-                    return data.decode(encoding)
-                except (UnicodeDecodeError, LookupError):
-                    continue
-
-            # 最后的降级方案
-            return data.decode('latin1', errors='replace')
-        return str(data)
-
-    def _is_wsl_noise(self, text):
-        """判断是否为 WSL 系统噪音（如 hostname 解析警告的 UTF-16 乱码）"""
-        # strip null bytes / BOM that may survive decoding
-        stripped = text.strip().lstrip('\ufeff\x00')
-        # 去掉残留 null 字节后再判断
-        stripped_clean = stripped.replace('\x00', '')
-        if stripped_clean.startswith("wsl:"):
-            return True
-        # 原文含大量 null 字节说明是 UTF-16 解码残留，直接过滤
-        null_ratio = text.count('\x00') / len(text) if text else 0
-        if null_ratio > 0.2:
-            return True
-        # known WSL warning substrings
-        _WSL_NOISE_PATTERNS = (
-            "localhost 代理配置",
-            "localhost proxy",
-            "NAT 模式下的 WSL",
-            "NAT mode",
-            "未镜像到 WSL",
-        )
-        lower = stripped_clean.lower()
-        if any(p.lower() in lower for p in _WSL_NOISE_PATTERNS):
-            return True
-        # 非 ASCII 字符占比超过 30% 则认为是乱码
-        non_ascii = sum(1 for c in text if ord(c) > 127)
-        if len(text) > 0 and non_ascii / len(text) > 0.3:
-            return True
-        return False
+        """解码完整的命令输出（wsl.exe 的 UTF-16 / UTF-8 / GBK）"""
+        return decode_output(data)
 
     def _clean_stderr(self, data, max_len=500):
         """解码并清理 stderr，过滤 WSL 噪音"""
-        text = self._safe_decode(data)
-        lines = [l for l in text.splitlines() if l.strip() and not self._is_wsl_noise(l)]
-        result = "\n".join(lines)
-        return result[:max_len] if max_len else result
+        return clean_output(data, max_len)
 
     # ------------------------------------------------------------------ #
     #  专用发行版创建
@@ -389,6 +399,19 @@ class WSLManager(BackendBase):
             self.log_received.emit(f"[发行版创建] ✗ 创建目录失败: {e}", "error")
             return False
 
+        # 按宿主机资源写入 .wslconfig，新发行版启动时即按该规格运行
+        self._apply_wsl_sizing(self.config.get("deploy_mode") if self.config else "", install_dir)
+
+        # 有可用的黄金快照时直接导入，跳过下载和 Docker 安装
+        usable, stale = self._golden_snapshot_state()
+        if usable and self._import_golden_snapshot(install_dir):
+            self._save_distro_config(install_dir)
+            if stale:
+                self.log_received.emit(f"[黄金快照] {stale}，将在后台刷新快照", "info")
+                self._refresh_golden_snapshot_async()
+            self.progress_updated.emit("运行环境导入成功！")
+            return True
+
         # 下载 rootfs
         self.log_received.emit("[发行版创建] 2/4 下载 Ubuntu rootfs...", "info")
         rootfs_path = os.path.join(install_dir, "rootfs.tar.gz")
@@ -396,13 +419,56 @@ class WSLManager(BackendBase):
             self.log_received.emit("[发行版创建] ✗ rootfs 下载失败", "error")
             return False
         self.log_received.emit("[发行版创建] ✓ rootfs 下载完成", "info")
+        rootfs_sha256 = sha256_of(rootfs_path)
 
         # wsl --import
         self.progress_updated.emit("正在导入 WSL 发行版...")
         self.log_received.emit("[发行版创建] 3/4 导入 WSL 发行版...", "info")
+        if not self._import_rootfs(DISTRO_NAME, install_dir, rootfs_path):
+            return False
+
+        # 清理下载的 rootfs 文件
+        try:
+            os.remove(rootfs_path)
+            self.log_received.emit("[发行版创建] ✓ 临时 rootfs 文件已清理", "info")
+        except Exception:
+            pass
+
+        # 配置 WSL - 隔离 Windows 环境变量
+        self.progress_updated.emit("正在配置 WSL 环境...")
+        self.log_received.emit("[发行版创建] 4/4 配置 WSL 环境（隔离 Windows PATH）...", "info")
+        try:
+            self._configure_wsl_conf(DISTRO_NAME)
+        except Exception as e:
+            self.progress_updated.emit(f"配置 WSL 失败: {e}")
+            self.log_received.emit(f"[发行版创建] ✗ 配置 WSL 失败: {e}", "error")
+            return False
+
+        # 保存配置
+        self._save_distro_config(install_dir)
+
+        self.progress_updated.emit("发行版创建成功！正在安装 Docker...")
+        self.log_received.emit("[发行版创建] ✓ 发行版创建完成！开始安装 Docker...", "info")
+
+        # 在新发行版内安装 Docker
+        if not self._install_docker_sync():
+            return False
+
+        # 此时尚未部署任何服务，正好导出为黄金快照
+        self._export_golden_snapshot(DISTRO_NAME, rootfs_sha256)
+        return True
+
+    def _save_distro_config(self, install_dir):
+        if self.config:
+            self.config.set("wsl_distro", DISTRO_NAME)
+            self.config.set("wsl_install_dir", install_dir)
+            self.log_received.emit("[发行版创建] ✓ 配置已保存", "info")
+
+    def _import_rootfs(self, distro, install_dir, rootfs_path):
+        """wsl --import 导入 rootfs，返回是否成功"""
         try:
             proc = subprocess.run(
-                ["wsl", "--import", DISTRO_NAME, install_dir, rootfs_path],
+                ["wsl", "--import", distro, install_dir, rootfs_path],
                 capture_output=True, timeout=300,
                 creationflags=self._creation_flags(),
             )
@@ -414,7 +480,8 @@ class WSLManager(BackendBase):
                 self.log_received.emit(f"STDERR: {stderr_text}", "error")
                 self.install_error.emit(f"WSL 导入失败（返回码 {proc.returncode}）：{stderr_text}")
                 return False
-            self.log_received.emit(f"[发行版创建] ✓ {DISTRO_NAME} 发行版导入完成", "info")
+            self.log_received.emit(f"[发行版创建] ✓ {distro} 发行版导入完成", "info")
+            return True
         except subprocess.TimeoutExpired:
             self.progress_updated.emit("导入超时")
             self.log_received.emit("[发行版创建] ✗ 导入超时", "error")
@@ -424,54 +491,346 @@ class WSLManager(BackendBase):
             self.log_received.emit(f"[发行版创建] ✗ 导入异常: {e}", "error")
             return False
 
-        # 清理下载的 rootfs 文件
+    def _configure_wsl_conf(self, distro):
+        """写入 /etc/wsl.conf 并重启发行版使 systemd 生效，失败时抛出异常"""
+        self._write_to_wsl(distro, WSL_CONF_CONTENT, "/etc/wsl.conf")
+        self.log_received.emit("[发行版创建] ✓ WSL 配置完成", "info")
+
+        # 重启 WSL 发行版，使 systemd 配置生效
+        self.log_received.emit("[发行版创建] 重启 WSL 发行版以启用 systemd...", "info")
+        subprocess.run(
+            ["wsl", "--terminate", distro],
+            capture_output=True, timeout=30,
+            creationflags=self._creation_flags(),
+        )
+        time.sleep(2)
+        self.log_received.emit("[发行版创建] ✓ WSL 发行版已重启", "info")
+
+    def _apply_wsl_sizing(self, deploy_mode, install_dir=None):
+        """按宿主机资源和部署模式合并写入 %USERPROFILE%\\.wslconfig，内容有变化时返回 True"""
+        if self.config and not self.config.get("manage_wslconfig"):
+            return False
+        install_dir = install_dir or (self.config.get("wsl_install_dir") if self.config else "")
+        host = read_host_resources(install_dir or None)
+        profile = compute_profile(host, deploy_mode)
+        self.log_received.emit(f"[资源规格] {describe_profile(profile, host)}", "info")
+        for warning in profile.warnings:
+            self.log_received.emit(f"[资源规格] {warning}", "warning")
+
+        path = os.path.join(os.environ.get("USERPROFILE") or os.path.expanduser("~"), ".wslconfig")
+        existing = ""
         try:
-            os.remove(rootfs_path)
-            self.log_received.emit("[发行版创建] ✓ 临时 rootfs 文件已清理", "info")
-        except Exception:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                existing = f.read()
+        except OSError:
             pass
+        content = render_wslconfig(profile, existing)
+        if content == existing:
+            return False
+        changes = [
+            line for line in difflib.unified_diff(existing.splitlines(), content.splitlines(), lineterm="", n=0)
+            if line[:1] in "+-" and line[1:].strip() and not line.startswith(("+++", "---"))
+        ]
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(content)
+        except OSError as e:
+            self.log_received.emit(f"[资源规格] 写入 .wslconfig 失败: {e}", "warning")
+            return False
+        self.log_received.emit(
+            f"[资源规格] 已向 {path} 补充未设置的项（WSL 下次完全重启后生效）:\n" + "\n".join(changes), "info"
+        )
+        return True
 
-        # 配置 WSL - 隔离 Windows 环境变量
-        self.progress_updated.emit("正在配置 WSL 环境...")
-        self.log_received.emit("[发行版创建] 4/4 配置 WSL 环境（隔离 Windows PATH）...", "info")
+    # ------------------------------------------------------------------ #
+    #  磁盘回收
+    # ------------------------------------------------------------------ #
+
+    def reclaim_disk(self):
+        """后台回收 ext4.vhdx 空间：清理 Docker 缓存并 fstrim，关闭发行版后压缩，再按需恢复服务"""
+        install_dir = self.config.get("wsl_install_dir") if self.config else ""
+        vhdx_path = os.path.join(install_dir, "ext4.vhdx") if install_dir else ""
+        if not vhdx_path or not os.path.exists(vhdx_path):
+            self.log_received.emit("[磁盘回收] 未找到发行版虚拟磁盘 ext4.vhdx", "error")
+            return False
+        if not self._reclaim_lock.acquire(blocking=False):
+            self.log_received.emit("[磁盘回收] 已有回收任务在进行中", "warning")
+            return False
+
+        resume_mode = (self.config.get("deploy_mode") or "lite") if self.is_running else ""
+
+        def _reclaim():
+            try:
+                reclaimer = DiskReclaimer(
+                    run_guest=self._reclaim_in_guest,
+                    stop_runtime=lambda: self._shutdown_for_reclaim(resume_mode),
+                    compact_disk=lambda: self._compact_vhdx(vhdx_path),
+                    start_runtime=lambda: resume_mode == "" or self.start_services(resume_mode) is not False,
+                    disk_size=lambda: os.path.getsize(vhdx_path),
+                    log=self.log_received.emit,
+                )
+                reclaimer.run()
+                if self.config:
+                    self.config.set("disk_reclaim_last_run", time.time())
+            finally:
+                self._reclaim_lock.release()
+
+        threading.Thread(target=_reclaim, daemon=True).start()
+        return True
+
+    def _reclaim_in_guest(self, script):
         try:
-            wsl_conf_content = """[boot]
-systemd = true
+            proc = subprocess.run(
+                ["wsl", "-d", DISTRO_NAME, "--", "bash", "-c", script],
+                capture_output=True, timeout=900,
+                creationflags=self._creation_flags(),
+            )
+            return proc.returncode == 0, self._safe_decode(proc.stdout)
+        except Exception as e:
+            self.log_received.emit(f"[磁盘回收] 发行版内清理异常: {e}", "warning")
+            return False, ""
 
-[interop]
-appendWindowsPath = false
+    def _distro_running(self):
+        try:
+            proc = subprocess.run(
+                ["wsl", "-l", "--running", "-q"],
+                capture_output=True, timeout=10,
+                creationflags=self._creation_flags(),
+            )
+            output = self._safe_decode(proc.stdout)
+            return DISTRO_NAME in [l.strip().strip('\x00') for l in output.splitlines()]
+        except Exception:
+            return False
 
-[user]
-default = root
-"""
-            self._write_to_wsl(DISTRO_NAME, wsl_conf_content, "/etc/wsl.conf")
-            self.log_received.emit("[发行版创建] ✓ WSL 配置完成", "info")
+    def _shutdown_for_reclaim(self, resume_mode):
+        """停止服务并关闭发行版，等待虚拟磁盘释放"""
+        if resume_mode:
+            self.stop_services()
+        deadline = time.time() + 120
+        while self._distro_running() and time.time() < deadline:
+            time.sleep(2)
+        subprocess.run(
+            ["wsl", "--terminate", DISTRO_NAME],
+            capture_output=True, timeout=30,
+            creationflags=self._creation_flags(),
+        )
+        # 发行版终止后 WSL 需要片刻才会卸载 ext4.vhdx
+        time.sleep(5)
+        return not self._distro_running()
+
+    def _compact_vhdx(self, vhdx_path):
+        session = ElevatedSession()
+        try:
+            result = session.run(compact_vhdx_command(vhdx_path), timeout=1800)
+        finally:
+            session.stop()
+        if not result.ok:
+            self.log_received.emit(f"[磁盘回收] 压缩失败: {result.stderr or result.stdout}", "error")
+        return result.ok
 
-            # 重启 WSL 发行版，使 systemd 配置生效
-            self.log_received.emit("[发行版创建] 重启 WSL 发行版以启用 systemd...", "info")
+    # ------------------------------------------------------------------ #
+    #  黄金快照
+    # ------------------------------------------------------------------ #
+
+    _golden_lock = threading.RLock()          # 串行化快照压缩与写入
+    _golden_refresh_lock = threading.Lock()   # 同一时间只允许一个后台刷新任务
+
+    def _artifact_cache(self):
+        return ArtifactCache.from_config(self.config, self.base_path)
+
+    def _golden_snapshot_enabled(self):
+        return not self.config or self.config.get("golden_snapshot") is not False
+
+    def _golden_snapshot_state(self):
+        """返回 (快照可直接导入, 需要后台刷新的原因)，不需要刷新时原因为空串"""
+        if not self._golden_snapshot_enabled():
+            return False, ""
+        cache = self._artifact_cache()
+        stamp = cache.read_stamp(GOLDEN_SNAPSHOT_NAME)
+        if not stamp or stamp.get("format") != GOLDEN_SNAPSHOT_FORMAT:
+            return False, ""
+        provision, expected_version = self._docker_provision()
+        if stamp.get("docker_provision") != provision or (expected_version and stamp.get("docker_version") != expected_version):
+            return True, f"快照中的 Docker（{stamp.get('docker_version') or '未知版本'}）与当前安装方式或固定版本不符"
+        # 取不到上游校验值（离线）时不因 rootfs 判定过期
+        upstream = self._upstream_rootfs_sha256()
+        if upstream and stamp.get("rootfs_sha256") != upstream:
+            return True, "Ubuntu rootfs 已发布新版本"
+        if (cache.stamp_age(GOLDEN_SNAPSHOT_NAME) or 0) > GOLDEN_SNAPSHOT_MAX_AGE:
+            return True, "快照已超过 30 天，Docker 版本可能过旧"
+        return True, ""
+
+    def _docker_provision(self):
+        """(Docker 安装方式, 期望的版本)；apt 安装的版本随软件源变化，不固定"""
+        if self.config and self.config.get("docker_provision_mode") == "static":
+            return "static", DOCKER_STATIC_VERSION
+        return "apt", ""
+
+    def _upstream_rootfs_sha256(self):
+        """从各下载源的 SHA256SUMS 读取当前 rootfs 的校验值，全部失败时返回空串"""
+        for url in ROOTFS_URLS:
+            try:
+                req = Request(url.rsplit("/", 1)[0] + "/SHA256SUMS", headers={"User-Agent": "NekroAgent/1.0"})
+                with urlopen(req, timeout=5) as resp:
+                    text = resp.read(65536).decode("utf-8", errors="replace")
+            except Exception:
+                continue
+            digest = parse_sha256sums(text, ROOTFS_NAME)
+            if digest:
+                return digest
+        return ""
+
+    def _import_golden_snapshot(self, install_dir):
+        """从黄金快照导入发行版，失败时返回 False 由调用方走完整创建流程"""
+        snapshot_path = self._artifact_cache().path(GOLDEN_SNAPSHOT_NAME)
+        self.progress_updated.emit("正在从本地快照导入运行环境...")
+        self.log_received.emit("[黄金快照] 发现可用快照，直接导入（跳过下载和 Docker 安装）...", "info")
+        started = time.time()
+        try:
+            proc = subprocess.run(
+                ["wsl", "--import", DISTRO_NAME, install_dir, snapshot_path],
+                capture_output=True, timeout=600,
+                creationflags=self._creation_flags(),
+            )
+        except Exception as e:
+            self.log_received.emit(f"[黄金快照] ⚠ 快照导入异常: {e}，改为完整创建", "warn")
+            return False
+        if proc.returncode != 0:
+            self.log_received.emit(
+                f"[黄金快照] ⚠ 快照导入失败: {self._clean_stderr(proc.stderr, 300)}，改为完整创建", "warn"
+            )
+            return False
+        self.log_received.emit(f"[黄金快照] ✓ 快照导入完成（耗时 {time.time() - started:.1f}s）", "info")
+        return True
+
+    def _export_golden_snapshot(self, distro, rootfs_sha256, background=True):
+        """
+        导出 Docker 已就绪、尚无用户数据的发行版；导出本身同步完成，压缩默认在后台进行。
+        rootfs_sha256 为创建该发行版所用 rootfs 的校验值，与 Docker 版本一起写入版本戳。
+        """
+        if not self._golden_snapshot_enabled():
+            return False
+
+        cache = self._artifact_cache()
+        tar_path = cache.path(GOLDEN_SNAPSHOT_NAME[:-len(".gz")])
+        self.progress_updated.emit("正在保存运行环境快照...")
+        self.log_received.emit("[黄金快照] 导出 Docker 就绪的运行环境快照...", "info")
+        try:
+            docker_version = self._wsl_exec(
+                distro, "docker version --format '{{.Server.Version}}'", timeout=30
+            ).strip().strip("'")
+            # 去掉 apt 缓存，缩小快照体积
+            self._wsl_exec(distro, "apt-get clean && rm -rf /var/lib/apt/lists/* /tmp/*", timeout=60)
             subprocess.run(
-                ["wsl", "--terminate", DISTRO_NAME],
+                ["wsl", "--terminate", distro],
                 capture_output=True, timeout=30,
                 creationflags=self._creation_flags(),
             )
-            time.sleep(2)
-            self.log_received.emit("[发行版创建] ✓ WSL 发行版已重启", "info")
+            os.makedirs(cache.root, exist_ok=True)
+            proc = subprocess.run(
+                ["wsl", "--export", distro, tar_path],
+                capture_output=True, timeout=900,
+                creationflags=self._creation_flags(),
+            )
+            if proc.returncode != 0:
+                self.log_received.emit(f"[黄金快照] ⚠ 快照导出失败: {self._clean_stderr(proc.stderr, 300)}", "warn")
+                self._remove_quietly(tar_path)
+                return False
         except Exception as e:
-            self.progress_updated.emit(f"配置 WSL 失败: {e}")
-            self.log_received.emit(f"[发行版创建] ✗ 配置 WSL 失败: {e}", "error")
+            self.log_received.emit(f"[黄金快照] ⚠ 快照导出异常: {e}", "warn")
+            self._remove_quietly(tar_path)
             return False
 
-        # 保存配置
-        if self.config:
-            self.config.set("wsl_distro", DISTRO_NAME)
-            self.config.set("wsl_install_dir", install_dir)
-            self.log_received.emit("[发行版创建] ✓ 配置已保存", "info")
+        if background:
+            threading.Thread(
+                target=self._compress_golden_snapshot, args=(tar_path, docker_version, rootfs_sha256), daemon=True
+            ).start()
+            return True
+        return self._compress_golden_snapshot(tar_path, docker_version, rootfs_sha256)
+
+    def _compress_golden_snapshot(self, tar_path, docker_version, rootfs_sha256):
+        """压缩导出的 tar 并写入版本戳"""
+        cache = self._artifact_cache()
+        final_path = cache.path(GOLDEN_SNAPSHOT_NAME)
+        part_path = final_path + ".part"
+        with self._golden_lock:
+            try:
+                with open(tar_path, "rb") as src, gzip.open(part_path, "wb", compresslevel=1) as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+                os.replace(part_path, final_path)
+                # 静态包安装失败时会回退到 apt，按实际装上的版本记录安装方式
+                provision, expected_version = self._docker_provision()
+                if expected_version and docker_version != expected_version:
+                    provision = "apt"
+                cache.write_stamp(
+                    GOLDEN_SNAPSHOT_NAME,
+                    format=GOLDEN_SNAPSHOT_FORMAT,
+                    rootfs_sha256=rootfs_sha256,
+                    docker_provision=provision,
+                    docker_version=docker_version,
+                )
+                size_mb = cache.size(GOLDEN_SNAPSHOT_NAME) / (1024 * 1024)
+                self.log_received.emit(
+                    f"[黄金快照] ✓ 快照已保存（Docker {docker_version or '未知版本'}，{size_mb:.0f} MB）", "info"
+                )
+                return True
+            except Exception as e:
+                self.log_received.emit(f"[黄金快照] ⚠ 快照压缩失败: {e}", "warn")
+                self._remove_quietly(part_path)
+                return False
+            finally:
+                self._remove_quietly(tar_path)
 
-        self.progress_updated.emit("发行版创建成功！正在安装 Docker...")
-        self.log_received.emit("[发行版创建] ✓ 发行版创建完成！开始安装 Docker...", "info")
+    def _refresh_golden_snapshot_async(self):
+        """在后台用临时发行版重新构建快照，不影响正在使用的 NekroAgent 发行版"""
+        if not self._golden_refresh_lock.acquire(blocking=False):
+            return
 
-        # 在新发行版内安装 Docker
-        return self._install_docker_sync()
+        def _rebuild():
+            build_dir = self._artifact_cache().path("wsl-golden-build")
+            try:
+                # 复用的下载 / 导入 / 安装步骤会发出进度和安装错误，后台刷新时只记调试日志
+                with self.quiet_events("[黄金快照]"):
+                    self._unregister_quietly(GOLDEN_BUILD_DISTRO)
+                    os.makedirs(build_dir, exist_ok=True)
+                    rootfs_path = os.path.join(build_dir, "rootfs.tar.gz")
+                    if not self._download_rootfs(rootfs_path):
+                        return
+                    rootfs_sha256 = sha256_of(rootfs_path)
+                    if not self._import_rootfs(GOLDEN_BUILD_DISTRO, build_dir, rootfs_path):
+                        return
+                    self._remove_quietly(rootfs_path)
+                    self._configure_wsl_conf(GOLDEN_BUILD_DISTRO)
+                    if not self._install_docker_sync(GOLDEN_BUILD_DISTRO):
+                        return
+                    refreshed = self._export_golden_snapshot(GOLDEN_BUILD_DISTRO, rootfs_sha256, background=False)
+                if refreshed:
+                    self.log_received.emit("[黄金快照] ✓ 后台刷新完成，下次创建运行环境时使用新快照", "info")
+            except Exception as e:
+                self.log_received.emit(f"[黄金快照] ⚠ 后台刷新失败: {e}", "warn")
+            finally:
+                self._unregister_quietly(GOLDEN_BUILD_DISTRO)
+                shutil.rmtree(build_dir, ignore_errors=True)
+                self._golden_refresh_lock.release()
+
+        threading.Thread(target=_rebuild, daemon=True).start()
+
+    def _unregister_quietly(self, distro):
+        try:
+            subprocess.run(
+                ["wsl", "--unregister", distro],
+                capture_output=True, timeout=60,
+                creationflags=self._creation_flags(),
+            )
+        except Exception:
+            pass
+
+    @staticmethod
+    def _remove_quietly(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
 
     def _download_rootfs(self, dest_path):
         """下载 Ubuntu rootfs，返回是否成功"""
@@ -536,12 +895,16 @@ default = root
         self.progress_updated.emit("所有下载源均失败")
         return False
 
-    def _install_docker_sync(self):
+    def _install_docker_sync(self, distro=DISTRO_NAME):
         """在专用发行版内同步安装 Docker（通过 Docker 官方源，使用国内镜像）"""
-        distro = DISTRO_NAME
         self.progress_updated.emit("正在安装 Docker...")
         self.log_received.emit("[Docker 安装] 开始安装 Docker...", "info")
 
+        if self.config and self.config.get("docker_provision_mode") == "static":
+            if self._install_docker_static(distro):
+                return True
+            self.log_received.emit("[Docker 安装] ⚠ 静态包安装失败，改用 apt 安装", "warn")
+
         def _run_step(cmd, desc, timeout=300):
             """执行一个安装步骤，返回是否成功"""
             try:
@@ -629,13 +992,7 @@ default = root
             # 4/5 配置 Docker 镜像加速器
             self.progress_updated.emit("配置镜像加速器...")
             self.log_received.emit("[Docker 安装] 4/5 配置 Docker 镜像加速器...", "info")
-            daemon_json = (
-                '{"registry-mirrors":['
-                '"https://docker.m.daocloud.io",'
-                '"https://docker.1ms.run",'
-                '"https://ccr.ccs.tencentyun.com"'
-                ']}'
-            )
+            daemon_json = '{"registry-mirrors":[' + ",".join(f'"{m}"' for m in REGISTRY_MIRRORS) + ']}'
             if not _run_step(
                 f"mkdir -p /etc/docker && echo '{daemon_json}' > /etc/docker/daemon.json",
                 "镜像加速器配置"
@@ -667,8 +1024,48 @@ default = root
             self.log_received.emit(f"[Docker 安装] ✗ Docker 安装异常: {e}", "error")
             return False
 
+    def _install_docker_static(self, distro):
+        """用宿主机缓存的静态二进制包安装 Docker Engine / containerd / Compose，不依赖 apt"""
+        self.progress_updated.emit("准备 Docker 静态安装包...")
+        self.log_received.emit("[Docker 安装] 使用缓存的静态二进制包安装 Docker...", "info")
+        bundle = StaticDockerBundle(
+            self._artifact_cache(),
+            log=self.log_received.emit,
+            progress=self.progress_updated.emit,
+        )
+        paths = bundle.ensure()
+        if not paths:
+            return False
+
+        docker_tgz, compose_bin = (self._to_wsl_path(distro, path) for path in paths)
+        script = build_install_script(docker_tgz, compose_bin, REGISTRY_MIRRORS)
+        script_path = "/tmp/nekro-install-docker.sh"
+        self._write_to_wsl(distro, script, script_path)
+
+        self.progress_updated.emit("安装 Docker 静态二进制...")
+        try:
+            proc = subprocess.run(
+                ["wsl", "-d", distro, "--", "bash", script_path],
+                capture_output=True, timeout=300,
+                creationflags=self._creation_flags(),
+            )
+        except subprocess.TimeoutExpired:
+            self.log_received.emit("[Docker 安装] ✗ 静态包安装超时", "error")
+            return False
+        if proc.returncode == EXIT_MISSING_IPTABLES:
+            self.log_received.emit("[Docker 安装] 运行环境缺少 iptables，无法使用静态包", "warn")
+            return False
+        if proc.returncode != 0:
+            self.log_received.emit(f"[Docker 安装] ✗ 静态包安装失败: {self._clean_stderr(proc.stderr, 300)}", "error")
+            return False
+
+        self.progress_updated.emit("Docker 安装完成！")
+        self.log_received.emit("[Docker 安装] ✓ Docker 静态包安装完成！", "info")
+        return True
+
     def remove_distro(self):
         """删除专用 WSL 发行版"""
+        self._home_dir = ""
         try:
             subprocess.run(
                 ["wsl", "--unregister", DISTRO_NAME],
@@ -714,7 +1111,7 @@ default = root
                 self.log_received.emit("Docker 安装完成", "info")
             else:
                 self.log_received.emit("Docker 安装失败", "error")
-            self.progress_updated.emit("__docker_done__" if success else "__docker_fail__")
+            self._emit_docker_result(success)
 
         threading.Thread(target=_do_install, daemon=True).start()
         return True
@@ -729,31 +1126,33 @@ default = root
             return True
 
         distro = DISTRO_NAME
-        if not self._distro_exists():
+        # 已验证的部署直接走快速启动，发行版是否存在由启动脚本的结果反映
+        fast_start = self._fast_start_eligible(deploy_mode)
+        if not fast_start and not self._distro_exists():
             self.log_received.emit("NekroAgent 发行版不存在", "error")
             return False
 
         self._stop_event.clear()
+        self._deploy_started = time.time()
         self.status_changed.emit("启动中...")
 
-        # 选择 compose 文件
-        if deploy_mode == "napcat":
-            compose_file = "docker-compose_with_napcat.yml"
-        else:
-            compose_file = "docker-compose_withnot_napcat.yml"
-
-        compose_src = os.path.join(self.base_path, "data", compose_file)
-        env_src = os.path.join(self.base_path, "data", "env")
+        compose_src, env_src = self._bundle_files(deploy_mode)
 
         if not os.path.exists(compose_src):
             self.log_received.emit(f"Compose 文件不存在: {compose_src}", "error")
             return False
 
         def _deploy():
+            # 读取宿主机资源并读写 .wslconfig，放在工作线程里，避免阻塞调用方（界面）线程
+            self._apply_wsl_sizing(deploy_mode)
+            self._await_prewarm()
             try:
-                deploy_dir = "/root/nekro_agent"
+                deploy_dir = self._deploy_dir(distro)
                 data_dir = "/root/nekro_agent_data"
 
+                if fast_start and self._fast_start(distro, deploy_dir, deploy_mode):
+                    return
+
                 # 在 WSL 内创建部署目录
                 self._wsl_exec(distro, f"mkdir -p {deploy_dir}")
                 self._wsl_exec(distro, f"mkdir -p {data_dir}")
@@ -761,12 +1160,15 @@ default = root
                 # 检测是否为首次部署
                 env_exists = self._wsl_exec(distro, f"test -f {deploy_dir}/.env && echo yes").strip()
 
+                # compose 文件随程序更新（如健康检查定义），用户改动过的先备份
+                if not self._sync_compose_file(compose_src, deploy_dir, lambda src, dst: self._copy_to_wsl(distro, src, dst)):
+                    self.status_changed.emit("启动失败")
+                    return
                 if env_exists == "yes":
                     self.log_received.emit("检测到已有部署配置，复用现有配置", "info")
                     env_content = self._wsl_exec(distro, f"cat {deploy_dir}/.env")
                 else:
                     self.log_received.emit("首次部署，写入配置文件", "info")
-                    self._copy_to_wsl(distro, compose_src, f"{deploy_dir}/docker-compose.yml")
                     env_content = self._prepare_env(env_src, data_dir)
                     self._write_to_wsl(distro, env_content, f"{deploy_dir}/.env")
 
@@ -821,6 +1223,8 @@ default = root
 
                 self.is_running = True
                 self.log_received.emit("Compose 服务已启动，等待就绪...", "info")
+                if self.config and self.config.get("fast_start"):
+                    self.config.set("fast_start_stamp", self._fast_start_stamp(deploy_mode))
 
                 # 从 .env 解析凭据
                 is_first_deploy = env_exists != "yes"
@@ -836,8 +1240,8 @@ default = root
                 else:
                     self._refresh_deploy_info(deploy_info)
 
-                threading.Thread(target=self._log_reader, args=(distro, deploy_dir), daemon=True).start()
-                threading.Thread(target=self._health_check, daemon=True).start()
+                self.start_log_followers()
+                threading.Thread(target=self._health_check, args=(distro, deploy_dir), daemon=True).start()
 
             except Exception as e:
                 self.log_received.emit(f"部署失败: {e}", "error")
@@ -846,19 +1250,66 @@ default = root
         threading.Thread(target=_deploy, daemon=True).start()
         return True
 
+    def _bundle_files(self, deploy_mode):
+        """随程序发布的 compose 文件与 .env 模板"""
+        if deploy_mode == "napcat":
+            compose_file = "docker-compose_with_napcat.yml"
+        else:
+            compose_file = "docker-compose_withnot_napcat.yml"
+        return os.path.join(self.base_path, "data", compose_file), os.path.join(self.base_path, "data", "env")
+
+    def _fast_start_stamp(self, deploy_mode):
+        return fast_start_stamp(self.backend_key, deploy_mode, bundle_digest(*self._bundle_files(deploy_mode)))
+
+    def _fast_start_eligible(self, deploy_mode):
+        if not (self.config and self.config.get("fast_start")):
+            return False
+        stamp = self.config.get("fast_start_stamp")
+        if stamp and stamp != self._fast_start_stamp(deploy_mode):
+            self.log_received.emit("部署文件或部署模式已变化，本次使用完整启动流程同步配置", "info")
+            return False
+        return bool(stamp)
+
+    def _fast_start(self, distro, deploy_dir, deploy_mode):
+        """一次 wsl 调用完成检查与 compose up，成功返回 True，状态不符时清除标记并返回 False"""
+        self.log_received.emit("检测到已验证的部署，快速启动 Compose 服务...", "info")
+        self.progress_updated.emit("启动 Compose 服务...")
+        started = time.time()
+        script = build_fast_start_script(deploy_dir, REQUIRED_IMAGES.get(deploy_mode, []))
+        try:
+            proc = subprocess.run(
+                ["wsl", "-d", distro, "--", "bash", "-s"],
+                input=script.encode("utf-8"),
+                capture_output=True, timeout=180,
+                creationflags=self._creation_flags(),
+            )
+            result = parse_fast_start_result(self._safe_decode(proc.stdout))
+        except Exception as e:
+            result = {"ok": False, "drift": "output", "detail": str(e)}
+
+        if not result.get("ok"):
+            self.log_received.emit(f"快速启动未完成（{describe_drift(result)}），改用完整启动流程", "warning")
+            self.config.set("fast_start_stamp", "")
+            return False
+
+        self.is_running = True
+        self.log_received.emit(
+            f"Compose 服务已启动（快速启动 {time.time() - started:.1f}s，"
+            f"运行环境内 {int(result.get('elapsed_ms') or 0) / 1000:.1f}s），等待就绪...",
+            "info",
+        )
+        self._refresh_deploy_info(self._parse_deploy_info(result["env"], deploy_mode))
+        self.start_log_followers()
+        threading.Thread(target=self._health_check, args=(distro, deploy_dir), daemon=True).start()
+        return True
+
     def stop_services(self):
         """停止 Docker Compose 服务"""
+        self._stop_monitoring()
         self._stop_event.set()
         was_running = self.is_running
         self.is_running = False
 
-        if self._log_process and self._log_process.poll() is None:
-            try:
-                self._log_process.terminate()
-            except Exception:
-                pass
-            self._log_process = None
-
         if not was_running:
             self.status_changed.emit("已停止")
             return
@@ -868,10 +1319,7 @@ default = root
 
         def _do_stop():
             try:
-                wsl_home = self._wsl_exec(distro, "echo $HOME").strip()
-                if not wsl_home:
-                    wsl_home = "/root"
-                deploy_dir = f"{wsl_home}/nekro_agent"
+                deploy_dir = self._deploy_dir(distro)
 
                 subprocess.run(
                     ["wsl", "-d", distro, "--", "bash", "-c",
@@ -898,13 +1346,12 @@ default = root
         """拉取最新镜像并重启服务"""
         distro = DISTRO_NAME
         self.log_received.emit("开始更新服务...", "info")
+        # 更新期间服务会短暂不可用，暂停看门狗避免误判
+        self.stop_watchdog()
 
         def _do_update():
             try:
-                wsl_home = self._wsl_exec(distro, "echo $HOME").strip()
-                if not wsl_home:
-                    wsl_home = "/root"
-                deploy_dir = f"{wsl_home}/nekro_agent"
+                deploy_dir = self._deploy_dir(distro)
 
                 # 只更新 nekro-agent 和 sandbox 镜像
                 update_images = [
@@ -931,6 +1378,7 @@ default = root
 
                 self.log_received.emit("✓ 服务更新完成", "info")
                 self.status_changed.emit("运行中")
+                self.start_watchdog()
             except subprocess.TimeoutExpired:
                 self.log_received.emit("更新超时", "error")
                 self.status_changed.emit("更新失败")
@@ -947,21 +1395,13 @@ default = root
         self.status_changed.emit("卸载中...")
 
         # 先同步停止日志和状态
+        self._stop_monitoring()
         self._stop_event.set()
         self.is_running = False
-        if self._log_process and self._log_process.poll() is None:
-            try:
-                self._log_process.terminate()
-            except Exception:
-                pass
-            self._log_process = None
 
         def _do_uninstall():
             try:
-                wsl_home = self._wsl_exec(distro, "echo $HOME").strip()
-                if not wsl_home:
-                    wsl_home = "/root"
-                deploy_dir = f"{wsl_home}/nekro_agent"
+                deploy_dir = self._deploy_dir(distro)
 
                 # 1. 停止并删除容器
                 self.log_received.emit("[卸载] 1/3 停止并删除容器...", "info")
@@ -989,6 +1429,7 @@ default = root
                     self.config.set("wsl_install_dir", "")
                     self.config.set("data_dir", "")
                     self.config.set("deploy_info", None)
+                    self.config.set("fast_start_stamp", "")
 
                 self.status_changed.emit("已卸载")
 
@@ -1002,77 +1443,131 @@ default = root
     #  日志流
     # ------------------------------------------------------------------ #
 
-    def _log_reader(self, distro, deploy_dir):
-        """通过 docker compose logs -f 流式读取日志"""
-        napcat_token_pattern = re.compile(r'WebUi.*token=([a-zA-Z0-9]+)')
-        try:
-            self._log_process = subprocess.Popen(
-                ["wsl", "-d", distro, "--", "bash", "-c",
-                 f"cd {deploy_dir} && docker compose -f docker-compose.yml logs -f --tail=50"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                creationflags=self._creation_flags(),
-            )
-
-            for line in iter(self._log_process.stdout.readline, b''):
-                if self._stop_event.is_set():
-                    break
-                text = line.decode("utf-8", errors="ignore").rstrip()
-                if text:
-                    self.log_received.emit(text, "vm")
-                    # 捕获 NapCat WebUI token
-                    m = napcat_token_pattern.search(text)
-                    if m and self.config:
-                        token = m.group(1)
-                        info = self.config.get("deploy_info") or {}
-                        if info.get("napcat_token") != token:
-                            info["napcat_token"] = token
-                            self.config.set("deploy_info", info)
-                            self.log_received.emit(f"[NapCat] 已捕获 WebUI Token: {token}", "info")
-                            # 首次部署等待 token 后弹窗
-                            if hasattr(self, '_pending_deploy_info') and self._pending_deploy_info:
-                                self._pending_deploy_info["napcat_token"] = token
-                                self._show_deploy_info(self._pending_deploy_info)
-                                self._pending_deploy_info = None
-
-        except Exception as e:
-            if not self._stop_event.is_set():
-                self.log_received.emit(f"日志读取异常: {e}", "debug")
-        finally:
-            if self._log_process and self._log_process.poll() is None:
-                try:
-                    self._log_process.terminate()
-                except Exception:
-                    pass
+    def _open_log_stream(self, service, since):
+        # 容器的 stderr 在发行版内并入 stdout；wsl.exe 自身的 UTF-16 提示走 stderr，直接丢弃
+        return DecodedProcess(subprocess.Popen(
+            ["wsl", "-d", DISTRO_NAME, "--", "bash", "-c", f"{logs_command(self._deploy_dir(), service, since)} 2>&1"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            creationflags=self._creation_flags(),
+        ))
+
+    def _on_log_watch(self, event):
+        """捕获 NapCat WebUI token"""
+        super()._on_log_watch(event)
+        if event.rule != "napcat_token" or not self.config:
+            return
+        token = event.groups[0]
+        info = self.config.get("deploy_info") or {}
+        if info.get("napcat_token") != token:
+            info["napcat_token"] = token
+            self.config.set("deploy_info", info)
+            self.log_received.emit(f"[NapCat] 已捕获 WebUI Token: {token}", "info")
+            # 首次部署等待 token 后弹窗
+            if hasattr(self, '_pending_deploy_info') and self._pending_deploy_info:
+                self._pending_deploy_info["napcat_token"] = token
+                self._show_deploy_info(self._pending_deploy_info)
+                self._pending_deploy_info = None
 
     # ------------------------------------------------------------------ #
     #  健康检查
     # ------------------------------------------------------------------ #
 
-    def _health_check(self):
-        """轮询 Nekro Agent 服务直到返回 200"""
+    def _health_check(self, distro=DISTRO_NAME, deploy_dir=None):
+        """根据容器状态与 compose 健康检查判断服务是否就绪，容器异常退出时提前失败"""
+        deploy_dir = deploy_dir or self._deploy_dir(distro)
         nekro_port = self.config.get("nekro_port") or 8021
-        timeout = 300
         start = time.time()
-        interval = 2.0
 
-        while time.time() - start < timeout and not self._stop_event.is_set():
+        def _probe():
             try:
-                resp = urlopen(f"http://localhost:{nekro_port}", timeout=5)
-                if resp.status == 200:
-                    elapsed = time.time() - start
-                    self.log_received.emit(f"服务已就绪！(耗时 {elapsed:.1f}s)", "info")
-                    self.boot_finished.emit()
-                    self.status_changed.emit("运行中")
-                    return
+                return urlopen(f"http://localhost:{nekro_port}", timeout=5).status == 200
             except Exception:
-                pass
+                return False
 
-            time.sleep(interval)
+        self.start_event_watcher()
+        tracker = ReadinessTracker(
+            self.container_states,
+            timeout=300,
+            log=self.log_received.emit,
+            stop_event=self._stop_event,
+            probe=_probe,
+            sleep=self._wait_container_change,
+        )
+        ok, detail = tracker.wait()
+        if self._stop_event.is_set():
+            return
+        if ok:
+            self.log_received.emit(f"服务已就绪！(耗时 {time.time() - start:.1f}s)", "info")
+            self.boot_finished.emit()
+            self.status_changed.emit("运行中")
+            self._start_monitoring()
+            return
 
-        if not self._stop_event.is_set():
-            self.log_received.emit("服务启动超时，请检查日志", "error")
-            self.status_changed.emit("启动超时")
+        self.log_received.emit(f"服务启动失败: {detail}", "error")
+        failed = [state.service for state in tracker.states.values() if not state.ready]
+        for service in failed[:2]:
+            tail = self._wsl_exec(
+                distro,
+                f"cd {deploy_dir} && docker compose -f docker-compose.yml --env-file .env logs --no-color --tail=20 {service}",
+                timeout=30,
+            ).strip()
+            if tail:
+                self.log_received.emit(f"{service} 最近日志:\n{tail}", "error")
+        self.status_changed.emit("启动超时" if tracker.timed_out else "启动失败")
+
+    def recover_services(self, step):
+        """看门狗的恢复动作：重启异常容器 / 重启全部容器 / 重启发行版与 dockerd"""
+        distro = DISTRO_NAME
+        deploy_dir = self._deploy_dir(distro)
+        compose = f"cd {deploy_dir} && docker compose -f docker-compose.yml --env-file .env"
+        if step == "runtime":
+            subprocess.run(["wsl", "--terminate", distro], capture_output=True, timeout=60,
+                           creationflags=self._creation_flags())
+            self._wsl_exec(distro, "systemctl start docker", timeout=60)
+            command = f"{compose} up -d"
+        elif step == "stack":
+            command = f"{compose} restart"
+        else:
+            services = [state.service for state in self.container_states().values() if not state.ready] or ["nekro_agent"]
+            command = f"{compose} restart {' '.join(services)}"
+        proc = subprocess.run(
+            ["wsl", "-d", distro, "--", "bash", "-c", command],
+            capture_output=True, timeout=180,
+            creationflags=self._creation_flags(),
+        )
+        if proc.returncode != 0:
+            self.log_received.emit(f"[看门狗] 恢复命令失败: {self._clean_stderr(proc.stderr, 300)}", "error")
+        # 重启容器或发行版后各服务的日志跟随会自动从续读位置重连，这里补上尚未跟随的服务
+        self.start_log_followers()
+        return proc.returncode == 0
+
+    def _open_event_stream(self):
+        return DecodedProcess(subprocess.Popen(
+            ["wsl", "-d", DISTRO_NAME, "--", "bash", "-c", events_command(self._deploy_dir())],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            creationflags=self._creation_flags(),
+        ))
+
+    def _fetch_container_states(self):
+        return parse_inspect_output(self._wsl_exec(DISTRO_NAME, inspect_command(self._deploy_dir()), timeout=30))
+
+    def _runtime_exec(self, command, timeout=60):
+        return self._wsl_exec(DISTRO_NAME, command, timeout=timeout)
+
+    def _virtual_disk_bytes(self):
+        install_dir = self.config.get("wsl_install_dir") if self.config else ""
+        vhdx_path = os.path.join(install_dir, "ext4.vhdx") if install_dir else ""
+        return os.path.getsize(vhdx_path) if vhdx_path and os.path.exists(vhdx_path) else 0
+
+    def _open_stats_stream(self):
+        return DecodedProcess(subprocess.Popen(
+            ["wsl", "-d", DISTRO_NAME, "--", "bash", "-c", STATS_COMMAND],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            creationflags=self._creation_flags(),
+        ))
 
     # ------------------------------------------------------------------ #
     #  工具方法
@@ -1086,20 +1581,23 @@ default = root
                 capture_output=True, timeout=timeout,
                 creationflags=self._creation_flags(),
             )
-            return self._safe_decode(proc.stdout)
+            return decode_output(proc.stdout)
         except Exception:
             return ""
 
-    def _copy_to_wsl(self, distro, local_path, wsl_path):
-        """将 Windows 本地文件复制到 WSL 内"""
+    def _to_wsl_path(self, distro, local_path):
+        """将 Windows 本地路径转换为 WSL 内可访问的路径"""
         win_path = os.path.abspath(local_path).replace("\\", "/")
         wsl_win_path = self._wsl_exec(distro, f'wslpath "{win_path}"').strip()
         if wsl_win_path:
-            self._wsl_exec(distro, f'cp "{wsl_win_path}" "{wsl_path}"')
-        else:
-            drive = win_path[0].lower()
-            mnt_path = f"/mnt/{drive}{win_path[2:]}"
-            self._wsl_exec(distro, f'cp "{mnt_path}" "{wsl_path}"')
+            return wsl_win_path
+        drive = win_path[0].lower()
+        return f"/mnt/{drive}{win_path[2:]}"
+
+    def _copy_to_wsl(self, distro, local_path, wsl_path):
+        """将 Windows 本地文件复制到 WSL 内，返回是否成功"""
+        output = self._wsl_exec(distro, f'cp "{self._to_wsl_path(distro, local_path)}" "{wsl_path}" && echo copied')
+        return output.strip().endswith("copied")
 
     def _write_to_wsl(self, distro, content, wsl_path):
         """将字符串内容写入 WSL 内文件"""
@@ -1,60 +1,24 @@
+from core.startup_timeline import ImportProfiler, resident_memory_mb, timeline
 import sys
 import os
 import argparse
-from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QPalette, QColor
-from PyQt6.QtWidgets import QApplication
-from ui.main_window import MainWindow
+import atexit
+from core.config_manager import ConfigManager
+from core.log_writer import AsyncLogWriter
+from core.prewarm import RuntimePrewarmer
 
 # 全局 debug 标志
 DEBUG_MODE = False
 
 
-class LogRedirector:
-    """将 stdout 和 stderr 重定向到文件和控制台（安全处理编码）"""
-    def __init__(self, log_file):
-        self.log_file = log_file
-        self.file = open(log_file, 'w', encoding='utf-8', buffering=1)
-        # 保存原始的 stdout/stderr（已经是打开状态的文件对象）
-        self.console = sys.__stdout__
-
-    def write(self, message):
-        try:
-            # 写入文件（使用 UTF-8）
-            self.file.write(message)
-            self.file.flush()
-        except Exception as e:
-            pass
-
-        try:
-            # 写入控制台（尝试用原始 stdout）
-            self.console.write(message)
-            self.console.flush()
-        except UnicodeEncodeError:
-            # 如果编码出错，用 errors='replace' 重新尝试
-            try:
-                self.console.write(message.encode('utf-8', errors='replace').decode('utf-8', errors='replace'))
-                self.console.flush()
-            except Exception:
-                pass
-        except Exception:
-            pass
-
-    def flush(self):
-        try:
-            self.file.flush()
-        except Exception:
-            pass
-        try:
-            self.console.flush()
-        except Exception:
-            pass
-
-    def close(self):
-        try:
-            self.file.close()
-        except Exception:
-            pass
+def _report_startup(import_profiler):
+    """debug 模式：首个事件循环迭代（窗口首帧）时输出启动时间线与导入耗时"""
+    timeline.mark("首帧")
+    print(f"[LOG] 启动时间线:\n{timeline.report()}")
+    print(f"[LOG] 当前常驻内存: {resident_memory_mb():.1f} MB")
+    if import_profiler:
+        import_profiler.uninstall()
+        print(f"[LOG] 导入耗时（累计，含子模块）:\n{import_profiler.report()}")
 
 
 def main():
@@ -80,13 +44,38 @@ def main():
     os.makedirs(log_dir, exist_ok=True)
     log_file = os.path.join(log_dir, "debug.log")
 
-    # 重定向 stdout 和 stderr 到日志文件和控制台
-    redirector = LogRedirector(log_file)
-    sys.stdout = redirector
-    sys.stderr = redirector
+    # 重定向 stdout 和 stderr 到日志文件和控制台（后台线程写入，按大小 / 时间轮转）
+    config = ConfigManager()
+    writer = AsyncLogWriter(
+        log_file,
+        max_bytes=(config.get("log_file_max_mb") or 10) * 1024 * 1024,
+        rotate_interval=(config.get("log_file_rotate_hours") or 24) * 3600,
+        backups=config.get("log_file_backups") or 10,
+        retention_days=config.get("log_file_retention_days") or 14,
+    )
+    sys.stdout = writer
+    sys.stderr = writer
+    atexit.register(writer.close)
 
     print(f"[LOG] 程序启动，日志文件: {log_file}")
 
+    # 在导入 Qt、构建窗口之前开始预热运行环境，与界面初始化并行
+    prewarmer = RuntimePrewarmer(config, timeline=timeline, log=lambda message: print(f"[LOG] {message}"))
+    if prewarmer.start():
+        print("[LOG] 已开始后台预热运行环境")
+
+    import_profiler = None
+    if DEBUG_MODE:
+        import_profiler = ImportProfiler()
+        import_profiler.install()
+
+    timeline.begin("导入 Qt 与主窗口")
+    from PyQt6.QtCore import Qt, QTimer
+    from PyQt6.QtGui import QPalette, QColor
+    from PyQt6.QtWidgets import QApplication
+    from ui.main_window import MainWindow
+    timeline.end("导入 Qt 与主窗口")
+
     # 尝试禁用无障碍功能以规避某些 Windows 环境下的刷屏报错
     os.environ["WEBVIEW2_ADDITIONAL_BROWSER_ARGUMENTS"] = "--disable-features=Accessibility"
 
@@ -104,6 +93,7 @@ def main():
     QApplication.setAttribute(Qt.ApplicationAttribute.AA_ShareOpenGLContexts, True)
 
     app = QApplication(sys.argv)
+    timeline.mark("QApplication 已创建")
 
     # 强制使用 Fusion 风格 + 亮色调色板，不跟随系统深色模式
     app.setStyle("Fusion")
@@ -124,9 +114,15 @@ def main():
     app.setPalette(light_palette)
 
     # 实例化并显示主窗口
-    window = MainWindow()
+    timeline.begin("构建主窗口")
+    window = MainWindow(prewarmer=prewarmer)
     window.debug_mode = DEBUG_MODE
+    timeline.end("构建主窗口")
     window.show()
+    timeline.mark("主窗口已显示")
+    if DEBUG_MODE:
+        QTimer.singleShot(0, lambda: _report_startup(import_profiler))
+        QTimer.singleShot(15000, lambda: print(f"[LOG] 空闲常驻内存: {resident_memory_mb():.1f} MB"))
 
     sys.exit(app.exec())
 
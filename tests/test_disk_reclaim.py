@@ -0,0 +1,208 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from core.disk_reclaim import DiskReclaimer, ReclaimScheduler, parse_docker_reclaimed, parse_trimmed
+from core.powershell import CommandResult
+
+DAY = 86400
+GUEST_OUTPUT = (
+    "Total reclaimed space: 1.5GB\n"
+    "Total:\t0B\n"
+    "/: 2 GiB (2147483648 bytes) trimmed on /dev/sda1\n"
+)
+
+
+class FakeConfig:
+    def __init__(self, **values):
+        self.values = dict(disk_reclaim_interval_days=0, disk_reclaim_min_free_gb=0, disk_reclaim_last_run=0)
+        self.values.update(values)
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value):
+        self.values[key] = value
+
+
+class ReclaimSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000 * DAY
+        self.free = 100.0
+        self.triggered = []
+        self.accept = True
+
+    def scheduler(self, **config):
+        self.config = FakeConfig(**config)
+        return ReclaimScheduler(self.config, self.trigger, lambda: self.free, clock=lambda: self.now)
+
+    def trigger(self, reason):
+        self.triggered.append(reason)
+        return self.accept
+
+    def test_first_check_only_records_start(self):
+        scheduler = self.scheduler(disk_reclaim_interval_days=7, disk_reclaim_min_free_gb=50)
+        self.free = 1.0
+        self.assertEqual(scheduler.check(), "")
+        self.assertEqual(self.config.get("disk_reclaim_last_run"), self.now)
+        self.assertEqual(self.triggered, [])
+
+    def test_disabled_by_default(self):
+        scheduler = self.scheduler(disk_reclaim_last_run=self.now)
+        self.free = 0.5
+        self.now += 365 * DAY
+        self.assertEqual(scheduler.check(), "")
+        self.assertEqual(self.triggered, [])
+
+    def test_interval(self):
+        scheduler = self.scheduler(disk_reclaim_interval_days=7, disk_reclaim_last_run=self.now)
+        self.now += 7 * DAY - 1
+        self.assertEqual(scheduler.check(), "")
+        self.now += 1
+        self.assertEqual(scheduler.check(), "距上次回收已超过 7 天")
+        self.assertEqual(self.config.get("disk_reclaim_last_run"), self.now)
+        self.assertEqual(scheduler.check(), "")
+        self.assertEqual(len(self.triggered), 1)
+
+    def test_declined_trigger_keeps_last_run(self):
+        scheduler = self.scheduler(disk_reclaim_interval_days=1, disk_reclaim_last_run=self.now)
+        started = self.now
+        self.accept = False
+        self.now += 2 * DAY
+        self.assertTrue(scheduler.check())
+        self.assertEqual(self.config.get("disk_reclaim_last_run"), started)
+
+    def test_free_space_threshold_and_cooldown(self):
+        scheduler = self.scheduler(disk_reclaim_min_free_gb=20, disk_reclaim_last_run=self.now)
+        self.free = 12.34
+        # 距上次回收不足 24 小时，空间不足也不触发
+        self.now += ReclaimScheduler.THRESHOLD_COOLDOWN - 1
+        self.assertEqual(scheduler.due_reason(), "")
+        self.now += 1
+        self.assertEqual(scheduler.due_reason(), "宿主机剩余空间 12.3 GB 低于 20 GB")
+        self.free = 20.0
+        self.assertEqual(scheduler.due_reason(), "")
+        self.free = None
+        self.assertEqual(scheduler.due_reason(), "")
+
+
+class DiskReclaimerTest(unittest.TestCase):
+    def setUp(self):
+        self.steps = []
+        self.results = {"guest": True, "stop": True, "compact": True, "start": True}
+        self.sizes = [10 * 1024 ** 3, 6 * 1024 ** 3]
+
+    def step(self, name):
+        def run(*args):
+            self.steps.append(name)
+            result = self.results[name]
+            if isinstance(result, Exception):
+                raise result
+            return (result, GUEST_OUTPUT) if name == "guest" else result
+        return run
+
+    def run_reclaimer(self):
+        return DiskReclaimer(
+            self.step("guest"), self.step("stop"), self.step("compact"), self.step("start"),
+            lambda: self.sizes.pop(0),
+        ).run()
+
+    def test_parse_outputs(self):
+        self.assertEqual(parse_docker_reclaimed(GUEST_OUTPUT), 1500 * 1000 ** 2)
+        self.assertEqual(parse_trimmed(GUEST_OUTPUT), 2147483648)
+
+    def test_order_and_result(self):
+        result = self.run_reclaimer()
+        self.assertEqual(self.steps, ["guest", "stop", "compact", "start"])
+        self.assertTrue(result.ok)
+        self.assertTrue(result.compacted and result.restarted)
+        self.assertEqual(result.reclaimed, 4 * 1024 ** 3)
+        self.assertEqual(result.docker_freed, 1500 * 1000 ** 2)
+
+    def test_failed_guest_cleanup_still_compacts(self):
+        self.results["guest"] = False
+        self.assertTrue(self.run_reclaimer().ok)
+        self.assertEqual(self.steps, ["guest", "stop", "compact", "start"])
+
+    def test_stop_failure_skips_compact(self):
+        self.results["stop"] = False
+        result = self.run_reclaimer()
+        self.assertEqual(self.steps, ["guest", "stop"])
+        self.assertEqual(result.error, "停止运行环境失败")
+
+    def test_runtime_restarted_after_compact_failure(self):
+        self.results["compact"] = False
+        result = self.run_reclaimer()
+        self.assertEqual(self.steps, ["guest", "stop", "compact", "start"])
+        self.assertEqual(result.error, "压缩虚拟磁盘失败")
+        self.assertTrue(result.restarted)
+
+        self.steps = []
+        self.sizes = [1, 1]
+        self.results["compact"] = RuntimeError("boom")
+        with self.assertRaises(RuntimeError):
+            self.run_reclaimer()
+        self.assertEqual(self.steps, ["guest", "stop", "compact", "start"])
+
+
+class FakeSession:
+    """按命令内容返回结果的提权会话，把关键命令记入共享的步骤列表"""
+
+    def __init__(self, steps, disk_path):
+        self.steps = steps
+        self.disk_path = disk_path
+
+    def run(self, command, timeout=120):
+        if "Get-VMHardDiskDrive" in command:
+            return CommandResult(0, self.disk_path + "\r\n", "")
+        if "Optimize-VHD" in command:
+            self.steps.append("compact")
+        elif "Start-VM" in command:
+            self.steps.append("start")
+        elif "Stop-VM" in command:
+            self.steps.append("shutdown")
+        return CommandResult(0, "", "")
+
+    def stop(self):
+        pass
+
+
+class HyperVReclaimOrderTest(unittest.TestCase):
+    def test_reclaim_order(self):
+        from core.config_manager import ConfigManager
+        from core.hyperv_backend import HyperVBackend
+        from core.hyperv_manager import HyperVManager
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        disk_path = os.path.join(directory, "NekroAgent.vhdx")
+        with open(disk_path, "wb") as fh:
+            fh.write(b"\0" * 1024)
+
+        steps = []
+        done = threading.Event()
+        backend = HyperVBackend(config=ConfigManager(os.path.join(directory, "config.json")))
+        backend.manager = HyperVManager(
+            backend.vm_name, backend.switch_name, backend.nat_name, backend.subnet,
+            session=FakeSession(steps, disk_path),
+        )
+        backend._phone_home = False
+        backend.is_running = True
+        backend._reclaim_in_guest = lambda script: (steps.append("guest"), (True, GUEST_OUTPUT))[1]
+        backend._stop_monitoring = lambda: steps.append("stop-monitoring")
+        backend.wait_for_ssh_ready = lambda timeout=180: steps.append("wait") or True
+        backend.start_log_followers = lambda: steps.append("log-followers")
+        backend._wait_ready = lambda deploy_dir: (steps.append("wait-ready"), done.set())
+
+        self.assertTrue(backend.reclaim_disk())
+        self.assertTrue(done.wait(10))
+        self.assertEqual(steps, [
+            "guest", "stop-monitoring", "shutdown", "compact", "start", "wait", "log-followers", "wait-ready",
+        ])
+        self.assertGreater(backend.config.get("disk_reclaim_last_run"), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
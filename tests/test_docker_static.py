@@ -0,0 +1,114 @@
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+
+from core import docker_static
+from core.artifact_cache import ArtifactCache
+from core.docker_static import EXIT_MISSING_IPTABLES, StaticDockerBundle, build_install_script, static_artifacts
+
+PAYLOADS = {name: f"{name} payload".encode() for name, _, _ in static_artifacts()}
+
+
+class FakeFetcher:
+    """按文件名写入预设内容，served 记录下载次数"""
+
+    served = []
+    payloads = PAYLOADS
+
+    def __init__(self, urls, log=None, progress=None):
+        pass
+
+    def download(self, dest_path):
+        name = os.path.basename(dest_path)
+        FakeFetcher.served.append(name)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        with open(dest_path, "wb") as fh:
+            fh.write(FakeFetcher.payloads[name])
+        return True
+
+
+class StaticBundleEnsureTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+        self.cache = ArtifactCache(self.root)
+        self.logs = []
+        self.bundle = StaticDockerBundle(self.cache, log=lambda message, level="info": self.logs.append((level, message)))
+        FakeFetcher.served = []
+        FakeFetcher.payloads = dict(PAYLOADS)
+        self.pins = {name: hashlib.sha256(data).hexdigest() for name, data in PAYLOADS.items()}
+        patches = [
+            mock.patch.object(docker_static, "RuntimeImageFetcher", FakeFetcher),
+            mock.patch.dict(docker_static.PINNED_SHA256, self.pins),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_verified_download_is_cached(self):
+        paths = self.bundle.ensure()
+        self.assertEqual(paths, tuple(self.cache.path(name) for name in PAYLOADS))
+        self.assertEqual(self.bundle.ensure(), paths)
+        self.assertEqual(FakeFetcher.served, list(PAYLOADS))
+
+    def test_checksum_mismatch_is_rejected(self):
+        name = next(iter(PAYLOADS))
+        FakeFetcher.payloads[name] = b"tampered"
+        self.assertIsNone(self.bundle.ensure())
+        self.assertFalse(self.cache.exists(name))
+        self.assertTrue(any(level == "error" and "校验失败" in message for level, message in self.logs))
+
+    def test_tampered_cache_is_downloaded_again(self):
+        self.bundle.ensure()
+        name = next(iter(PAYLOADS))
+        with open(self.cache.path(name), "wb") as fh:
+            fh.write(b"tampered")
+        FakeFetcher.served = []
+        self.assertIsNotNone(self.bundle.ensure())
+        self.assertEqual(FakeFetcher.served, [name])
+
+    def test_unpinned_artifacts_are_refused(self):
+        with mock.patch.dict(docker_static.PINNED_SHA256, {name: "" for name in PAYLOADS}):
+            self.assertIsNone(self.bundle.ensure())
+        self.assertEqual(FakeFetcher.served, [])
+
+
+class InstallScriptTest(unittest.TestCase):
+    def setUp(self):
+        self.script = build_install_script(
+            "/tmp/docker.tgz", "/tmp/docker-compose", ["https://mirror.example"], docker_user="nekro",
+        )
+
+    def test_script_content(self):
+        lines = self.script.splitlines()
+        self.assertEqual(lines[0], "set -e")
+        # iptables 检查必须在解包安装之前
+        self.assertIn("command -v iptables", lines[1])
+        self.assertIn(f"exit {EXIT_MISSING_IPTABLES}", lines[1])
+        self.assertLess(self.script.index("iptables"), self.script.index("tar -xzf"))
+        self.assertIn('tar -xzf "/tmp/docker.tgz"', self.script)
+        self.assertIn('install -m 0755 "/tmp/docker-compose" /usr/local/lib/docker/cli-plugins/docker-compose', self.script)
+        self.assertIn('{"registry-mirrors": ["https://mirror.example"]}', self.script)
+        for unit in ("containerd.service", "docker.socket", "docker.service"):
+            self.assertIn(f"cat > /etc/systemd/system/{unit} <<'NEKRO_EOF'", self.script)
+        self.assertIn("usermod -aG docker nekro", self.script)
+        self.assertTrue(self.script.rstrip().endswith("docker compose version"))
+
+    @unittest.skipUnless(shutil.which("bash"), "需要 bash")
+    def test_missing_iptables_exits_42(self):
+        empty = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, empty, True)
+        proc = subprocess.run(
+            [shutil.which("bash"), "-c", self.script], env={"PATH": empty},
+            capture_output=True, timeout=30,
+        )
+        self.assertEqual(proc.returncode, EXIT_MISSING_IPTABLES)
+        self.assertIn("iptables", proc.stderr.decode("utf-8"))
+
+
+if __name__ == "__main__":
+    unittest.main()
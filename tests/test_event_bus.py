@@ -0,0 +1,92 @@
+import os
+import subprocess
+import sys
+import unittest
+
+from core.event_bus import (
+    ContainerLogEvent,
+    EventBus,
+    HealthEvent,
+    LogBatch,
+    LogEvent,
+    ProgressEvent,
+    StatusEvent,
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class EventBusTest(unittest.TestCase):
+    def test_dispatch_batches_logs_and_coalesces_progress(self):
+        bus = EventBus()
+        lines, progress = [], []
+        bus.subscribe(LogEvent, lambda event: lines.append(event.message))
+        bus.channel(ProgressEvent).connect(progress.append)
+        log = bus.channel(LogEvent)
+        log.emit("a")
+        bus.publish(ProgressEvent("10%"))
+        log.emit("b", "warning")
+        bus.publish(ProgressEvent("20%"))
+        events = bus.drain()
+        self.assertEqual([type(event) for event in events], [LogBatch, ProgressEvent])
+        self.assertEqual(events[0].lines, [("a", "info"), ("b", "warning")])
+
+        log.emit("c")
+        bus.publish(ProgressEvent("30%"))
+        bus.dispatch()
+        self.assertEqual(lines, ["c"])
+        self.assertEqual(progress, ["30%"])
+
+    def test_channel_passes_fields(self):
+        bus = EventBus()
+        received = []
+        health = bus.channel(HealthEvent)
+        health.connect(lambda state, detail: received.append((state, detail)))
+        health.emit("degraded", "p99 2.1s")
+        bus.dispatch()
+        self.assertEqual(received, [("degraded", "p99 2.1s")])
+        with self.assertRaises(TypeError):
+            health.disconnect(print)
+
+    def test_backlog_drops_oldest_logs_only(self):
+        bus = EventBus(max_pending=100)
+        status = bus.channel(StatusEvent)
+        status.emit("启动中...")
+        for index in range(200):
+            bus.publish(LogEvent(f"line {index}"))
+            bus.publish(ContainerLogEvent("nekro_agent", f"container {index}"))
+            bus.publish(ProgressEvent(f"{index}"))
+        status.emit("运行中")
+        self.assertLessEqual(bus.pending, 100)
+
+        events = bus.drain()
+        self.assertIsInstance(events[0], LogBatch)
+        message, level = events[0].lines[0]
+        self.assertEqual(level, "warning")
+        dropped = int(message.split("已丢弃 ")[1].split(" ")[0])
+        self.assertGreater(dropped, 0)
+
+        statuses = [event.status for event in events if isinstance(event, StatusEvent)]
+        self.assertEqual(statuses, ["启动中...", "运行中"])
+        self.assertEqual([event.message for event in events if isinstance(event, ProgressEvent)], ["199"])
+        # 保留的是最新的日志
+        lines = [line for event in events if isinstance(event, LogBatch) for line, _ in event.lines][1:]
+        texts = [event.text for event in events if isinstance(event, ContainerLogEvent)]
+        self.assertEqual(lines[-1], "line 199")
+        self.assertEqual(texts[-1], "container 199")
+        self.assertEqual(len(lines) + len(texts) + dropped, 400)
+        self.assertEqual(bus.dropped, 0)
+
+
+class HeadlessBackendTest(unittest.TestCase):
+    def test_backends_import_without_qt(self):
+        code = (
+            "import sys, core.backend_base, core.wsl_manager, core.hyperv_backend;"
+            "print(any(name.startswith('PyQt') for name in sys.modules))"
+        )
+        output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+        self.assertEqual(output.stdout.strip(), "False")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import socket
+import threading
+import time
+import unittest
+import urllib.error
+import urllib.request
+
+from core.guest_readiness import READY_PATH, PhoneHomeListener, render_ready_unit, wait_until_ready
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class FakeSshd:
+    """只发送版本标识行的本地假 sshd"""
+
+    def __init__(self):
+        self.sock = socket.socket()
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen()
+        self.port = self.sock.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            with conn:
+                conn.sendall(b"SSH-2.0-OpenSSH_9.6\r\n")
+
+    def close(self):
+        self.sock.close()
+
+
+class PhoneHomeTest(unittest.TestCase):
+    def setUp(self):
+        self.listener = PhoneHomeListener("127.0.0.1", free_port(), "secret")
+        self.assertTrue(self.listener.start())
+        self.addCleanup(self.listener.stop)
+        # 没有 sshd 在监听的端口
+        self.closed_port = free_port()
+
+    def beacon(self, token="secret", method="POST", path=READY_PATH):
+        url = f"http://127.0.0.1:{self.listener.port}{path}?token={token}&docker=active"
+        request = urllib.request.Request(url, data=b"" if method == "POST" else None, method=method)
+        try:
+            with urllib.request.urlopen(request, timeout=2) as response:
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    def wait(self, timeout=2, stop_event=None):
+        return wait_until_ready("127.0.0.1", self.closed_port, timeout, listener=self.listener, stop_event=stop_event)
+
+    def test_beacon_wakes_waiter(self):
+        threading.Timer(0.2, self.beacon).start()
+        started = time.monotonic()
+        self.assertEqual(self.wait(timeout=5), "phone-home")
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(self.listener.payload, {"docker": "active"})
+        self.assertIsNotNone(self.listener.reported_at)
+
+    def test_wrong_token_or_path_is_rejected(self):
+        self.assertEqual(self.beacon(token="wrong"), 403)
+        self.assertEqual(self.beacon(path="/other"), 403)
+        self.assertFalse(self.listener.ready.is_set())
+        self.assertEqual(self.beacon(method="GET"), 204)
+        self.assertTrue(self.listener.ready.is_set())
+
+    def test_reset_clears_beacon(self):
+        self.beacon()
+        self.assertEqual(self.wait(), "phone-home")
+        self.listener.reset()
+        self.assertFalse(self.listener.ready.is_set())
+        self.assertEqual(self.listener.payload, {})
+        self.assertIsNone(self.listener.reported_at)
+        # 重置后上一次的回报不能让等待立即返回
+        self.assertEqual(self.wait(timeout=0.3), "")
+
+    def test_stop_event(self):
+        stop = threading.Event()
+        stop.set()
+        self.assertEqual(self.wait(stop_event=stop), "")
+
+    def test_subscribers_are_removed(self):
+        self.wait(timeout=0.1)
+        self.assertEqual(self.listener._callbacks, [])
+
+
+class SshBannerTest(unittest.TestCase):
+    def test_ssh_banner_without_listener(self):
+        sshd = FakeSshd()
+        self.addCleanup(sshd.close)
+        self.assertEqual(wait_until_ready("127.0.0.1", sshd.port, 2), "ssh")
+
+    def test_timeout(self):
+        started = time.monotonic()
+        self.assertEqual(wait_until_ready("127.0.0.1", free_port(), 0.3), "")
+        self.assertLess(time.monotonic() - started, 2)
+
+
+class ReadyUnitTest(unittest.TestCase):
+    def test_unit_reports_to_gateway(self):
+        unit = render_ready_unit("172.20.0.1", 47831, "secret")
+        self.assertIn("After=network-online.target ssh.service docker.service", unit)
+        self.assertIn('"http://172.20.0.1:47831/ready?token=secret&docker=$$(systemctl is-active docker)"', unit)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+
+from core.hyperv_manager import HyperVManager
+from core.powershell import CommandResult
+from core.sizing import HostResources, compute_profile
+
+
+class FakeSession:
+    """记录发送的命令，按顺序返回预设结果的提权会话"""
+
+    def __init__(self, *results):
+        self.commands = []
+        self.results = list(results)
+
+    def run(self, command, timeout=120):
+        self.commands.append((command, timeout))
+        return self.results.pop(0) if self.results else CommandResult(0, "", "")
+
+    def stop(self):
+        pass
+
+
+BASE = "C:/cache/ubuntu-hyperv-base.vhdx"
+
+
+class DifferencingDiskTest(unittest.TestCase):
+    def setUp(self):
+        self.session = FakeSession()
+        self.manager = HyperVManager("NekroAgent", "NekroSwitch", "NekroNAT", "192.168.250.0/24", session=self.session)
+        self.vm_dir = tempfile.mkdtemp()
+
+    def test_prepare_base_disk_refuses_when_children_reference_it(self):
+        self.assertTrue(self.manager.prepare_base_disk("C:\\cache\\ubuntu-hyperv.vhd", BASE, ["C:\\vm\\NekroAgent.vhdx"]))
+        command, timeout = self.session.commands[0]
+        self.assertEqual(timeout, 600)
+        # 引用检查必须在删除旧基础盘之前，且带上未注册的差分盘路径
+        guard = command.index("throw")
+        self.assertLess(guard, command.index(f"Remove-Item '{BASE}'"))
+        self.assertIn("-eq 'C:/cache/ubuntu-hyperv-base.vhdx'", command[:guard])
+        self.assertIn("@('C:/vm/NekroAgent.vhdx')", command[:guard])
+        self.assertLess(command.index("Convert-VHD"), command.index("Move-Item"))
+        self.assertTrue(command.endswith("-Name IsReadOnly -Value $true"))
+
+    def test_find_child_disks(self):
+        self.session.results = [CommandResult(0, "C:\\vm\\NekroAgent.vhdx\r\n\r\n", "")]
+        self.assertEqual(self.manager.find_child_disks(BASE), ["C:\\vm\\NekroAgent.vhdx"])
+        self.session.results = [CommandResult(1, "", "Get-VM 失败")]
+        self.assertIsNone(self.manager.find_child_disks(BASE))
+
+    def test_create_vm_only_creates_differencing_child(self):
+        profile = compute_profile(HostResources(16384, 8, 200.0), "napcat")
+        ok, vm_vhdx = self.manager.create_vm(self.vm_dir, "C:\\cache\\ubuntu-hyperv-base.vhdx", profile)
+        self.assertTrue(ok)
+        self.assertEqual(vm_vhdx, os.path.join(self.vm_dir, "NekroAgent.vhdx").replace("\\", "/"))
+        command, _ = self.session.commands[0]
+        self.assertIn(f"New-VHD -Path '{vm_vhdx}' -ParentPath '{BASE}' -Differencing", command)
+        self.assertIn(f"-MemoryStartupBytes {profile.memory_mb}MB", command)
+        self.assertNotIn("Convert-VHD", command)
+        self.assertNotIn("Copy-Item", command)
+
+    def test_recreating_vms_converts_base_only_once(self):
+        # 转换一次基础盘后反复重建虚拟机：全部命令中只有一次整盘转换，没有整盘复制
+        self.manager.prepare_base_disk("C:/cache/ubuntu-hyperv.vhd", BASE)
+        for _ in range(3):
+            self.manager.remove_vm()
+            self.manager.create_vm(self.vm_dir, BASE)
+        commands = "\n".join(command for command, _ in self.session.commands)
+        self.assertEqual(commands.count("Convert-VHD"), 1)
+        self.assertEqual(commands.count("-Differencing"), 3)
+        self.assertNotIn("Copy-Item", commands)
+
+    def test_flatten_disk_returns_new_path(self):
+        vm_vhdx = "C:/vm/NekroAgent.vhdx"
+        self.session.results = [CommandResult(0, "C:/vm/NekroAgent-flat.vhdx\n", "")]
+        self.assertEqual(self.manager.flatten_disk(vm_vhdx), (True, "C:/vm/NekroAgent-flat.vhdx"))
+        command, _ = self.session.commands[0]
+        self.assertIn("VhdType -eq 'Differencing'", command)
+        self.assertLess(command.index("Set-VMHardDiskDrive"), command.index(f"Remove-Item '{vm_vhdx}'"))
+
+
+if __name__ == "__main__":
+    unittest.main()
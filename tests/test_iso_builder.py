@@ -0,0 +1,108 @@
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+import unittest
+
+from core.iso_builder import SECTOR_SIZE, build_iso, write_iso
+
+USER_DATA = "#cloud-config\nusers:\n  - name: nekro\n" + "# 填充\n" * 600   # 超过一个扇区
+META_DATA = "instance-id: nekro-agent\nlocal-hostname: nekro\n"
+
+
+def sector(image, index):
+    return image[index * SECTOR_SIZE:(index + 1) * SECTOR_SIZE]
+
+
+def read_directory(image, record):
+    """解析目录记录指向的目录，返回 {标识符 bytes: (起始扇区, 长度, 是否目录)}"""
+    extent, size = struct.unpack_from("<I", record, 2)[0], struct.unpack_from("<I", record, 10)[0]
+    data = image[extent * SECTOR_SIZE:extent * SECTOR_SIZE + size]
+    entries, offset = {}, 0
+    while offset < len(data) and data[offset]:
+        length = data[offset]
+        name_length = data[offset + 32]
+        identifier = data[offset + 33:offset + 33 + name_length]
+        # 大小端两份字段必须一致
+        for both in (data[offset + 2:offset + 10], data[offset + 10:offset + 18]):
+            assert both[:4] == both[4:][::-1], identifier
+        entries[identifier] = (
+            struct.unpack_from("<I", data, offset + 2)[0],
+            struct.unpack_from("<I", data, offset + 10)[0],
+            bool(data[offset + 25] & 0x02),
+        )
+        offset += length
+    return entries
+
+
+class IsoBuilderTest(unittest.TestCase):
+    def setUp(self):
+        self.files = {"user-data": USER_DATA, "meta-data": META_DATA, "network-config": b"version: 2\n"}
+        self.image = build_iso(self.files, timestamp=1700000000)
+
+    def test_volume_descriptors(self):
+        self.assertEqual(len(self.image) % SECTOR_SIZE, 0)
+        self.assertEqual(self.image[:16 * SECTOR_SIZE], b"\x00" * 16 * SECTOR_SIZE)
+        pvd, svd, terminator = sector(self.image, 16), sector(self.image, 17), sector(self.image, 18)
+        self.assertEqual(pvd[:7], b"\x01CD001\x01")
+        self.assertEqual(svd[:7], b"\x02CD001\x01")
+        self.assertEqual(terminator[:7], b"\xffCD001\x01")
+        self.assertEqual(svd[88:91], b"%/E")
+        self.assertEqual(pvd[40:72].rstrip(b" "), b"cidata")
+        self.assertEqual(svd[40:72].decode("utf-16-be").rstrip(" "), "cidata")
+        total = struct.unpack_from("<I", pvd, 80)[0]
+        self.assertEqual(total, struct.unpack_from(">I", pvd, 84)[0])
+        self.assertEqual(total * SECTOR_SIZE, len(self.image))
+
+    def test_joliet_names_round_trip(self):
+        entries = read_directory(self.image, sector(self.image, 17)[156:190])
+        names = {identifier.decode("utf-16-be"): value for identifier, value in entries.items() if len(identifier) > 1}
+        self.assertEqual(set(names), set(self.files))
+        for name, (extent, size, is_dir) in names.items():
+            expected = self.files[name]
+            expected = expected.encode("utf-8") if isinstance(expected, str) else expected
+            self.assertFalse(is_dir)
+            self.assertEqual(self.image[extent * SECTOR_SIZE:extent * SECTOR_SIZE + size], expected)
+
+    def test_iso9660_names_point_to_same_extents(self):
+        primary = read_directory(self.image, sector(self.image, 16)[156:190])
+        joliet = read_directory(self.image, sector(self.image, 17)[156:190])
+        self.assertIn(b"USER_DAT.;1", primary)
+        self.assertIn(b"META_DAT.;1", primary)
+        self.assertIn(b"NETWORK_.;1", primary)
+        self.assertEqual(
+            primary[b"USER_DAT.;1"][:2],
+            joliet["user-data".encode("utf-16-be")][:2],
+        )
+        self.assertTrue(primary[b"\x00"][2])
+
+    def test_colliding_short_names_get_suffix(self):
+        image = build_iso({"network-config": "a", "network-config2": "b"}, timestamp=0)
+        primary = read_directory(image, sector(image, 16)[156:190])
+        self.assertIn(b"NETWORK_.;1", primary)
+        self.assertIn(b"NETWORK1.;1", primary)
+
+    def test_reproducible_and_written_atomically(self):
+        self.assertEqual(build_iso(self.files, timestamp=1700000000), self.image)
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        path = write_iso(os.path.join(directory, "seed", "seed.iso"), self.files, timestamp=1700000000)
+        with open(path, "rb") as fh:
+            self.assertEqual(fh.read(), self.image)
+        self.assertFalse(os.path.exists(path + ".tmp"))
+
+    @unittest.skipUnless(shutil.which("bsdtar"), "需要 bsdtar（libarchive）")
+    def test_external_reader_sees_joliet_files(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        path = write_iso(os.path.join(directory, "seed.iso"), self.files)
+        listing = subprocess.run(["bsdtar", "-tf", path], capture_output=True, text=True).stdout
+        self.assertEqual(set(listing.split()) - {"."}, set(self.files))
+        for name in ("user-data", "meta-data"):
+            content = subprocess.run(["bsdtar", "-xOf", path, name], capture_output=True).stdout
+            self.assertEqual(content.decode("utf-8"), self.files[name])
+
+
+if __name__ == "__main__":
+    unittest.main()
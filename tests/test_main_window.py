@@ -0,0 +1,58 @@
+import ast
+import importlib.util
+import inspect
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _parse(relative):
+    with open(os.path.join(ROOT, relative), encoding="utf-8") as fh:
+        return ast.parse(fh.read())
+
+
+class MainWindowSignatureTest(unittest.TestCase):
+    def test_main_passes_supported_arguments(self):
+        # 不依赖 PyQt6：对比 main.py 的调用与 MainWindow.__init__ 的参数
+        init = next(
+            node for cls in ast.walk(_parse("ui/main_window.py"))
+            if isinstance(cls, ast.ClassDef) and cls.name == "MainWindow"
+            for node in cls.body if isinstance(node, ast.FunctionDef) and node.name == "__init__"
+        )
+        accepted = {arg.arg for arg in init.args.args[1:] + init.args.kwonlyargs}
+        calls = [
+            node for node in ast.walk(_parse("main.py"))
+            if isinstance(node, ast.Call) and getattr(node.func, "id", "") == "MainWindow"
+        ]
+        self.assertTrue(calls)
+        for call in calls:
+            self.assertLessEqual(len(call.args), len(init.args.args) - 1)
+            self.assertLessEqual({keyword.arg for keyword in call.keywords}, accepted)
+
+
+@unittest.skipUnless(importlib.util.find_spec("PyQt6"), "需要 PyQt6")
+class MainWindowSmokeTest(unittest.TestCase):
+    def test_construct(self):
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PyQt6.QtWidgets import QApplication
+
+        from core.config_manager import ConfigManager
+        from ui import main_window
+
+        app = QApplication.instance() or QApplication([])
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.dict(os.environ, {"LOCALAPPDATA": tmp}), \
+                mock.patch.object(main_window, "ConfigManager", lambda: ConfigManager(os.path.join(tmp, "config.json"))):
+            self.assertIn("prewarmer", inspect.signature(main_window.MainWindow).parameters)
+            window = main_window.MainWindow(prewarmer=None)
+            self.assertEqual(window.windowTitle(), "Nekro Agent 启动器")
+            window.close()
+            window.deleteLater()
+            app.processEvents()
+
+
+if __name__ == "__main__":
+    unittest.main()
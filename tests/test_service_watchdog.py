@@ -0,0 +1,165 @@
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core.service_watchdog import (
+    HEALTH_DEGRADED,
+    HEALTH_DOWN,
+    HEALTH_GAVE_UP,
+    HEALTH_OK,
+    HEALTH_RECOVERING,
+    RestartLimiter,
+    ServiceWatchdog,
+    http_probe,
+)
+
+
+class FakeService:
+    """本地假 HTTP 服务，可注入响应延迟和状态码"""
+
+    def __init__(self):
+        self.delay = 0.0
+        self.status = 200
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                threading.Event().wait(service.delay)
+                self.send_response(service.status)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class HttpProbeTest(unittest.TestCase):
+    def setUp(self):
+        self.service = FakeService()
+        self.addCleanup(self.service.close)
+
+    def probe(self, timeout=2):
+        return http_probe(self.service.url, timeout=timeout)
+
+    def test_client_errors_count_as_alive(self):
+        for status in (200, 204, 401, 404):
+            self.service.status = status
+            ok, _, detail = self.probe()
+            self.assertTrue(ok, status)
+            self.assertEqual(detail, f"HTTP {status}")
+
+    def test_server_errors_count_as_down(self):
+        for status in (500, 502, 503):
+            self.service.status = status
+            ok, _, detail = self.probe()
+            self.assertFalse(ok, status)
+            self.assertEqual(detail, f"HTTP {status}")
+
+    def test_latency_and_timeout(self):
+        self.service.delay = 0.2
+        ok, elapsed, _ = self.probe()
+        self.assertTrue(ok)
+        self.assertGreaterEqual(elapsed, 0.2)
+        self.service.delay = 1.0
+        ok, elapsed, _ = self.probe(timeout=0.2)
+        self.assertFalse(ok)
+        self.assertLess(elapsed, 1.0)
+
+    def test_connection_refused(self):
+        url = self.service.url
+        self.service.close()
+        ok, _, _ = http_probe(url, timeout=1)
+        self.assertFalse(ok)
+
+
+class ServiceWatchdogTest(unittest.TestCase):
+    def setUp(self):
+        self.service = FakeService()
+        self.addCleanup(self.service.close)
+        self.now = 0.0
+        self.recoveries = []
+        self.states = []
+        self.fixed_by = "stack"   # 执行到该恢复步骤时服务恢复正常
+        self.watchdog = ServiceWatchdog(
+            lambda: http_probe(self.service.url, timeout=0.5), self.recover,
+            on_health=lambda health, detail: self.states.append(health),
+            failure_threshold=3, slo_p99=0.1, min_samples=5, grace=30, stable_checks=5,
+            limiter=RestartLimiter(max_actions=2, window=600, cooldown=0, clock=self.clock),
+            clock=self.clock,
+        )
+
+    def clock(self):
+        return self.now
+
+    def recover(self, step):
+        self.recoveries.append(step)
+        if step == self.fixed_by:
+            self.service.status = 200
+        return True
+
+    def check(self, times=1):
+        for _ in range(times):
+            health = self.watchdog.check_once()
+            self.now += 1
+        return health
+
+    def test_slow_responses_degrade(self):
+        self.assertEqual(self.check(5), HEALTH_OK)
+        self.service.delay = 0.15
+        self.assertEqual(self.check(5), HEALTH_DEGRADED)
+        self.assertIn("超过 100ms", self.watchdog.detail)
+        self.assertEqual(self.recoveries, [])
+
+    def test_recovery_ladder(self):
+        self.check(3)
+        self.service.status = 503
+        self.assertEqual(self.check(2), HEALTH_DEGRADED)
+        self.assertEqual(self.check(), HEALTH_RECOVERING)
+        self.assertEqual(self.recoveries, ["service"])
+
+        # 宽限期内失败不计数
+        self.check(10)
+        self.assertEqual(self.recoveries, ["service"])
+
+        # 宽限期后仍失败，升级到重启全部服务
+        self.now += 30
+        self.assertEqual(self.check(3), HEALTH_RECOVERING)
+        self.assertEqual(self.recoveries, ["service", "stack"])
+        self.assertEqual(self.check(), HEALTH_OK)
+        self.assertEqual(self.states[-1], HEALTH_OK)
+
+    def test_stable_service_resets_ladder(self):
+        self.fixed_by = "service"
+        self.service.status = 503
+        self.check(3)
+        self.check(self.watchdog.stable_checks)
+        self.now += 600
+        self.service.status = 503
+        self.check(3)
+        self.assertEqual(self.recoveries, ["service", "service"])
+
+    def test_limiter_stops_restarts(self):
+        self.fixed_by = ""
+        self.service.status = 503
+        self.check(3)
+        self.now += 30
+        self.check(3)
+        self.now += 30
+        self.assertEqual(self.check(3), HEALTH_GAVE_UP)
+        self.assertEqual(self.recoveries, ["service", "stack"])
+
+    def test_failed_recovery_reports_down(self):
+        self.watchdog.recover = lambda step: False
+        self.service.status = 503
+        self.assertEqual(self.check(3), HEALTH_DOWN)
+
+
+if __name__ == "__main__":
+    unittest.main()
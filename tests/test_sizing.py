@@ -0,0 +1,90 @@
+import unittest
+
+from core.sizing import HostResources, compute_profile, render_wslconfig
+
+
+class ComputeProfileTest(unittest.TestCase):
+    def test_typical_host(self):
+        profile = compute_profile(HostResources(16384, 8, 100), "napcat")
+        self.assertEqual(profile.memory_mb, 6912)
+        self.assertEqual((profile.memory_min_mb, profile.memory_max_mb), (1024, 9216))
+        self.assertEqual(profile.vcpus, 4)
+        self.assertEqual(profile.swap_mb, 1536)
+        self.assertEqual(profile.headroom_mb, 16384 - 9216)
+        self.assertEqual(profile.warnings, [])
+
+    def test_large_host_is_capped_at_baseline(self):
+        profile = compute_profile(HostResources(65536, 32, 500), "lite")
+        self.assertEqual(profile.memory_mb, 3072 * 3 // 2)
+        self.assertEqual(profile.memory_max_mb, 3072 * 2)
+        self.assertEqual(profile.vcpus, 4)
+        self.assertEqual(profile.swap_mb, 1024)
+
+    def test_low_host_warns(self):
+        profile = compute_profile(HostResources(8192, 2, 10), "napcat")
+        self.assertEqual(profile.memory_mb, 4096)
+        self.assertEqual(profile.memory_max_mb, 4096)
+        self.assertEqual(profile.vcpus, 1)
+        self.assertEqual(profile.swap_mb, 0)
+        self.assertEqual(len(profile.warnings), 2)
+        self.assertIn("内存 8.0 GB 偏少", profile.warnings[0])
+        self.assertIn("已关闭 swap", profile.warnings[1])
+
+    def test_tiny_host_keeps_minimum(self):
+        profile = compute_profile(HostResources(4096, 1, 50), "napcat")
+        # 可分配内存为 0 时仍给到基线的一半，且至少 1 核
+        self.assertEqual(profile.memory_mb, 2304)
+        self.assertEqual(profile.memory_min_mb, 1024)
+        self.assertEqual(profile.memory_max_mb, 2304)
+        self.assertEqual(profile.vcpus, 1)
+        self.assertTrue(profile.warnings)
+
+    def test_unknown_mode_uses_napcat(self):
+        profile = compute_profile(HostResources(16384, 8, 100), "")
+        self.assertEqual(profile.deploy_mode, "napcat")
+
+
+class RenderWslconfigTest(unittest.TestCase):
+    def setUp(self):
+        self.profile = compute_profile(HostResources(16384, 8, 100), "napcat")
+
+    def test_empty_file(self):
+        content = render_wslconfig(self.profile)
+        self.assertEqual(content, (
+            "[wsl2]\nmemory=6912MB\nprocessors=4\nswap=1536MB\n\n"
+            "[experimental]\nautoMemoryReclaim=gradual\nsparseVhd=true\n"
+        ))
+
+    def test_user_settings_are_preserved(self):
+        existing = (
+            "# Docker Desktop 也读取此文件\n"
+            "[wsl2]\n"
+            "Memory=2GB\n"
+            "networkingMode=mirrored\n"
+            "\n"
+            "[experimental]\n"
+            "sparseVhd=false\n"
+        )
+        content = render_wslconfig(self.profile, existing)
+        lines = content.splitlines()
+        self.assertEqual(lines[0], "# Docker Desktop 也读取此文件")
+        self.assertIn("Memory=2GB", lines)
+        self.assertIn("networkingMode=mirrored", lines)
+        self.assertIn("sparseVhd=false", lines)
+        self.assertNotIn("memory=6912MB", lines)
+        self.assertNotIn("sparseVhd=true", lines)
+        # 缺失的键补在所属节内、节后空行之前
+        self.assertEqual(lines[1:7], [
+            "[wsl2]", "Memory=2GB", "networkingMode=mirrored", "processors=4", "swap=1536MB", "",
+        ])
+        self.assertEqual(lines[7:], ["[experimental]", "sparseVhd=false", "autoMemoryReclaim=gradual"])
+
+    def test_idempotent(self):
+        once = render_wslconfig(self.profile, "[wsl2]\nswap=0\n\n[network]\ngenerateHosts=false\n")
+        self.assertEqual(render_wslconfig(self.profile, once), once)
+        self.assertIn("swap=0", once.splitlines())
+        self.assertIn("generateHosts=false", once.splitlines())
+
+
+if __name__ == "__main__":
+    unittest.main()
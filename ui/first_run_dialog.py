@@ -5,22 +5,27 @@ from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
                              QProgressBar, QSizePolicy)
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
 
+from core.event_bus import DockerInstallEvent
 from ui.styles import STYLESHEET
 from ui.widgets import show_notice_dialog
 
 
-class CheckStepThread(QThread):
-    """运行单个环境检测步骤"""
+class CheckThread(QThread):
+    """在一个线程内依次运行全部检测步骤，某步失败后停止"""
     step_done = pyqtSignal(int, bool, str)
+    all_done = pyqtSignal()
 
-    def __init__(self, func, step_index):
+    def __init__(self, funcs):
         super().__init__()
-        self._func = func
-        self._step = step_index
+        self._funcs = funcs
 
     def run(self):
-        passed, detail = self._func()
-        self.step_done.emit(self._step, passed, detail)
+        for step, func in enumerate(self._funcs):
+            passed, detail = func()
+            self.step_done.emit(step, passed, detail)
+            if not passed:
+                break
+        self.all_done.emit()
 
 
 class CreateRuntimeThread(QThread):
@@ -190,6 +195,7 @@ class FirstRunDialog(QDialog):
     def _connect_backend_signals(self):
         self.backend.progress_updated.connect(self._on_progress)
         self.backend.install_error.connect(self._on_install_error)
+        self.backend.bus.subscribe(DockerInstallEvent, self._on_docker_installed)
 
     def _on_install_error(self, message):
         if hasattr(self, "lbl_error"):
@@ -287,20 +293,15 @@ class FirstRunDialog(QDialog):
         self._check_in_progress = True
         self._check_funcs = self.backend.get_check_funcs()
         self._check_results = {}
-        self._run_check_step(0)
-
-    def _run_check_step(self, step):
-        """启动第 step 步检测的子线程"""
-        if step >= len(self._check_funcs):
-            self._on_all_checks_done()
-            return
-        thread = CheckStepThread(self._check_funcs[step], step)
+        # 各步骤共享后端的一次并发采集，整页检测只需一轮
+        thread = CheckThread(self._check_funcs)
         thread.step_done.connect(self._on_step_done)
-        self._current_step_thread = thread  # prevent GC
+        thread.all_done.connect(self._on_all_checks_done)
+        self._check_thread = thread  # prevent GC
         thread.start()
 
     def _on_step_done(self, step, passed, detail):
-        """单步检测完成，更新 UI 后启动下一步"""
+        """单步检测完成，更新 UI"""
         labels = [self.lbl_wsl, self.lbl_distro, self.lbl_docker, self.lbl_compose]
         self._check_results[step] = (passed, detail)
         self._update_check_item(labels[step], passed, detail)
@@ -311,9 +312,6 @@ class FirstRunDialog(QDialog):
                 name = labels[i].property("check_name")
                 labels[i].setText(f"—  {name}")
                 labels[i].setStyleSheet("font-size: 15px; color: #8b949e; padding: 5px 0;")
-            self._on_all_checks_done()
-            return
-        self._run_check_step(step + 1)
 
     def _on_all_checks_done(self):
         """全部检测完成，更新描述文字和按钮状态"""
@@ -547,20 +545,17 @@ class FirstRunDialog(QDialog):
         # 检查当前是否在创建页面（页面 1）
         if self.stack.currentIndex() == 2:
             self.lbl_progress.setText(text)
-            return
 
-        # 检测页面的处理
-        if text == "__docker_done__":
-            self.check_progress.setVisible(False)
+    def _on_docker_installed(self, event):
+        """检测页中安装 Docker 的结果"""
+        self.check_progress.setVisible(False)
+        if event.success:
             self._recheck()
             return
-        if text == "__docker_fail__":
-            self.check_progress.setVisible(False)
-            self.check_desc.setText("Docker 安装失败，请重试。")
-            self.btn_action.setText("安装 Docker")
-            self.btn_action.setEnabled(True)
-            self._action_mode = "install_docker"
-            return
+        self.check_desc.setText("Docker 安装失败，请重试。")
+        self.btn_action.setText("安装 Docker")
+        self.btn_action.setEnabled(True)
+        self._action_mode = "install_docker"
 
     def _on_create_done(self, success):
         self.btn_create.setEnabled(True)
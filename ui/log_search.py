@@ -0,0 +1,135 @@
+import re
+import threading
+import time
+from collections import deque
+
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import QCheckBox, QComboBox, QHBoxLayout, QLabel, QLineEdit, QPushButton, QVBoxLayout, QWidget
+
+from core.log_store import SOURCE_LABELS
+from ui.log_view import LogModel, LogView
+
+
+RANGES = [
+    ("最近 1 小时", 3600),
+    ("最近 24 小时", 86400),
+    ("最近 7 天", 7 * 86400),
+    ("全部", 0),
+]
+
+
+class LogSearchPanel(QWidget):
+    """在本地日志存储中搜索；查询在后台线程执行，结果按时间倒序逐批显示"""
+
+    def __init__(self, store, limit=2000, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.limit = limit
+        self._results = deque()
+        self._generation = 0
+        self._searching = False
+        self._found = 0
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(10)
+
+        row = QHBoxLayout()
+        self.query_edit = QLineEdit()
+        self.query_edit.setPlaceholderText("搜索日志内容，留空则列出全部")
+        self.query_edit.returnPressed.connect(self.search)
+        self.regex_check = QCheckBox("正则")
+        self.source_combo = QComboBox()
+        self.source_combo.addItem("全部来源", None)
+        for source, label in SOURCE_LABELS.items():
+            self.source_combo.addItem(label, source)
+        self.range_combo = QComboBox()
+        for label, seconds in RANGES:
+            self.range_combo.addItem(label, seconds)
+        self.range_combo.setCurrentIndex(1)
+        search_button = QPushButton("搜索")
+        search_button.clicked.connect(self.search)
+        row.addWidget(self.query_edit, 1)
+        row.addWidget(self.regex_check)
+        row.addWidget(self.source_combo)
+        row.addWidget(self.range_combo)
+        row.addWidget(search_button)
+        layout.addLayout(row)
+
+        self.status_label = QLabel("输入关键字后回车搜索，结果按时间倒序排列。")
+        self.status_label.setObjectName("MetricHint")
+        layout.addWidget(self.status_label)
+
+        self.model = LogModel(limit, parent=self)
+        self.view = LogView(self.model, follow_tail=False)
+        layout.addWidget(self.view, 1)
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(50)
+        self._timer.timeout.connect(self._drain_results)
+
+    def search(self):
+        pattern = self.query_edit.text().strip()
+        regex = self.regex_check.isChecked()
+        if regex and pattern:
+            try:
+                re.compile(pattern)
+            except re.error as exc:
+                self.status_label.setText(f"正则表达式无效: {exc}")
+                return
+        seconds = self.range_combo.currentData()
+        source = self.source_combo.currentData()
+
+        # 新的搜索使正在进行的搜索失效
+        self._generation += 1
+        generation = self._generation
+        self._results.clear()
+        self.model.clear()
+        self._found = 0
+        self._searching = True
+        self.status_label.setText("搜索中...")
+        self._timer.start()
+        threading.Thread(
+            target=self._run_search,
+            args=(generation, pattern, regex, time.time() - seconds if seconds else None, [source] if source else None),
+            daemon=True,
+        ).start()
+
+    def _run_search(self, generation, pattern, regex, start, sources):
+        started = time.perf_counter()
+        error = ""
+        try:
+            for record in self.store.search(pattern, regex=regex, start=start, sources=sources, limit=self.limit):
+                if generation != self._generation:
+                    return
+                self._results.append(record)
+        except Exception as exc:
+            error = str(exc)
+        if generation == self._generation:
+            self._results.append((error, time.perf_counter() - started))
+
+    def _drain_results(self):
+        for _ in range(500):
+            if not self._results:
+                return
+            item = self._results.popleft()
+            if isinstance(item, tuple):
+                self._finish(*item)
+                return
+            label = SOURCE_LABELS.get(item.source, item.source)
+            self.model.append(
+                f"{time.strftime('%m-%d %H:%M:%S', time.localtime(item.time))}  {label}  {item.text}",
+                item.level, item.time,
+            )
+            self._found += 1
+        self.status_label.setText(f"搜索中... 已找到 {self._found} 条")
+
+    def _finish(self, error, elapsed):
+        self._timer.stop()
+        self._searching = False
+        if error:
+            self.status_label.setText(f"搜索失败: {error}")
+        elif self._found >= self.limit:
+            self.status_label.setText(f"显示最近的 {self._found} 条结果（用时 {elapsed:.2f}s），可缩小时间范围或细化关键字")
+        else:
+            self.status_label.setText(f"找到 {self._found} 条结果（用时 {elapsed:.2f}s）")
@@ -0,0 +1,240 @@
+import time
+from array import array
+from collections import deque
+
+from PyQt6.QtCore import QAbstractListModel, QModelIndex, QRect, QSize, Qt, QTimer
+from PyQt6.QtGui import QColor, QKeySequence
+from PyQt6.QtWidgets import QAbstractItemView, QApplication, QListView, QStyle, QStyledItemDelegate
+
+from core.log_store import LEVEL_CODES, LEVELS
+
+
+VM_LEVEL = LEVEL_CODES["vm"]
+# 级别字节的最高位标记多行日志的后续行
+CONTINUATION = 0x80
+CONTINUATION_INDENT = "    "
+
+LEVEL_COLORS = {
+    "info": "#7ce0a3",
+    "warning": "#f2c15f",
+    "error": "#f26f82",
+    "debug": "#8fa4b8",
+    "vm": "#8fa4b8",
+}
+TEXT_COLOR = "#dfeaf6"
+
+
+class LogBuffer:
+    """
+    定长环形日志缓冲区：时间戳、级别、文本分列存放并预先分配，
+    写满后新行覆盖最旧的行，内存占用只取决于容量。
+    """
+
+    __slots__ = ("capacity", "_stamps", "_levels", "_texts", "_start", "_count")
+
+    def __init__(self, capacity):
+        self.capacity = max(1, int(capacity))
+        self._stamps = array("d", bytes(8 * self.capacity))
+        self._levels = bytearray(self.capacity)
+        self._texts = [""] * self.capacity
+        self._start = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, stamp, level, text):
+        index = (self._start + self._count) % self.capacity
+        self._stamps[index] = stamp
+        self._levels[index] = level
+        self._texts[index] = text
+        if self._count < self.capacity:
+            self._count += 1
+        else:
+            self._start = (self._start + 1) % self.capacity
+
+    def discard(self, count):
+        """丢弃最旧的 count 行"""
+        count = min(count, self._count)
+        for offset in range(count):
+            self._texts[(self._start + offset) % self.capacity] = ""
+        self._start = (self._start + count) % self.capacity
+        self._count -= count
+
+    def clear(self):
+        self._texts = [""] * self.capacity
+        self._start = 0
+        self._count = 0
+
+    def record(self, row):
+        """第 row 行（0 为最旧）→ (时间戳, 级别编码, 文本)"""
+        index = (self._start + row) % self.capacity
+        return self._stamps[index], self._levels[index], self._texts[index]
+
+
+class LogModel(QAbstractListModel):
+    """
+    日志行模型。append() 只把行放进待写入队列，由定时器批量提交给视图，
+    高频日志下每个刷新周期只触发一次插入 / 删除通知；
+    set_active(False) 时停止提交，待写入队列同样有上限。
+    多行日志拆成多行存放，后续行缩进显示，行高保持一致。
+    """
+
+    LevelRole = Qt.ItemDataRole.UserRole + 1
+    ContinuationRole = Qt.ItemDataRole.UserRole + 2
+
+    def __init__(self, capacity=20000, flush_ms=100, parent=None):
+        super().__init__(parent)
+        self.buffer = LogBuffer(capacity)
+        self._pending = deque(maxlen=self.buffer.capacity)
+        self._active = True
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(flush_ms)
+        self._timer.timeout.connect(self.flush)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.buffer)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.buffer):
+            return None
+        stamp, code, text = self.buffer.record(index.row())
+        level = code & ~CONTINUATION
+        if role == Qt.ItemDataRole.DisplayRole:
+            if code & CONTINUATION:
+                return CONTINUATION_INDENT + text
+            return text if level == VM_LEVEL else f"[{LEVELS[level].upper()}] {text}"
+        if role == self.LevelRole:
+            return level
+        if role == self.ContinuationRole:
+            return bool(code & CONTINUATION)
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return f"{time.strftime('%H:%M:%S', time.localtime(stamp))}  {text}"
+        return None
+
+    def append(self, text, level="info", stamp=None):
+        stamp = stamp or time.time()
+        code = LEVEL_CODES.get(level, 0)
+        if "\n" in text or "\r" in text:
+            first, *rest = text.splitlines() or [""]
+            self._pending.append((stamp, code, first))
+            self._pending.extend((stamp, code | CONTINUATION, line) for line in rest)
+        else:
+            self._pending.append((stamp, code, text))
+        if self._active and not self._timer.isActive():
+            self._timer.start()
+
+    def clear(self):
+        self._pending.clear()
+        self.beginResetModel()
+        self.buffer.clear()
+        self.endResetModel()
+
+    def set_active(self, active):
+        if active == self._active:
+            return
+        self._active = active
+        if active:
+            self.flush()
+        else:
+            self._timer.stop()
+
+    def flush(self):
+        if not self._pending:
+            return
+        batch = list(self._pending)
+        self._pending.clear()
+        overflow = len(self.buffer) + len(batch) - self.buffer.capacity
+        if overflow > 0:
+            self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+            self.buffer.discard(overflow)
+            self.endRemoveRows()
+        first = len(self.buffer)
+        self.beginInsertRows(QModelIndex(), first, first + len(batch) - 1)
+        for stamp, level, text in batch:
+            self.buffer.append(stamp, level, text)
+        self.endInsertRows()
+
+
+class LogDelegate(QStyledItemDelegate):
+    """按级别着色绘制单行日志；tint_message 为 False 时只给级别前缀着色"""
+
+    def __init__(self, tint_message=False, parent=None):
+        super().__init__(parent)
+        self.tint_message = tint_message
+        self._colors = [QColor(LEVEL_COLORS[name]) for name in LEVELS]
+        self._text_color = QColor(TEXT_COLOR)
+
+    def sizeHint(self, option, index):
+        return QSize(0, option.fontMetrics.height() + 4)
+
+    def paint(self, painter, option, index):
+        painter.save()
+        if option.state & QStyle.StateFlag.State_Selected:
+            painter.fillRect(option.rect, option.palette.highlight())
+        level = index.data(LogModel.LevelRole) or 0
+        continuation = index.data(LogModel.ContinuationRole)
+        text = index.data(Qt.ItemDataRole.DisplayRole) or ""
+        color = self._colors[level]
+        if continuation and level != VM_LEVEL and not self.tint_message:
+            color = self._text_color
+        metrics = option.fontMetrics
+        rect = option.rect.adjusted(4, 0, -4, 0)
+        align = Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter
+
+        prefix = ""
+        if level != VM_LEVEL and not self.tint_message and not continuation:
+            prefix, _, text = text.partition(" ")
+            painter.setPen(color)
+            painter.drawText(rect, align, prefix)
+            width = metrics.horizontalAdvance(prefix + " ")
+            rect = QRect(rect.left() + width, rect.top(), max(0, rect.width() - width), rect.height())
+            color = self._text_color
+        painter.setPen(color)
+        painter.drawText(rect, align, metrics.elidedText(text, Qt.TextElideMode.ElideRight, rect.width()))
+        painter.restore()
+
+
+class LogView(QListView):
+    """只绘制可见行的日志视图；停在底部时自动跟随新日志，向上翻阅时保持位置"""
+
+    def __init__(self, model, tint_message=False, follow_tail=True, parent=None):
+        super().__init__(parent)
+        self.setObjectName("LogViewer")
+        self.setModel(model)
+        self.setItemDelegate(LogDelegate(tint_message, self))
+        self.setUniformItemSizes(True)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self._follow = follow_tail
+        self._follow_enabled = follow_tail
+        model.rowsAboutToBeInserted.connect(self._remember_position)
+        model.rowsInserted.connect(self._follow_tail)
+        model.rowsRemoved.connect(self._keep_position)
+
+    def _at_bottom(self):
+        bar = self.verticalScrollBar()
+        return bar.value() >= bar.maximum()
+
+    def _remember_position(self, *args):
+        self._follow = self._follow_enabled and self._at_bottom()
+
+    def _follow_tail(self, *args):
+        if self._follow:
+            self.scrollToBottom()
+
+    def _keep_position(self, parent, first, last):
+        # 最旧的行被淘汰时，向上翻阅的位置随之上移，保持看到的内容不变
+        if first == 0 and not self._at_bottom():
+            bar = self.verticalScrollBar()
+            bar.setValue(max(0, bar.value() - (last - first + 1)))
+
+    def keyPressEvent(self, event):
+        if event.matches(QKeySequence.StandardKey.Copy):
+            rows = sorted(index.row() for index in self.selectedIndexes())
+            model = self.model()
+            QApplication.clipboard().setText("\n".join(model.index(row).data() or "" for row in rows))
+            return
+        super().keyPressEvent(event)
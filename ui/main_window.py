@@ -4,8 +4,8 @@ import sys
 import webbrowser
 from collections import OrderedDict
 
-from PyQt6.QtCore import QTimer, Qt, QUrl
-from PyQt6.QtGui import QCloseEvent, QColor, QIcon, QPixmap
+from PyQt6.QtCore import QEvent, QTimer, Qt, pyqtSignal
+from PyQt6.QtGui import QCloseEvent, QIcon, QPixmap
 from PyQt6.QtWidgets import (
     QApplication,
     QCheckBox,
@@ -25,16 +25,23 @@ from PyQt6.QtWidgets import (
     QSizePolicy,
     QStackedWidget,
     QSystemTrayIcon,
-    QTextEdit,
     QVBoxLayout,
     QWidget,
 )
-from PyQt6.QtWebEngineWidgets import QWebEngineView
 
 from core.backend_factory import BackendFactory
 from core.config_manager import ConfigManager
+from core.disk_reclaim import ReclaimScheduler
+from core.event_bus import ContainerLogEvent, DockerInstallEvent, PullProgressEvent
+from core.log_follower import service_source
+from core.log_store import LogStore
+from core.metrics import format_bytes
+from core.metrics_store import MetricsStore
+from core.sizing import read_host_resources
+from ui.log_view import LogModel, LogView
 from ui.styles import STYLESHEET
-from ui.widgets import ActionButton, MetricCard, SectionCard, show_notice_dialog
+from ui.web_panel import WebPanel
+from ui.widgets import ActionButton, MetricCard, SectionCard, Sparkline, show_notice_dialog
 
 
 def get_resource_path(relative_path):
@@ -46,7 +53,10 @@ def get_resource_path(relative_path):
 
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    # 回收调度线程发现需要回收时，转到界面线程询问用户
+    reclaim_suggested = pyqtSignal(str)
+
+    def __init__(self, prewarmer=None):
         super().__init__()
         self.setWindowTitle("Nekro Agent 启动器")
         self.resize(1220, 820)
@@ -55,18 +65,49 @@ class MainWindow(QMainWindow):
 
         self.config = ConfigManager()
         self.backend = BackendFactory.create(self.config)
+        if prewarmer is not None and prewarmer.backend_key == self.backend.backend_key:
+            self.backend.attach_prewarmer(prewarmer)
+        self.metrics_store = None
+        if self.config.get("metrics_history"):
+            self.metrics_store = MetricsStore(
+                os.path.join(os.environ.get("LOCALAPPDATA", os.path.expanduser("~")), "NekroAgent", "metrics.db"),
+                log=lambda message, level="info": print(f"[LOG] {message}"),
+            )
+            self.metrics_store.start()
+            self.backend.attach_metrics_store(self.metrics_store)
+            QApplication.instance().aboutToQuit.connect(self.metrics_store.close)
+        self.log_store = None
+        if self.config.get("log_store"):
+            self.log_store = LogStore(
+                os.path.join(os.environ.get("LOCALAPPDATA", os.path.expanduser("~")), "NekroAgent", "logs"),
+                max_bytes=(self.config.get("log_store_max_mb") or 512) * 1024 * 1024,
+                retention_days=self.config.get("log_store_retention_days") or 14,
+                log=lambda message, level="info": print(f"[LOG] {message}"),
+            )
+            self.log_store.start()
+            self.backend.attach_log_store(self.log_store)
+            QApplication.instance().aboutToQuit.connect(self.log_store.close)
         self._quit_after_stop = False
         self._responsive_buttons = []
         self._last_status = ""
+        self._service_health = ("", "")   # 看门狗报告的 (健康状态, 说明)
         self._uninstall_in_progress = False
         self._pull_layers = OrderedDict()
         self._pull_layer_order = []
+        self._lazy_pages = {}           # 页面索引 -> 构建函数，首次访问时构建
+        self._lazy_build_index = None
         self.browser_urls = {
             "nekro": f"http://localhost:{self.config.get('nekro_port') or 8021}",
             "napcat": f"http://localhost:{self.config.get('napcat_port') or 6099}",
         }
         self.current_browser_target = "nekro"
 
+        # 日志保存在定长环形缓冲区里，总览页预览与应用日志共用同一份
+        capacity = self.config.get("log_view_capacity") or 20000
+        self.app_log = LogModel(capacity, parent=self)
+        self.nekro_log = LogModel(capacity, parent=self)
+        self.napcat_log = LogModel(capacity, parent=self)
+
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
 
@@ -79,17 +120,35 @@ class MainWindow(QMainWindow):
         self.stack = QStackedWidget()
         main_layout.addWidget(self.stack, 1)
 
+        # 总览和日志页需要立即接收状态与日志，其余页面默认在首次访问时构建
+        lazy = self.config.get("lazy_pages")
         self.init_home_page()
-        self.init_browser_page()
+        self._add_lazy_page(self.init_browser_page, lazy)
         self.init_logs_page()
-        self.init_files_page()
-        self.init_settings_page()
+        self._add_lazy_page(self.init_files_page, lazy)
+        self._add_lazy_page(self.init_settings_page, lazy)
         self.switch_tab(0)
 
         self.backend.log_received.connect(self.append_log)
-        self.backend.progress_updated.connect(self._on_backend_progress)
+        self.backend.bus.subscribe(PullProgressEvent, self._on_pull_progress)
+        self.backend.bus.subscribe(DockerInstallEvent, self._on_docker_installed)
+        self.backend.bus.subscribe(ContainerLogEvent, self._on_container_log)
         self.backend.status_changed.connect(self.update_status_ui)
+        self.backend.health_changed.connect(self._on_service_health)
+        self.backend.container_event.connect(self._on_container_event)
         self.backend.deploy_info_ready.connect(self._show_credentials_dialog)
+        # 后端事件按帧（约 30Hz）批量分发，避免高频日志逐条占用事件循环
+        self._event_timer = QTimer(self)
+        self._event_timer.timeout.connect(self._dispatch_backend_events)
+        self._event_timer.start(33)
+
+        self.reclaim_suggested.connect(self._suggest_reclaim)
+        self.reclaim_scheduler = ReclaimScheduler(
+            self.config,
+            self._on_scheduled_reclaim,
+            lambda: read_host_resources(self.backend.get_default_install_dir()).free_disk_gb,
+        )
+        self.reclaim_scheduler.start()
 
         self._build_tray_icon()
         QTimer.singleShot(200, self._on_startup)
@@ -180,7 +239,33 @@ class MainWindow(QMainWindow):
         scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
         scroll.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
         scroll.setWidget(page)
-        self.stack.addWidget(scroll)
+        index = self._lazy_build_index
+        if index is None:
+            self.stack.addWidget(scroll)
+            return
+        # 用构建好的页面替换占位控件，保持页面索引不变
+        placeholder = self.stack.widget(index)
+        self.stack.insertWidget(index, scroll)
+        self.stack.removeWidget(placeholder)
+        placeholder.deleteLater()
+
+    def _add_lazy_page(self, builder, lazy=True):
+        if not lazy:
+            builder()
+            return
+        self.stack.addWidget(QWidget())
+        self._lazy_pages[self.stack.count() - 1] = builder
+
+    def _ensure_page(self, index):
+        builder = self._lazy_pages.pop(index, None)
+        if builder is None:
+            return
+        self._lazy_build_index = index
+        try:
+            builder()
+        finally:
+            self._lazy_build_index = None
+        self._apply_responsive_layout()
 
     def _register_responsive_buttons(self, *buttons):
         self._responsive_buttons.extend(buttons)
@@ -273,10 +358,101 @@ class MainWindow(QMainWindow):
         return button
 
     def switch_tab(self, index):
+        self._ensure_page(index)
         self.stack.setCurrentIndex(index)
         buttons = [self.btn_home, self.btn_browser, self.btn_logs, self.btn_files, self.btn_settings]
         for current, button in enumerate(buttons):
             button.setChecked(current == index)
+        self._sync_web_panel()
+
+    def _refresh_metrics_panel(self):
+        """按固定间隔刷新资源曲线；总览页不可见或没有新样本时跳过"""
+        if self.stack.currentIndex() != 0 or not self.isVisible() or self.isMinimized():
+            return
+        collector = self.backend.metrics
+        version = collector.version if collector is not None else -1
+        if version == self._metrics_version:
+            return
+        self._metrics_version = version
+        containers = collector.containers() if collector is not None else []
+
+        current = {item.name for item in containers}
+        for name in [name for name in self._metric_rows if name not in current]:
+            for widget in self._metric_rows.pop(name):
+                self.metrics_grid.removeWidget(widget)
+                widget.deleteLater()
+        self.metrics_empty.setVisible(not containers)
+
+        order = [item.name for item in containers]
+        relayout = order != self._metric_order
+        if relayout:
+            # 容器增减时按新顺序重新排布，其余刷新只更新内容
+            self._metric_order = order
+            for widgets in self._metric_rows.values():
+                for widget in widgets:
+                    self.metrics_grid.removeWidget(widget)
+
+        for row, item in enumerate(containers, start=1):
+            widgets = self._metric_rows.get(item.name)
+            if widgets is None:
+                name_label = QLabel(item.label)
+                name_label.setObjectName("MetricLabel")
+                cpu_label, mem_label, io_label = QLabel(), QLabel(), QLabel()
+                io_label.setObjectName("MetricHint")
+                widgets = self._metric_rows[item.name] = (
+                    name_label, cpu_label, Sparkline("#3f8cff", ceiling=5.0),
+                    mem_label, Sparkline("#2fb170"), io_label,
+                )
+            if relayout:
+                for column, widget in enumerate(widgets):
+                    self.metrics_grid.addWidget(widget, row, column)
+            name_label, cpu_label, cpu_spark, mem_label, mem_spark, io_label = widgets
+            series = item.series
+            cpu_label.setText(f"CPU {series['cpu'].last():.1f}%")
+            mem_text = format_bytes(series["mem"].last())
+            if item.mem_limit:
+                mem_text += f" / {format_bytes(item.mem_limit)}"
+            mem_label.setText(mem_text)
+            cpu_spark.set_values(series["cpu"].values())
+            mem_spark.set_values(series["mem"].values())
+            io_label.setText(
+                f"网络 ↓{format_bytes(series['net_rx'].last(), '/s')} ↑{format_bytes(series['net_tx'].last(), '/s')}  "
+                f"磁盘 读{format_bytes(series['blk_read'].last(), '/s')} 写{format_bytes(series['blk_write'].last(), '/s')}"
+            )
+            name_label.setToolTip(f"{item.name}，进程数 {item.pids}")
+
+    def _show_metrics_history(self):
+        from ui.metrics_history import MetricsHistoryDialog
+
+        MetricsHistoryDialog(self.metrics_store, self).exec()
+
+    def _sync_web_panel(self):
+        """浏览页可见时激活内嵌浏览器，切走、最小化或收到托盘时冻结"""
+        if hasattr(self, "web_panel"):
+            self.web_panel.set_active(self.stack.currentIndex() == 1 and self.isVisible() and not self.isMinimized())
+        self._sync_log_views()
+
+    def _sync_log_views(self):
+        """只有日志实际可见时才把新行提交给视图，最小化或收到托盘时只写入缓冲区"""
+        shown = self.isVisible() and not self.isMinimized()
+        page = self.stack.currentIndex()
+        tab = getattr(self, "_log_tab", 0)
+        self.app_log.set_active(shown and (page == 0 or (page == 2 and tab == 0)))
+        self.nekro_log.set_active(shown and page == 2 and tab == 1)
+        self.napcat_log.set_active(shown and page == 2 and tab == 2)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self._sync_web_panel()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self._sync_web_panel()
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.Type.WindowStateChange:
+            self._sync_web_panel()
 
     def _on_startup(self):
         if self.config.get("first_run") or not self.config.get("deploy_mode"):
@@ -294,19 +470,30 @@ class MainWindow(QMainWindow):
 
     def _switch_backend(self, backend_key, dialog):
         """用户在首次运行向导中选择了后端，重建 backend 实例"""
-        # 断开旧后端信号
+        # 先送达旧后端尚未分发的事件，再断开旧后端信号
+        self._dispatch_backend_events()
         self.backend.log_received.disconnect(self.append_log)
-        self.backend.progress_updated.disconnect(self._on_backend_progress)
+        self.backend.bus.unsubscribe(PullProgressEvent, self._on_pull_progress)
+        self.backend.bus.unsubscribe(DockerInstallEvent, self._on_docker_installed)
+        self.backend.bus.unsubscribe(ContainerLogEvent, self._on_container_log)
         self.backend.status_changed.disconnect(self.update_status_ui)
+        self.backend.health_changed.disconnect(self._on_service_health)
+        self.backend.container_event.disconnect(self._on_container_event)
         self.backend.deploy_info_ready.disconnect(self._show_credentials_dialog)
 
         # 创建新后端
         self.backend = BackendFactory.create(self.config)
+        self.backend.attach_metrics_store(self.metrics_store)
+        self.backend.attach_log_store(self.log_store)
 
         # 连接新后端信号
         self.backend.log_received.connect(self.append_log)
-        self.backend.progress_updated.connect(self._on_backend_progress)
+        self.backend.bus.subscribe(PullProgressEvent, self._on_pull_progress)
+        self.backend.bus.subscribe(DockerInstallEvent, self._on_docker_installed)
+        self.backend.bus.subscribe(ContainerLogEvent, self._on_container_log)
         self.backend.status_changed.connect(self.update_status_ui)
+        self.backend.health_changed.connect(self._on_service_health)
+        self.backend.container_event.connect(self._on_container_event)
         self.backend.deploy_info_ready.connect(self._show_credentials_dialog)
 
         # 更新对话框中的后端引用
@@ -327,53 +514,38 @@ class MainWindow(QMainWindow):
         self.start_deploy()
 
     def append_log(self, msg, level="info"):
-        if level == "debug" and not getattr(self, "debug_mode", False):
-            return
         if msg.startswith("[镜像拉取]") or msg.startswith("[沙盒镜像]"):
             return
-
-        original_level = level
-        color = {
-            "error": "#f26f82",
-            "warning": "#f2c15f",
-            "warn": "#f2c15f",
-            "debug": "#8fa4b8",
-            "vm": "#8fa4b8",
-        }.get(level, "#7ce0a3")
+        # 容器日志由后端带时间戳写入日志存储，这里只保存应用日志（含未显示的调试日志）
+        if self.log_store is not None:
+            self.log_store.append("app", level, msg)
+        if level == "debug" and not getattr(self, "debug_mode", False):
+            return
 
         if level == "warn":
             level = "warning"
-
-        if level == "vm":
-            formatted = f"<span style='color:{color};'>{msg}</span>"
-        else:
-            formatted = f"<span style='color:{color};'>[{level.upper()}]</span> {msg}"
-
-        if level == "vm":
-            if "napcat" in msg.lower():
-                self.log_viewer_napcat.append(formatted)
-            else:
-                self.log_viewer_nekro.append(formatted)
-        else:
-            self.log_viewer_app.append(formatted)
-            if hasattr(self, "log_preview"):
-                self.log_preview.append(f"<span style='color:{color};'>[{level.upper()}] {msg}</span>")
+        self.app_log.append(msg, level)
 
         try:
-            if original_level == "vm":
-                print(msg)
-            else:
-                print(f"[{level.upper()}] {msg}")
+            print(f"[{level.upper()}] {msg}")
         except Exception:
             pass
 
+    def _on_container_log(self, event):
+        # 容器日志已完整保存在日志存储中，不再写入 debug.log
+        model = self.napcat_log if service_source(event.service) == "napcat" else self.nekro_log
+        model.append(f"{event.service} | {event.text}", "vm")
+
     def _set_log_tab(self, index):
-        viewers = [self.log_viewer_app, self.log_viewer_nekro, self.log_viewer_napcat]
-        buttons = [self.btn_log_app, self.btn_log_nekro, self.btn_log_napcat]
+        viewers = [self.log_viewer_app, self.log_viewer_nekro, self.log_viewer_napcat, self.log_search_panel]
+        buttons = [self.btn_log_app, self.btn_log_nekro, self.btn_log_napcat, self.btn_log_search]
+        self._log_tab = index
         for current, viewer in enumerate(viewers):
-            viewer.setVisible(current == index)
+            if viewer is not None:
+                viewer.setVisible(current == index)
         for current, button in enumerate(buttons):
             button.setChecked(current == index)
+        self._sync_log_views()
 
     def _tick_pull_spinner(self):
         self._pull_spinner_idx = (self._pull_spinner_idx + 1) % len(self._pull_spinner_frames)
@@ -419,29 +591,31 @@ class MainWindow(QMainWindow):
         self.pull_overall_bar.setValue(0)
         self._set_pull_view_visible(False)
 
-    def _on_backend_progress(self, text):
-        if text.startswith("__pull_progress__|"):
-            _, phase, message = text.split("|", 2)
-            if phase == "start":
-                self._clear_pull_progress()
-                self._update_pull_view(header=message)
-            elif phase == "update":
-                self._update_pull_view(detail=message)
-            elif phase == "stage":
-                self._pull_layers.clear()
-                self._pull_layer_order.clear()
-                self.pull_overall_bar.setValue(0)
-                self._update_pull_view(header=message)
-            elif phase == "done":
-                self.pull_overall_bar.setValue(100)
-                self._update_pull_view(header=message)
-                QTimer.singleShot(2000, self._clear_pull_progress)
-            elif phase == "error":
-                self._update_pull_view(header=message)
-            return
-        if text in {"__docker_done__", "__docker_fail__"}:
+    def _dispatch_backend_events(self):
+        """按帧分发后端事件（日志批量送达，同一帧内的进度只取最新）"""
+        self.backend.bus.dispatch()
+
+    def _on_pull_progress(self, event):
+        phase, message = event.phase, event.message
+        if phase == "start":
             self._clear_pull_progress()
-            return
+            self._update_pull_view(header=message)
+        elif phase == "update":
+            self._update_pull_view(detail=message)
+        elif phase == "stage":
+            self._pull_layers.clear()
+            self._pull_layer_order.clear()
+            self.pull_overall_bar.setValue(0)
+            self._update_pull_view(header=message)
+        elif phase == "done":
+            self.pull_overall_bar.setValue(100)
+            self._update_pull_view(header=message)
+            QTimer.singleShot(2000, self._clear_pull_progress)
+        elif phase == "error":
+            self._update_pull_view(header=message)
+
+    def _on_docker_installed(self, event):
+        self._clear_pull_progress()
 
     def _format_mode_text(self, mode):
         if mode == "napcat":
@@ -475,17 +649,13 @@ class MainWindow(QMainWindow):
         self.browser_hint.setText(f"内置 WebView 访问 {target_name} 管理界面；服务未就绪时可点击刷新重试。")
 
         if getattr(self.backend, "is_running", False):
-            current_url = self.webview.url().toString()
-            if force_reload or current_url != target_url:
-                self.webview.setUrl(QUrl(target_url))
-            else:
-                self.webview.reload()
+            self.web_panel.load(target_url, force_reload=force_reload)
         else:
             placeholder = (
                 f"{target_name} 服务尚未启动。<br><br>"
                 "先在“总览控制台”完成部署，然后回到这里点击“刷新内嵌页面”。"
             )
-            self.webview.setHtml(f"<html><body style='font-family:Segoe UI;padding:24px;color:#243649;'>{placeholder}</body></html>")
+            self.web_panel.show_placeholder(f"<div style='font-family:Segoe UI;'>{placeholder}</div>")
 
     def _reload_browser_view(self):
         self._set_browser_target(self.current_browser_target, force_reload=True)
@@ -527,26 +697,19 @@ class MainWindow(QMainWindow):
 
         if show_logs:
             self.switch_tab(2)
-        self.log_viewer_app.clear()
-        self.log_viewer_app.append(f"<span style='color:#7ce0a3;'>[INFO]</span> 开始部署服务 (模式: {deploy_mode})...")
-        if hasattr(self, "log_preview"):
-            self.log_preview.clear()
-            self.log_preview.append(f"<span style='color:#7ce0a3;'>[INFO]</span> 开始部署服务 (模式: {deploy_mode})...")
+        self.app_log.clear()
+        self.app_log.append(f"开始部署服务 (模式: {deploy_mode})...")
 
         self.backend.start_services(deploy_mode)
 
     def update_status_ui(self, status):
         previous_status = self._last_status
         self._last_status = status
-        self.status_badge.setText(f"状态: {status}")
-
         running = status == "运行中"
         was_running = previous_status == "运行中"
-        self.metric_status.findChild(QLabel, "MetricValue").setText(status)
-        self.metric_status.findChild(QLabel, "MetricHint").setText("服务可访问" if running else "等待部署或启动")
-        self.metric_status.setProperty("accent", "green" if running else "red")
-        self.metric_status.style().unpolish(self.metric_status)
-        self.metric_status.style().polish(self.metric_status)
+        if not running:
+            self._service_health = ("", "")
+        self._refresh_status_badge()
 
         self.btn_deploy_action.setEnabled(not running)
         self.btn_primary_deploy.setEnabled(not running)
@@ -555,7 +718,7 @@ class MainWindow(QMainWindow):
             self.btn_primary_deploy.setText("服务运行中")
             if hasattr(self, "_is_first_deploy") and self._is_first_deploy:
                 self._is_first_deploy = False
-            if hasattr(self, "webview") and not was_running:
+            if not was_running:
                 self.switch_tab(1)
                 self._set_browser_target(self.current_browser_target, force_reload=True)
             self._clear_pull_progress()
@@ -564,7 +727,7 @@ class MainWindow(QMainWindow):
             if self._quit_after_stop and status in {"已停止", "已卸载"}:
                 self._quit_after_stop = False
                 QApplication.quit()
-            if hasattr(self, "webview") and was_running:
+            if hasattr(self, "web_panel") and was_running:
                 self._set_browser_target(self.current_browser_target, force_reload=False)
             if status in {"启动失败", "更新失败", "启动超时", "已停止", "已卸载"}:
                 self._clear_pull_progress()
@@ -582,6 +745,36 @@ class MainWindow(QMainWindow):
         if hasattr(self, "browser_reload_btn"):
             self.browser_reload_btn.setEnabled(True)
 
+    def _on_service_health(self, health, detail):
+        """看门狗报告的运行期健康状态，只在服务运行中时体现在状态徽标上"""
+        self._service_health = (health, detail)
+        if self._last_status == "运行中":
+            self._refresh_status_badge()
+
+    def _on_container_event(self, event):
+        """窗口收到托盘时，容器异常退出 / OOM 通过托盘通知提示"""
+        if event.abnormal and self.tray_icon.isVisible():
+            self.tray_icon.showMessage(
+                "Nekro Agent", f"容器异常: {event.describe()}", QSystemTrayIcon.MessageIcon.Warning, 5000
+            )
+
+    def _refresh_status_badge(self):
+        status = self._last_status or "未就绪"
+        health, detail = self._service_health
+        running = status == "运行中"
+        degraded = running and health and health != "正常"
+        self.status_badge.setText(f"状态: {status} · {health}" if degraded else f"状态: {status}")
+        self.status_badge.setToolTip(detail if running else "")
+        if running:
+            hint = f"服务可访问 · {detail}" if health == "正常" and detail else (detail or "服务可访问")
+        else:
+            hint = "等待部署或启动"
+        self.metric_status.findChild(QLabel, "MetricValue").setText(f"{status} · {health}" if degraded else status)
+        self.metric_status.findChild(QLabel, "MetricHint").setText(hint)
+        self.metric_status.setProperty("accent", ("amber" if degraded else "green") if running else "red")
+        self.metric_status.style().unpolish(self.metric_status)
+        self.metric_status.style().polish(self.metric_status)
+
     def init_home_page(self):
         page = QWidget()
         layout = QVBoxLayout(page)
@@ -667,23 +860,24 @@ class MainWindow(QMainWindow):
         self.btn_deploy_action = ActionButton("RUN", "一键部署", "启动容器并写入运行配置", "primary")
         self.btn_update_action = ActionButton("UPD", "升级 Nekro Agent", "拉取镜像并重启服务")
         self.btn_uninstall_action = ActionButton("DEL", "卸载清理", "删除容器、镜像和运行环境", "danger")
+        self.btn_reclaim_action = ActionButton("GC", "回收磁盘空间", "清理镜像缓存并压缩虚拟磁盘")
 
         self.btn_env_check.clicked.connect(self._show_first_run_dialog)
         self.btn_deploy_action.clicked.connect(self.start_deploy)
         self.btn_update_action.clicked.connect(self._update_services)
         self.btn_uninstall_action.clicked.connect(self._uninstall_environment)
+        self.btn_reclaim_action.clicked.connect(self._reclaim_disk)
 
         actions_grid.addWidget(self.btn_env_check, 0, 0)
         actions_grid.addWidget(self.btn_deploy_action, 0, 1)
         actions_grid.addWidget(self.btn_update_action, 1, 0)
         actions_grid.addWidget(self.btn_uninstall_action, 1, 1)
+        actions_grid.addWidget(self.btn_reclaim_action, 2, 0)
         actions_layout.addLayout(actions_grid)
 
         activity_card = SectionCard("实时摘要", "显示最近的应用日志，完整内容在日志中心查看。")
         activity_layout = activity_card.body_layout()
-        self.log_preview = QTextEdit()
-        self.log_preview.setObjectName("LogViewer")
-        self.log_preview.setReadOnly(True)
+        self.log_preview = LogView(self.app_log, tint_message=True)
         self.log_preview.setMinimumHeight(250)
         activity_layout.addWidget(self.log_preview)
 
@@ -691,11 +885,35 @@ class MainWindow(QMainWindow):
         bottom_grid.addWidget(activity_card, 0, 1)
         layout.addLayout(bottom_grid)
 
+        resources_card = SectionCard("资源占用", "各容器（含沙盒）的 CPU、内存、网络与磁盘 IO，曲线为最近几分钟的变化。")
+        self.metrics_grid = QGridLayout()
+        self.metrics_grid.setHorizontalSpacing(14)
+        self.metrics_grid.setVerticalSpacing(8)
+        self.metrics_empty = QLabel("服务运行后显示")
+        self.metrics_empty.setObjectName("MetricHint")
+        self.metrics_grid.addWidget(self.metrics_empty, 0, 0)
+        resources_card.body_layout().addLayout(self.metrics_grid)
+        if self.metrics_store is not None:
+            history_row = QHBoxLayout()
+            history_row.addStretch()
+            history_button = QPushButton("查看历史 / 导出")
+            history_button.clicked.connect(self._show_metrics_history)
+            history_row.addWidget(history_button)
+            resources_card.body_layout().addLayout(history_row)
+        layout.addWidget(resources_card)
+        self._metric_rows = {}        # 容器名 -> 行内控件
+        self._metric_order = []
+        self._metrics_version = -1
+        self._metrics_timer = QTimer(self)
+        self._metrics_timer.timeout.connect(self._refresh_metrics_panel)
+        self._metrics_timer.start(max(250, int(self.config.get("metrics_refresh_ms") or 1000)))
+
         self._register_responsive_buttons(
             self.btn_env_check,
             self.btn_deploy_action,
             self.btn_update_action,
             self.btn_uninstall_action,
+            self.btn_reclaim_action,
         )
         self._add_page(page)
         self.refresh_dashboard()
@@ -746,14 +964,13 @@ class MainWindow(QMainWindow):
         self.browser_hint.setWordWrap(True)
         card_layout.addWidget(self.browser_hint)
 
-        self.webview = QWebEngineView()
-        self.webview.setMinimumHeight(200)
-        self.webview.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
-        self.webview.setAttribute(Qt.WidgetAttribute.WA_OpaquePaintEvent, True)
-        self.webview.setAutoFillBackground(True)
-        self.webview.setStyleSheet("background: #f4f7fb; border: 1px solid #dfe7ef; border-radius: 8px;")
-        self.webview.page().setBackgroundColor(QColor("#f4f7fb"))
-        card_layout.addWidget(self.webview, 1)
+        # WebEngine 在浏览页可见时才创建（main.py 已在创建 QApplication 前设置共享 OpenGL 上下文），
+        # 隐藏后冻结，闲置超时后销毁以释放渲染进程
+        self.web_panel = WebPanel(
+            os.path.join(os.environ.get("LOCALAPPDATA", os.path.expanduser("~")), "NekroAgent", "webview"),
+            idle_discard_seconds=self.config.get("webview_idle_discard_seconds"),
+        )
+        card_layout.addWidget(self.web_panel, 1)
 
         card.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
         layout.addWidget(card, 1)
@@ -812,8 +1029,10 @@ class MainWindow(QMainWindow):
         self.btn_log_app = QPushButton("应用日志")
         self.btn_log_nekro = QPushButton("Nekro Agent")
         self.btn_log_napcat = QPushButton("NapCat")
+        self.btn_log_search = QPushButton("搜索历史")
+        self.btn_log_search.setVisible(self.log_store is not None)
 
-        for idx, button in enumerate([self.btn_log_app, self.btn_log_nekro, self.btn_log_napcat]):
+        for idx, button in enumerate([self.btn_log_app, self.btn_log_nekro, self.btn_log_napcat, self.btn_log_search]):
             button.setObjectName("SegmentBtn")
             button.setCheckable(True)
             button.setCursor(Qt.CursorShape.PointingHandCursor)
@@ -822,13 +1041,17 @@ class MainWindow(QMainWindow):
         top.addStretch()
         card_layout.addLayout(top)
 
-        self.log_viewer_app = QTextEdit()
-        self.log_viewer_nekro = QTextEdit()
-        self.log_viewer_napcat = QTextEdit()
+        self.log_viewer_app = LogView(self.app_log)
+        self.log_viewer_nekro = LogView(self.nekro_log)
+        self.log_viewer_napcat = LogView(self.napcat_log)
         for viewer in [self.log_viewer_app, self.log_viewer_nekro, self.log_viewer_napcat]:
-            viewer.setObjectName("LogViewer")
-            viewer.setReadOnly(True)
             card_layout.addWidget(viewer)
+        self.log_search_panel = None
+        if self.log_store is not None:
+            from ui.log_search import LogSearchPanel
+
+            self.log_search_panel = LogSearchPanel(self.log_store)
+            card_layout.addWidget(self.log_search_panel)
 
         self._set_log_tab(0)
 
@@ -931,8 +1154,8 @@ class MainWindow(QMainWindow):
                 target_url = self._target_url(self.current_browser_target)
                 if hasattr(self, "browser_url_label"):
                     self.browser_url_label.setText(f"当前地址: {target_url}")
-                if getattr(self.backend, "is_running", False) and hasattr(self, "webview"):
-                    self.webview.setUrl(QUrl(target_url))
+                if getattr(self.backend, "is_running", False) and hasattr(self, "web_panel"):
+                    self.web_panel.load(target_url)
         except ValueError:
             pass
 
@@ -975,9 +1198,45 @@ class MainWindow(QMainWindow):
             return
 
         self.switch_tab(2)
-        self.log_viewer_app.append("<span style='color:#7ce0a3;'>[INFO]</span> 开始更新服务...")
+        self.app_log.append("开始更新服务...")
         self.backend.update_services()
 
+    def _reclaim_disk(self):
+        reply = self._show_confirm_dialog(
+            "回收磁盘空间",
+            "将清理悬空镜像和构建缓存，并在关闭运行环境后压缩虚拟磁盘。\n"
+            "期间服务会暂停，完成后自动恢复，压缩需要管理员权限。\n确定要继续吗？",
+            confirm_text="开始回收",
+        )
+        if not reply:
+            return
+
+        self.switch_tab(2)
+        self.backend.reclaim_disk()
+
+    def _on_scheduled_reclaim(self, reason):
+        """由回收调度线程调用：只提示用户，不在无人确认时停止服务或请求管理员权限"""
+        if self.config.get("first_run") or self._uninstall_in_progress:
+            return False
+        self.reclaim_suggested.emit(reason)
+        return True
+
+    def _suggest_reclaim(self, reason):
+        running = self.backend.is_running
+        reply = self._show_confirm_dialog(
+            "建议回收磁盘空间",
+            f"{reason}，建议回收虚拟磁盘空间。\n"
+            + ("回收期间服务会暂停，完成后自动恢复。" if running else "服务当前未运行。")
+            + "\n压缩虚拟磁盘需要管理员权限，现在开始回收吗？",
+            confirm_text="开始回收",
+            cancel_text="以后再说",
+        )
+        if not reply:
+            self.app_log.append(f"[磁盘回收] 已跳过本次回收提示（{reason}）")
+            return
+        self.switch_tab(2)
+        self.backend.reclaim_disk()
+
     def _uninstall_environment(self):
         reply = self._show_confirm_dialog(
             "确认卸载",
@@ -994,7 +1253,7 @@ class MainWindow(QMainWindow):
 
         self._uninstall_in_progress = True
         self.switch_tab(2)
-        self.log_viewer_app.append("<span style='color:#7ce0a3;'>[INFO]</span> 开始卸载环境...")
+        self.app_log.append("开始卸载环境...")
         self.backend.uninstall_environment()
 
     def init_files_page(self):
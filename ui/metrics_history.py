@@ -0,0 +1,124 @@
+import time
+
+from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import QComboBox, QDialog, QFileDialog, QHBoxLayout, QLabel, QPushButton, QVBoxLayout
+
+from core.metrics import format_bytes
+from ui.styles import STYLESHEET
+from ui.widgets import Sparkline
+
+
+RANGES = [
+    ("最近 1 小时", 3600),
+    ("最近 24 小时", 86400),
+    ("最近 7 天", 7 * 86400),
+    ("最近 30 天", 30 * 86400),
+    ("最近 1 年", 365 * 86400),
+]
+
+SERIES_LABELS = {
+    "health.latency_ms": "服务响应耗时",
+    "disk.vhdx": "虚拟磁盘占用",
+    "disk.data_dir": "数据目录占用",
+    "duration.pull": "镜像拉取耗时",
+    "duration.deploy": "启动到就绪耗时",
+}
+
+
+def series_label(name):
+    if name.startswith("container."):
+        container, _, kind = name[len("container."):].rpartition(".")
+        return f"{container} {'CPU' if kind == 'cpu' else '内存'}"
+    return SERIES_LABELS.get(name, name)
+
+
+def format_value(name, value):
+    if name.endswith(".cpu"):
+        return f"{value:.1f}%"
+    if name.endswith(".mem") or name.startswith("disk."):
+        return format_bytes(value)
+    if name.endswith("_ms"):
+        return f"{value:.0f}ms"
+    if name.startswith("duration."):
+        return f"{value:.1f}s"
+    return f"{value:.2f}"
+
+
+class MetricsHistoryDialog(QDialog):
+    """查看指标历史曲线并导出 CSV"""
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.setWindowTitle("资源历史")
+        self.setMinimumSize(620, 360)
+        self.setStyleSheet(STYLESHEET)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(20, 18, 20, 18)
+        layout.setSpacing(12)
+
+        selectors = QHBoxLayout()
+        self.series_combo = QComboBox()
+        for name in store.series_names():
+            self.series_combo.addItem(series_label(name), name)
+        self.range_combo = QComboBox()
+        for label, seconds in RANGES:
+            self.range_combo.addItem(label, seconds)
+        self.range_combo.setCurrentIndex(1)
+        selectors.addWidget(self.series_combo, 1)
+        selectors.addWidget(self.range_combo)
+        layout.addLayout(selectors)
+
+        self.chart = Sparkline("#3f8cff")
+        self.chart.setFixedHeight(180)
+        layout.addWidget(self.chart, 1)
+
+        self.summary = QLabel()
+        self.summary.setObjectName("MetricHint")
+        self.summary.setWordWrap(True)
+        layout.addWidget(self.summary)
+
+        buttons = QHBoxLayout()
+        buttons.addStretch()
+        export_button = QPushButton("导出 CSV")
+        export_button.clicked.connect(self._export_csv)
+        close_button = QPushButton("关闭")
+        close_button.clicked.connect(self.accept)
+        buttons.addWidget(export_button)
+        buttons.addWidget(close_button)
+        layout.addLayout(buttons)
+
+        self.series_combo.currentIndexChanged.connect(self._refresh)
+        self.range_combo.currentIndexChanged.connect(self._refresh)
+        self._refresh()
+
+    def _refresh(self):
+        name = self.series_combo.currentData()
+        if not name:
+            self.chart.set_values(())
+            self.summary.setText("暂无历史数据，服务运行一段时间后再查看。")
+            return
+        start = time.time() - self.range_combo.currentData()
+        resolution = self.store.pick_resolution(start, time.time())
+        rows = self.store.query(name, start, resolution=resolution)
+        self.chart.set_values([avg for _, avg, _, _ in rows])
+        if not rows:
+            self.summary.setText("该时间段内没有数据。")
+            return
+        low = min(row[2] for row in rows)
+        high = max(row[3] for row in rows)
+        mean = sum(row[1] for row in rows) / len(rows)
+        self.summary.setText(
+            f"平均 {format_value(name, mean)} · 最低 {format_value(name, low)} · 最高 {format_value(name, high)}"
+            f"（{len(rows)} 个点，每点 {resolution // 60} 分钟）"
+        )
+
+    def _export_csv(self):
+        path, _ = QFileDialog.getSaveFileName(self, "导出指标历史", "nekro_metrics.csv", "CSV 文件 (*.csv)")
+        if not path:
+            return
+        start = time.time() - self.range_combo.currentData()
+        rows = self.store.export_csv(path, start=start, resolution=self.store.pick_resolution(start, time.time()))
+        self.summary.setText(f"已导出 {rows} 行到 {path}")
+        self.summary.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
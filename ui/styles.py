@@ -324,7 +324,8 @@ QPushButton#SegmentBtn:checked {
     color: #bf655d;
 }
 
-QTextEdit#LogViewer {
+QTextEdit#LogViewer,
+QListView#LogViewer {
     background: #0f2032;
     color: #dfeaf6;
     border: 1px solid #20384f;
@@ -0,0 +1,178 @@
+import os
+
+from PyQt6 import sip
+from PyQt6.QtCore import QTimer, QUrl, Qt
+from PyQt6.QtGui import QColor
+from PyQt6.QtWidgets import QApplication, QLabel, QSizePolicy, QStackedLayout, QWidget
+
+
+PLACEHOLDER_STYLE = "background: #f4f7fb; border: 1px solid #dfe7ef; border-radius: 8px; padding: 24px; color: #243649;"
+
+
+class WebPanel(QWidget):
+    """
+    按需创建的内嵌浏览器。
+
+    - 只有在可见且有地址时才创建 QWebEngineView；服务未启动时显示普通文本占位，不启动渲染进程
+    - 隐藏（切换页面 / 最小化 / 收到托盘）时通过页面生命周期 API 冻结页面
+    - 隐藏超过 idle_discard_seconds 后销毁视图，释放渲染进程；再次显示时恢复地址和滚动位置
+    - 使用磁盘上的持久化 profile，HTTP 缓存与登录状态在重建视图和重启后保留
+    """
+
+    def __init__(self, storage_dir, idle_discard_seconds=300, parent=None):
+        super().__init__(parent)
+        self.storage_dir = storage_dir
+        self.idle_discard_seconds = idle_discard_seconds
+        self._profile = None
+        self._view = None
+        self._url = ""          # 应显示的地址，空表示显示占位内容
+        self._scroll = None     # 销毁前保存的滚动位置
+        self._active = False
+        self._stale = False     # 冻结期间地址有变化，激活时需要重新加载
+
+        self._layout = QStackedLayout(self)
+        self._placeholder = QLabel()
+        self._placeholder.setWordWrap(True)
+        self._placeholder.setTextFormat(Qt.TextFormat.RichText)
+        self._placeholder.setAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop)
+        self._placeholder.setStyleSheet(PLACEHOLDER_STYLE)
+        self._layout.addWidget(self._placeholder)
+
+        self.setMinimumHeight(200)
+        self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+
+        self._discard_timer = QTimer(self)
+        self._discard_timer.setSingleShot(True)
+        self._discard_timer.timeout.connect(self.discard)
+        QApplication.instance().aboutToQuit.connect(self.shutdown)
+
+    # ------------------------------------------------------------------ #
+    #  对外接口
+    # ------------------------------------------------------------------ #
+
+    def current_url(self):
+        return self._url
+
+    @property
+    def has_view(self):
+        return self._view is not None
+
+    def show_placeholder(self, html):
+        """显示占位说明；服务已停止时不再需要渲染进程，直接销毁视图"""
+        self._url = ""
+        self._scroll = None
+        self._placeholder.setText(html)
+        self._layout.setCurrentWidget(self._placeholder)
+        self.discard()
+
+    def load(self, url, force_reload=False):
+        changed = url != self._url
+        self._url = url
+        if changed:
+            self._scroll = None
+        if not self._active:
+            # 不可见时只记下地址，等显示时再创建视图 / 加载
+            self._stale = self._stale or changed or force_reload
+            return
+        if self._view is None:
+            self._ensure_view()
+        elif changed or force_reload:
+            self._view.setUrl(QUrl(url))
+        else:
+            self._view.reload()
+
+    def reload(self):
+        if self._url:
+            self.load(self._url, force_reload=True)
+
+    def set_active(self, active):
+        """浏览页可见性变化时调用"""
+        if active == self._active:
+            return
+        self._active = active
+        if active:
+            self._discard_timer.stop()
+            if not self._url:
+                return
+            if self._view is None:
+                self._ensure_view()
+                return
+            self._set_lifecycle("Active")
+            self._view.page().setVisible(self._view.isVisible())
+            if self._stale:
+                self._stale = False
+                self._view.setUrl(QUrl(self._url))
+        elif self._view is not None:
+            self._view.page().setVisible(False)
+            self._set_lifecycle("Frozen")
+            if self.idle_discard_seconds and self.idle_discard_seconds > 0:
+                self._discard_timer.start(int(self.idle_discard_seconds * 1000))
+
+    def discard(self):
+        """销毁视图和页面（profile 保留），渲染进程随之退出"""
+        self._discard_timer.stop()
+        view = self._view
+        if view is None:
+            return
+        if self._url:
+            position = view.page().scrollPosition()
+            self._scroll = (position.x(), position.y())
+        self._view = None
+        self._layout.setCurrentWidget(self._placeholder)
+        self._layout.removeWidget(view)
+        view.deleteLater()
+
+    def shutdown(self):
+        """退出前先于 profile 删除页面，避免 profile 释放时仍有页面引用"""
+        self._discard_timer.stop()
+        if self._view is not None:
+            view, self._view = self._view, None
+            sip.delete(view)
+        if self._profile is not None:
+            profile, self._profile = self._profile, None
+            sip.delete(profile)
+
+    # ------------------------------------------------------------------ #
+    #  内部实现
+    # ------------------------------------------------------------------ #
+
+    def _ensure_profile(self):
+        if self._profile is None:
+            from PyQt6.QtWebEngineCore import QWebEngineProfile
+
+            os.makedirs(self.storage_dir, exist_ok=True)
+            profile = QWebEngineProfile("NekroAgent", self)
+            profile.setPersistentStoragePath(os.path.join(self.storage_dir, "storage"))
+            profile.setCachePath(os.path.join(self.storage_dir, "cache"))
+            profile.setHttpCacheType(QWebEngineProfile.HttpCacheType.DiskHttpCache)
+            profile.setPersistentCookiesPolicy(QWebEngineProfile.PersistentCookiesPolicy.ForcePersistentCookies)
+            self._profile = profile
+        return self._profile
+
+    def _ensure_view(self):
+        from PyQt6.QtWebEngineCore import QWebEnginePage
+        from PyQt6.QtWebEngineWidgets import QWebEngineView
+
+        view = QWebEngineView(self)
+        page = QWebEnginePage(self._ensure_profile(), view)
+        page.setBackgroundColor(QColor("#f4f7fb"))
+        view.setPage(page)
+        view.setAttribute(Qt.WidgetAttribute.WA_OpaquePaintEvent, True)
+        view.setAutoFillBackground(True)
+        view.setStyleSheet("background: #f4f7fb; border: 1px solid #dfe7ef; border-radius: 8px;")
+        view.loadFinished.connect(self._restore_scroll)
+        self._view = view
+        self._stale = False
+        self._layout.addWidget(view)
+        self._layout.setCurrentWidget(view)
+        view.setUrl(QUrl(self._url))
+
+    def _restore_scroll(self, ok):
+        if ok and self._scroll and self._view is not None:
+            x, y = self._scroll
+            self._scroll = None
+            self._view.page().runJavaScript(f"window.scrollTo({x:.0f}, {y:.0f});")
+
+    def _set_lifecycle(self, state):
+        page = self._view.page()
+        page.setLifecycleState(getattr(page.LifecycleState, state))
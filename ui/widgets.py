@@ -1,5 +1,5 @@
-from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QFont
+from PyQt6.QtCore import QPointF, Qt
+from PyQt6.QtGui import QColor, QFont, QPainter, QPen, QPolygonF
 from PyQt6.QtWidgets import QDialog, QFrame, QHBoxLayout, QLabel, QPushButton, QSizePolicy, QVBoxLayout, QWidget
 
 from ui.styles import STYLESHEET
@@ -142,6 +142,40 @@ class MetricCard(QFrame):
             layout.addWidget(hint_widget)
 
 
+class Sparkline(QWidget):
+    """迷你折线图，纵轴从 0 到 max(峰值, ceiling)"""
+
+    def __init__(self, color="#3f8cff", ceiling=0.0, parent=None):
+        super().__init__(parent)
+        self._color = QColor(color)
+        self._ceiling = ceiling
+        self._values = ()
+        self.setFixedHeight(26)
+        self.setMinimumWidth(90)
+        self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
+
+    def set_values(self, values):
+        self._values = values
+        self.update()
+
+    def paintEvent(self, event):
+        values = self._values
+        if len(values) < 2:
+            return
+        width, height = self.width() - 2, self.height() - 3
+        top = max(max(values), self._ceiling) or 1.0
+        step = width / (len(values) - 1)
+        points = QPolygonF([
+            QPointF(1 + index * step, 1 + height - min(value, top) / top * height)
+            for index, value in enumerate(values)
+        ])
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(QPen(self._color, 1.5))
+        painter.drawPolyline(points)
+        painter.end()
+
+
 class SectionCard(QFrame):
     def __init__(self, title, desc="", parent=None):
         super().__init__(parent)